@@ -0,0 +1,258 @@
+"""Admission control and priority scheduling for ``/agent/action``.
+
+Every agent request is classified by intent and must obtain a slot before it
+runs. Slots are limited globally (``MOVI_AGENT_MAX_CONCURRENCY``) and per class,
+and a freed slot goes to the highest-priority class with work waiting, so writes
+overtake queued bulk reads and bulk reads can never occupy every slot. The class
+comes from the intent name alone; request parameters (``confirmed`` included)
+are client-controlled and cannot promote a read, and free text is interactive
+even when it would parse to a write. Waiting happens on the event loop, not on
+a worker thread, so a backlog of reads does not exhaust the threadpool either.
+
+A request is shed with :class:`AdmissionRejected` (HTTP 429 + ``Retry-After``)
+when its class queue is full, when the expected wait already exceeds the class's
+latency budget, or when it actually waits that long.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+MAX_CONCURRENCY = int(os.environ.get("MOVI_AGENT_MAX_CONCURRENCY", "8"))
+
+WRITE_INTENTS = frozenset(
+    {
+        "assign_vehicle_to_trip",
+        "remove_vehicle_from_trip",
+        "create_stop",
+        "create_path",
+        "create_route",
+        "update_route_status",
+    }
+)
+# Intents that return whole tables; everything else (point lookups, journeys,
+# free text) is interactive.
+BULK_INTENTS = frozenset(
+    {"list_daily_trips", "list_deployments", "list_unassigned_vehicles", "list_available_drivers"}
+)
+
+
+@dataclass
+class IntentClass:
+    name: str
+    priority: int  # lower runs first
+    max_concurrency: int
+    max_queue: int
+    budget_seconds: float  # longest a request may wait for a slot
+    queue: Deque["_Ticket"] = field(default_factory=deque)
+    active: int = 0
+    service_seconds: float = 0.05  # EWMA of slot hold time
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, intent_class: str, reason: str, retry_after: int):
+        super().__init__(f"Agent is overloaded ({intent_class}: {reason}); retry in {retry_after}s.")
+        self.intent_class = intent_class
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("intent_class", "loop", "future", "granted", "granted_at")
+
+    def __init__(self, intent_class: IntentClass, loop: asyncio.AbstractEventLoop):
+        self.intent_class = intent_class
+        self.loop = loop
+        self.future: "asyncio.Future[None]" = loop.create_future()
+        self.granted = False
+        self.granted_at = 0.0
+
+    def wake(self) -> None:
+        """Resolve the waiter's future on its own loop (grants can come from another loop's thread)."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            _resolve(self.future)
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Slot:
+    """A granted admission; ``release()`` it when the request is done."""
+
+    def __init__(self, controller: "AdmissionController", ticket: _Ticket):
+        self._controller = controller
+        self._ticket: Optional[_Ticket] = ticket
+
+    @property
+    def intent_class(self) -> str:
+        return self._ticket.intent_class.name if self._ticket else ""
+
+    def release(self) -> None:
+        if self._ticket is not None:
+            self._controller._release(self._ticket)
+            self._ticket = None
+
+
+def default_classes(max_concurrency: int = MAX_CONCURRENCY) -> List[IntentClass]:
+    return [
+        IntentClass("write", 0, max_concurrency, max_queue=256, budget_seconds=5.0),
+        IntentClass("interactive", 1, max(1, max_concurrency * 3 // 4), max_queue=128, budget_seconds=2.0),
+        IntentClass("bulk", 2, max(1, max_concurrency // 2), max_queue=64, budget_seconds=1.0),
+    ]
+
+
+class AdmissionController:
+    """Priority admission for agent requests.
+
+    Normally every call comes from the worker's single event loop, but the state is
+    guarded by a lock and grants are delivered with ``call_soon_threadsafe`` so
+    callers on other loops (test clients, embedded servers) are woken too.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, classes: Optional[List[IntentClass]] = None):
+        self.max_concurrency = max_concurrency
+        self.classes: Dict[str, IntentClass] = {
+            intent_class.name: intent_class for intent_class in (classes or default_classes(max_concurrency))
+        }
+        self._by_priority = sorted(self.classes.values(), key=lambda intent_class: intent_class.priority)
+        self.active = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(intent: str) -> str:
+        if intent in WRITE_INTENTS:
+            return "write"
+        if intent in BULK_INTENTS:
+            return "bulk"
+        return "interactive"
+
+    async def acquire(self, intent: str) -> Slot:
+        intent_class = self.classes[self.classify(intent)]
+        ticket = _Ticket(intent_class, asyncio.get_running_loop())
+        with self._lock:
+            if len(intent_class.queue) >= intent_class.max_queue:
+                self._reject(intent_class, "queue full", self._expected_wait(intent_class))
+            expected = self._expected_wait(intent_class)
+            if expected > intent_class.budget_seconds:
+                self._reject(intent_class, "expected wait over budget", expected)
+            intent_class.queue.append(ticket)
+            granted = self._dispatch()
+        for other in granted:
+            other.wake()
+        if not ticket.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future), intent_class.budget_seconds)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if not ticket.granted:
+                        intent_class.queue.remove(ticket)
+                        intent_class.timed_out += 1
+                        self._reject(intent_class, "waited too long", self._expected_wait(intent_class), count=False)
+            except asyncio.CancelledError:  # client went away while queued
+                with self._lock:
+                    if not ticket.granted:
+                        intent_class.queue.remove(ticket)
+                        raise
+                self._release(ticket)
+                raise
+        with self._lock:
+            intent_class.admitted += 1
+        return Slot(self, ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queued": sum(len(intent_class.queue) for intent_class in self._by_priority),
+            "classes": {
+                intent_class.name: {
+                    "active": intent_class.active,
+                    "queued": len(intent_class.queue),
+                    "max_concurrency": intent_class.max_concurrency,
+                    "max_queue": intent_class.max_queue,
+                    "budget_seconds": intent_class.budget_seconds,
+                    "service_ms": round(intent_class.service_seconds * 1000, 2),
+                    "admitted": intent_class.admitted,
+                    "rejected": intent_class.rejected,
+                    "timed_out": intent_class.timed_out,
+                }
+                for intent_class in self._by_priority
+            },
+        }
+
+    # Scheduling -----------------------------------------------------------
+    def _dispatch(self) -> List[_Ticket]:
+        """Hand free slots to waiting tickets, highest priority class first; caller holds the lock.
+
+        Returns the granted tickets; the caller wakes them after releasing the lock.
+        """
+        granted: List[_Ticket] = []
+        for intent_class in self._by_priority:
+            queue = intent_class.queue
+            while queue and self.active < self.max_concurrency and intent_class.active < intent_class.max_concurrency:
+                ticket = queue.popleft()
+                self.active += 1
+                intent_class.active += 1
+                ticket.granted = True
+                ticket.granted_at = time.perf_counter()
+                granted.append(ticket)
+        return granted
+
+    def _release(self, ticket: _Ticket) -> None:
+        intent_class = ticket.intent_class
+        with self._lock:
+            self.active -= 1
+            intent_class.active -= 1
+            held = time.perf_counter() - ticket.granted_at
+            intent_class.service_seconds += 0.2 * (held - intent_class.service_seconds)
+            granted = self._dispatch()
+        for other in granted:
+            other.wake()
+
+    def _expected_wait(self, intent_class: IntentClass) -> float:
+        """Rough time until a new request of ``intent_class`` would get a slot."""
+        if (
+            not intent_class.queue
+            and self.active < self.max_concurrency
+            and intent_class.active < intent_class.max_concurrency
+        ):
+            return 0.0
+        ahead = sum(
+            len(other.queue) for other in self._by_priority if other.priority <= intent_class.priority
+        )
+        slots = min(intent_class.max_concurrency, self.max_concurrency)
+        return (ahead + 1) * intent_class.service_seconds / slots
+
+    def _reject(self, intent_class: IntentClass, reason: str, expected_wait: float, count: bool = True) -> None:
+        if count:
+            intent_class.rejected += 1
+        raise AdmissionRejected(intent_class.name, reason, max(1, math.ceil(expected_wait)))
+
+
+_admission_controller: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission_controller
+    if _admission_controller is None:
+        with _admission_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController()
+    return _admission_controller
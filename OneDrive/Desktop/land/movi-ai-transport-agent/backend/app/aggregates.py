@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from .models import DailyTrip, Deployment, Driver, Vehicle
+
+# Tables whose rows feed the counters; a write to any of them by another process
+# invalidates the aggregates (see change_feed.py).
+AGGREGATE_TABLES = frozenset(model.__tablename__ for model in (DailyTrip, Deployment, Driver, Vehicle))
+
+
+class DashboardAggregates:
+    """Dashboard counters kept current by the crud mutators instead of recomputed per read.
+
+    The first read (or any read after ``invalidate``) rebuilds everything with a
+    handful of GROUP BY queries; from then on mutators apply small deltas and
+    ``summary`` only formats the counters. A delta that cannot be applied exactly
+    (e.g. a deployment for a vehicle the aggregates have never seen) invalidates
+    the state so the next read rebuilds it.
+
+    A mutator takes ``generation()`` before it commits and passes it with its
+    delta. If a rebuild finished in between, the rebuild may already include the
+    write, so the delta invalidates instead of being counted twice.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._built = False
+        self._generation = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._trips_by_status: Counter = Counter()
+        self._booking_total = 0
+        # vehicle_id -> (type, capacity, is_active)
+        self._vehicles: Dict[int, Tuple[str, int, bool]] = {}
+        self._vehicle_deployments: Counter = Counter()
+        self._deployments = 0
+        self._active_vehicles = 0
+        self._type_totals: Dict[str, Counter] = {}
+        self._drivers: Set[int] = set()
+        self._driver_deployments: Counter = Counter()
+        self._drivers_deployed = 0
+
+    # Building -------------------------------------------------------------
+    def rebuild(self, session: Session) -> None:
+        with self._lock:
+            self._load(session)
+
+    def _load(self, session: Session) -> None:
+        self._reset()
+        for status, count, booking in session.exec(
+            select(DailyTrip.live_status, func.count(), func.coalesce(func.sum(DailyTrip.booking_status_percentage), 0))
+            .group_by(DailyTrip.live_status)
+        ).all():
+            self._trips_by_status[status] = count
+            self._booking_total += booking
+        for vehicle_id, vehicle_type, capacity, is_active in session.exec(
+            select(Vehicle.vehicle_id, Vehicle.type, Vehicle.capacity, Vehicle.is_active)
+        ).all():
+            self._add_vehicle(vehicle_id, vehicle_type, capacity, bool(is_active))
+        self._drivers = set(session.exec(select(Driver.driver_id)).all())
+        for vehicle_id, driver_id in session.exec(select(Deployment.vehicle_id, Deployment.driver_id)).all():
+            self._apply_deployment(vehicle_id, driver_id, +1)
+        self._built = True
+        self._generation += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built = False
+
+    def generation(self) -> int:
+        """Token a mutator takes before committing and hands back with its delta."""
+        with self._lock:
+            return self._generation
+
+    # Deltas ---------------------------------------------------------------
+    def _add_vehicle(self, vehicle_id: int, vehicle_type: str, capacity: int, is_active: bool) -> None:
+        self._vehicles[vehicle_id] = (vehicle_type, capacity, is_active)
+        totals = self._type_totals.setdefault(vehicle_type, Counter())
+        totals["total"] += 1
+        totals["total_capacity"] += capacity
+        if is_active:
+            totals["idle"] += 1
+            self._active_vehicles += 1
+
+    def _apply_deployment(self, vehicle_id: int, driver_id: int, sign: int) -> bool:
+        vehicle = self._vehicles.get(vehicle_id)
+        if vehicle is None:
+            return False
+        before = self._vehicle_deployments[vehicle_id]
+        after = before + sign
+        if after < 0:
+            return False
+        self._vehicle_deployments[vehicle_id] = after
+        self._deployments += sign
+        if (before == 0) != (after == 0):
+            totals = self._type_totals[vehicle[0]]
+            step = 1 if after else -1
+            totals["deployed"] += step
+            totals["deployed_capacity"] += step * vehicle[1]
+            if vehicle[2]:
+                totals["idle"] -= step
+        driver_before = self._driver_deployments[driver_id]
+        driver_after = driver_before + sign
+        if driver_after > 0:
+            self._driver_deployments[driver_id] = driver_after
+        else:
+            self._driver_deployments.pop(driver_id, None)
+        if driver_id in self._drivers and (driver_before == 0) != (driver_after <= 0):
+            self._drivers_deployed += 1 if driver_after > 0 else -1
+        return True
+
+    def _applicable(self, generation: int) -> bool:
+        """Whether a delta taken at ``generation`` applies; caller holds the lock.
+
+        After a rebuild that may or may not have seen the write, the only safe
+        answer is a fresh rebuild.
+        """
+        if not self._built:
+            return False
+        if generation != self._generation:
+            self._built = False
+            return False
+        return True
+
+    def deployment_added(self, vehicle_id: int, driver_id: int, generation: int) -> None:
+        self._deployment_delta(vehicle_id, driver_id, +1, generation)
+
+    def deployment_removed(self, vehicle_id: int, driver_id: int, generation: int) -> None:
+        self._deployment_delta(vehicle_id, driver_id, -1, generation)
+
+    def _deployment_delta(self, vehicle_id: int, driver_id: int, sign: int, generation: int) -> None:
+        with self._lock:
+            if self._applicable(generation) and not self._apply_deployment(vehicle_id, driver_id, sign):
+                self._built = False
+
+    def trips_added(
+        self, count: int, generation: int, live_status: str = "Scheduled", booking_total: int = 0
+    ) -> None:
+        with self._lock:
+            if self._applicable(generation):
+                self._trips_by_status[live_status] += count
+                self._booking_total += booking_total
+
+    def trip_changed(
+        self, old_status: str, new_status: str, old_booking: int, new_booking: int, generation: int
+    ) -> None:
+        with self._lock:
+            if not self._applicable(generation):
+                return
+            if old_status != new_status:
+                self._trips_by_status[old_status] -= 1
+                if self._trips_by_status[old_status] <= 0:
+                    del self._trips_by_status[old_status]
+                self._trips_by_status[new_status] += 1
+            self._booking_total += new_booking - old_booking
+
+    # Reads ----------------------------------------------------------------
+    def summary(self, session: Optional[Session] = None) -> Dict[str, Any]:
+        with self._lock:
+            if not self._built:
+                if session is None:
+                    raise RuntimeError("Dashboard aggregates are not built; pass a session to rebuild them.")
+                self._load(session)
+            return self._format()
+
+    def _format(self) -> Dict[str, Any]:
+        total_trips = sum(self._trips_by_status.values())
+        by_type = []
+        deployed = idle = 0
+        for vehicle_type in sorted(self._type_totals):
+            totals = self._type_totals[vehicle_type]
+            deployed += totals["deployed"]
+            idle += totals["idle"]
+            by_type.append(
+                {
+                    "type": vehicle_type,
+                    "total": totals["total"],
+                    "deployed": totals["deployed"],
+                    "idle": totals["idle"],
+                    "total_capacity": totals["total_capacity"],
+                    "deployed_capacity": totals["deployed_capacity"],
+                }
+            )
+        return {
+            "total_trips": total_trips,
+            "trips_by_status": dict(sorted(self._trips_by_status.items())),
+            "total_booking_percentage": self._booking_total,
+            "average_booking_percentage": round(self._booking_total / total_trips, 2) if total_trips else 0.0,
+            "vehicles_deployed": deployed,
+            "vehicles_idle": idle,
+            "vehicles_by_type": by_type,
+            "active_vehicles": self._active_vehicles,
+            "deployments": self._deployments,
+            "available_drivers": len(self._drivers) - self._drivers_deployed,
+        }
+
+    def verify(self, session: Session) -> Dict[str, Any]:
+        """Compare the incremental counters with a from-scratch rebuild."""
+        incremental = self.summary(session)
+        fresh = DashboardAggregates()
+        fresh.rebuild(session)
+        rebuilt = fresh.summary()
+        return {"consistent": incremental == rebuilt, "incremental": incremental, "rebuilt": rebuilt}
+
+
+dashboard_aggregates = DashboardAggregates()
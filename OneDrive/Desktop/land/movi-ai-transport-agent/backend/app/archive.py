@@ -0,0 +1,297 @@
+"""Move finished trips and their deployments out of the hot tables.
+
+Trips whose ``live_status`` is final and whose ``scheduled_start`` is older than
+the retention horizon are moved, with their deployments, into per-month archive
+tables (``dailytrip_archive_YYYYMM`` / ``deployment_archive_YYYYMM``) in the same
+database. ``dailytrip`` and ``deployment`` then only hold the working set, so the
+"current" queries (unassigned vehicles, available drivers, trip lists, name
+lookups) stop paying for all of history. Reads that need history pass
+``include_archived=True``.
+
+Archived rows keep their ids, so ``dailytrip`` and ``deployment`` use SQLite
+``AUTOINCREMENT``: ``init_db`` calls ``ensure_id_sequences``, which rebuilds
+older databases created without it and seeds ``sqlite_sequence`` with the
+highest id ever handed out, archives included.
+
+Run as a CLI from the repository root::
+
+    python -m backend.app.archive --horizon-days 30
+
+or periodically from the API process with ``start_archiver_thread``.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, SQLModel, select
+
+from .aggregates import dashboard_aggregates
+from .models import DailyTrip, Deployment, TripPosition
+from .versions import mark_changed
+
+logger = logging.getLogger(__name__)
+
+FINAL_TRIP_STATUSES = ("Completed", "Cancelled")
+DEFAULT_HORIZON_DAYS = int(os.environ.get("MOVI_ARCHIVE_HORIZON_DAYS", "30"))
+DEFAULT_CHUNK_SIZE = 5_000
+
+ArchiveFilter = Callable[[Table], Sequence[Any]]
+
+_metadata = MetaData()
+_metadata_lock = threading.Lock()
+
+
+def _archive_prefix(model: Type[SQLModel]) -> str:
+    return f"{model.__tablename__}_archive_"
+
+
+def archive_table(model: Type[SQLModel], month: str) -> Table:
+    """The archive table of ``model`` for ``month`` (``YYYYMM``): same columns, no FKs."""
+    name = f"{_archive_prefix(model)}{month}"
+    with _metadata_lock:
+        table = _metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name,
+                _metadata,
+                *(Column(column.name, column.type, primary_key=column.primary_key) for column in model.__table__.columns),
+            )
+    return table
+
+
+def archive_months(connection: Connection, model: Type[SQLModel]) -> List[str]:
+    prefix = _archive_prefix(model)
+    pattern = re.compile(rf"^{prefix}(\d{{6}})$")
+    names = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?", (f"{prefix}%",)
+    ).scalars()
+    return sorted(match.group(1) for name in names if (match := pattern.match(name)))
+
+
+# Id sequences -----------------------------------------------------------------
+def _has_autoincrement(connection: Connection, name: str) -> bool:
+    sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).scalar()
+    return sql is not None and "AUTOINCREMENT" in sql.upper()
+
+
+def _rebuild_with_autoincrement(connection: Connection, model: Type[SQLModel]) -> None:
+    """Recreate ``model``'s table from its (AUTOINCREMENT) definition, keeping rows and indexes."""
+    name = model.__tablename__
+    staging = f"{name}_rebuild"
+    create = str(CreateTable(model.__table__).compile(dialect=connection.dialect))
+    extras = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (name,),
+    ).scalars().all()
+    columns = ", ".join(column.name for column in model.__table__.columns)
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {staging}")
+    connection.exec_driver_sql(create.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {staging} ", 1))
+    connection.exec_driver_sql(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {name}")
+    connection.exec_driver_sql(f"DROP TABLE {name}")
+    connection.exec_driver_sql(f"ALTER TABLE {staging} RENAME TO {name}")
+    for sql in extras:
+        connection.exec_driver_sql(sql)
+
+
+def ensure_id_sequences(connection: Connection) -> Dict[str, int]:
+    """Make ``dailytrip``/``deployment`` ids monotonic; returns each table's high-water mark.
+
+    Without ``AUTOINCREMENT`` SQLite hands out ``max(rowid) + 1``, so archiving or
+    deleting the newest row lets the next insert reuse an id that is already in
+    an archive table.
+    """
+    marks: Dict[str, int] = {}
+    for model in (DailyTrip, Deployment):
+        name = model.__tablename__
+        if not _has_autoincrement(connection, name):
+            _rebuild_with_autoincrement(connection, model)
+        key = model.__table__.primary_key.columns.values()[0].name
+        highest = [connection.exec_driver_sql(f"SELECT max({key}) FROM {name}").scalar() or 0]
+        for month in archive_months(connection, model):
+            table = archive_table(model, month).name
+            highest.append(connection.exec_driver_sql(f"SELECT max({key}) FROM {table}").scalar() or 0)
+        seq = connection.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (name,)).scalar()
+        mark = max(highest + [seq or 0])
+        if seq is None:
+            connection.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, mark))
+        elif mark > seq:
+            connection.exec_driver_sql("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (mark, name))
+        marks[name] = mark
+    return marks
+
+
+# Reads ------------------------------------------------------------------------
+def find_archived(
+    session: Session,
+    model: Type[SQLModel],
+    where: Optional[ArchiveFilter] = None,
+) -> List[Any]:
+    """Archived rows of ``model`` as detached model instances, oldest month first."""
+    found: List[Any] = []
+    for month in archive_months(session.connection(), model):
+        table = archive_table(model, month)
+        statement = select(table)
+        if where is not None:
+            statement = statement.where(*where(table))
+        found.extend(model(**row) for row in session.execute(statement).mappings())
+    return found
+
+
+def fetch_archived_dicts(
+    session: Session,
+    schema: Type[BaseModel],
+    model: Type[SQLModel],
+    where: Optional[ArchiveFilter] = None,
+) -> List[Dict[str, Any]]:
+    """Like ``fast_json.fetch_dicts`` but over the archive tables of ``model``."""
+    names = list(schema.model_fields)
+    rows: List[Dict[str, Any]] = []
+    for month in archive_months(session.connection(), model):
+        table = archive_table(model, month)
+        statement = select(*(table.c[name] for name in names))
+        if where is not None:
+            statement = statement.where(*where(table))
+        rows.extend(dict(zip(names, row)) for row in session.execute(statement))
+    return rows
+
+
+# Archival ---------------------------------------------------------------------
+def _move(connection: Connection, model: Type[SQLModel], month: str) -> int:
+    """Copy ``model`` rows of the trips in ``temp.movi_archive_ids`` to ``month`` and delete them."""
+    table = archive_table(model, month)
+    table.create(connection, checkfirst=True)
+    columns = ", ".join(column.name for column in table.columns)
+    source = model.__tablename__
+    where = "WHERE trip_id IN (SELECT trip_id FROM temp.movi_archive_ids)"
+    connection.exec_driver_sql(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {source} {where}")
+    return connection.exec_driver_sql(f"DELETE FROM {source} {where}").rowcount
+
+
+def archive_completed(
+    session: Session,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    now: Optional[datetime] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Archive finished trips scheduled more than ``horizon_days`` ago, with their deployments.
+
+    Works in chunks of ``chunk_size`` trips, each in its own transaction. Relies on
+    ``ensure_id_sequences`` (run by ``init_db``) so that moved ids are never reused.
+    """
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=horizon_days)).isoformat(sep=" ", timespec="microseconds")
+    trips_table, deployments_table = DailyTrip.__tablename__, Deployment.__tablename__
+    placeholders = ", ".join("?" * len(FINAL_TRIP_STATUSES))
+    candidates = (
+        f"SELECT trip_id, substr(scheduled_start, 1, 4) || substr(scheduled_start, 6, 2) FROM {trips_table} "
+        f"WHERE live_status IN ({placeholders}) AND scheduled_start < ? "
+        "LIMIT ?"
+    )
+    trips_by_month: Counter = Counter()
+    deployments_by_month: Counter = Counter()
+    while True:
+        connection = session.connection()
+        rows = connection.exec_driver_sql(candidates, (*FINAL_TRIP_STATUSES, cutoff, chunk_size)).all()
+        if not rows:
+            break
+        by_month: Dict[str, List[int]] = {}
+        for trip_id, month in rows:
+            by_month.setdefault(month, []).append(trip_id)
+        connection.exec_driver_sql("CREATE TEMP TABLE IF NOT EXISTS movi_archive_ids (trip_id INTEGER PRIMARY KEY)")
+        has_positions = bool(
+            connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TripPosition.__tablename__,)
+            ).first()
+        )
+        for month, trip_ids in by_month.items():
+            connection.exec_driver_sql("DELETE FROM temp.movi_archive_ids")
+            connection.exec_driver_sql(
+                "INSERT INTO temp.movi_archive_ids (trip_id) VALUES (?)", [(trip_id,) for trip_id in trip_ids]
+            )
+            deployments_by_month[month] += _move(connection, Deployment, month)
+            trips_by_month[month] += _move(connection, DailyTrip, month)
+            if has_positions:
+                connection.exec_driver_sql(
+                    f"DELETE FROM {TripPosition.__tablename__} "
+                    "WHERE trip_id IN (SELECT trip_id FROM temp.movi_archive_ids)"
+                )
+        mark_changed(session, trips_table, deployments_table, TripPosition.__tablename__)
+        session.commit()
+        # Archived trips and deployments leave the dashboard's working set.
+        dashboard_aggregates.invalidate()
+        if len(rows) < chunk_size:
+            break
+    return {
+        "cutoff": cutoff,
+        "trips": sum(trips_by_month.values()),
+        "deployments": sum(deployments_by_month.values()),
+        "months": {
+            month: {"trips": trips_by_month[month], "deployments": deployments_by_month[month]}
+            for month in sorted(trips_by_month)
+        },
+    }
+
+
+def start_archiver_thread(
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    interval_seconds: float = 3600.0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stop: Optional[threading.Event] = None,
+) -> threading.Thread:
+    """Run ``archive_completed`` every ``interval_seconds`` on a daemon thread until ``stop`` is set.
+
+    A failed pass is logged and retried on the next tick instead of ending the thread.
+    """
+    from .database import engine
+
+    stop = stop or threading.Event()
+
+    def run() -> None:
+        while not stop.is_set():
+            try:
+                with Session(engine) as session:
+                    archive_completed(session, horizon_days, chunk_size=chunk_size)
+            except Exception:  # keep archiving; the next pass picks up what this one missed
+                logger.exception("Archive pass failed")
+            stop.wait(interval_seconds)
+
+    thread = threading.Thread(target=run, name="movi-archiver", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move finished trips and their deployments to monthly archive tables.")
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from .database import engine, init_db
+
+    init_db()
+    started = time.perf_counter()
+    with Session(engine) as session:
+        report = archive_completed(session, args.horizon_days, chunk_size=args.chunk_size)
+    print(
+        f"Archived {report['trips']} trips and {report['deployments']} deployments "
+        f"scheduled before {report['cutoff']} in {time.perf_counter() - started:.2f}s"
+    )
+    for month, counts in report["months"].items():
+        print(f"  {month}: {counts['trips']} trips, {counts['deployments']} deployments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Cross-process cache coherence for multi-worker deployments.
+
+Every writing transaction advances a per-table sequence in the shared
+``movi_change_seq`` table (see ``versions.record_changes``). Each worker runs a
+:class:`ChangeFeed` that polls ``PRAGMA data_version`` on a dedicated connection.
+The pragma is answered from the pager without reading any table and only moves
+when some *other* connection committed, so an idle poll costs microseconds. When
+it moves, the feed reads the sequence table and bumps only the tables whose
+sequence is ahead of what this process already accounted for. That invalidates
+the intent result cache, the stop network and the gazetteer through
+``table_versions``, and the dashboard aggregates directly.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from .aggregates import AGGREGATE_TABLES, dashboard_aggregates
+from .versions import CHANGE_FEED_ENABLED, CHANGE_TABLE, table_versions
+
+DEFAULT_POLL_INTERVAL = float(os.environ.get("MOVI_CHANGE_POLL_INTERVAL", "0.1"))
+
+
+class ChangeFeed:
+    """Polls the shared change sequence and replays remote writes into ``table_versions``."""
+
+    def __init__(self, engine: Engine, interval: float = DEFAULT_POLL_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._connection: Any = None
+        self._data_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.metrics: Dict[str, Any] = {"polls": 0, "changes": 0, "tables_bumped": 0, "errors": 0, "last_error": None}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.poll()  # adopt the current sequences without invalidating anything
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="movi-change-feed", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 2.0) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+        self._thread = None
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.metrics, "data_version": self._data_version, "running": self._thread is not None}
+
+    def poll(self) -> Set[str]:
+        """Check once for writes by other processes; returns the tables that were bumped."""
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.engine.raw_connection()
+            cursor = self._connection.cursor()
+            try:
+                data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+                self.metrics["polls"] += 1
+                if data_version == self._data_version:
+                    return set()
+                first = self._data_version is None
+                self._data_version = data_version
+                try:
+                    seqs = dict(cursor.execute(f"SELECT table_name, seq FROM {CHANGE_TABLE}").fetchall())
+                except Exception:  # the table appears with the first recorded write
+                    seqs = {}
+            finally:
+                cursor.close()
+        changed = table_versions.observe(seqs)
+        if first or not changed:
+            return set()
+        table_versions.bump(*changed)
+        if changed & AGGREGATE_TABLES:
+            dashboard_aggregates.invalidate()
+        self.metrics["changes"] += 1
+        self.metrics["tables_bumped"] += len(changed)
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except DBAPIError as exc:  # e.g. a locked database; try again next tick
+                self.metrics["errors"] += 1
+                self.metrics["last_error"] = repr(exc)
+
+
+_change_feed: Optional[ChangeFeed] = None
+_change_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> ChangeFeed:
+    global _change_feed
+    if _change_feed is None:
+        with _change_feed_lock:
+            if _change_feed is None:
+                from .database import engine
+
+                _change_feed = ChangeFeed(engine)
+    return _change_feed
+
+
+def start_change_feed() -> Optional[ChangeFeed]:
+    """Start this process's feed unless ``MOVI_CHANGE_FEED=0``."""
+    if not CHANGE_FEED_ENABLED:
+        return None
+    feed = get_change_feed()
+    feed.start()
+    return feed
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 from typing import Iterable, List, Optional
 
-from sqlmodel import Session, select
+from sqlmodel import Session, and_, select
 
+from . import archive
+from .aggregates import dashboard_aggregates
 from .models import DailyTrip, Deployment, Driver, Path, Route, Stop, Vehicle
 
 
@@ -16,6 +18,14 @@ def get_stop_by_name(session: Session, name: str) -> Optional[Stop]:
     return session.exec(select(Stop).where(Stop.name == name)).first()
 
 
+def list_stops_by_ids(session: Session, stop_ids: List[int]) -> List[Stop]:
+    """Fetch ``stop_ids`` in one query, returned in the given order (missing ids skipped)."""
+    if not stop_ids:
+        return []
+    by_id = {stop.stop_id: stop for stop in session.exec(select(Stop).where(Stop.stop_id.in_(stop_ids))).all()}
+    return [by_id[stop_id] for stop_id in stop_ids if stop_id in by_id]
+
+
 def create_stop(session: Session, name: str, latitude: float, longitude: float) -> Stop:
     stop = Stop(name=name, latitude=latitude, longitude=longitude)
     session.add(stop)
@@ -47,6 +57,10 @@ def list_routes(session: Session) -> List[Route]:
     return session.exec(select(Route)).all()
 
 
+def list_routes_by_ids(session: Session, route_ids: Iterable[int]) -> List[Route]:
+    return session.exec(select(Route).where(Route.route_id.in_(list(route_ids)))).all()
+
+
 def list_routes_using_path(session: Session, path_id: int) -> List[Route]:
     return session.exec(select(Route).where(Route.path_id == path_id)).all()
 
@@ -92,45 +106,60 @@ def list_vehicles(session: Session) -> List[Vehicle]:
     return session.exec(select(Vehicle)).all()
 
 
+def unassigned_vehicles_clause():
+    """Idle vehicles: active and on no deployment, as counted by the dashboard."""
+    return and_(Vehicle.is_active, Vehicle.vehicle_id.not_in(select(Deployment.vehicle_id)))
+
+
 def list_unassigned_vehicles(session: Session) -> List[Vehicle]:
-    assigned_ids = {
-        deployment.vehicle_id for deployment in session.exec(select(Deployment)).all()
-    }
-    return [vehicle for vehicle in list_vehicles(session) if vehicle.vehicle_id not in assigned_ids]
+    return session.exec(select(Vehicle).where(unassigned_vehicles_clause())).all()
 
 
 # Drivers ---------------------------------------------------------------------
+def available_drivers_clause():
+    return Driver.driver_id.not_in(select(Deployment.driver_id))
+
+
 def list_available_drivers(session: Session) -> List[Driver]:
-    assigned = {
-        deployment.driver_id for deployment in session.exec(select(Deployment)).all()
-    }
-    return [driver for driver in session.exec(select(Driver)).all() if driver.driver_id not in assigned]
+    return session.exec(select(Driver).where(available_drivers_clause())).all()
 
 
 # Trips -----------------------------------------------------------------------
-def list_daily_trips(session: Session) -> List[DailyTrip]:
-    return session.exec(select(DailyTrip)).all()
+def list_daily_trips(session: Session, include_archived: bool = False) -> List[DailyTrip]:
+    trips = session.exec(select(DailyTrip)).all()
+    if include_archived:
+        return archive.find_archived(session, DailyTrip) + list(trips)
+    return trips
 
 
-def get_trip_by_name(session: Session, display_name: str) -> Optional[DailyTrip]:
-    return session.exec(select(DailyTrip).where(DailyTrip.display_name == display_name)).first()
+def get_trip_by_name(session: Session, display_name: str, include_archived: bool = False) -> Optional[DailyTrip]:
+    trip = session.exec(select(DailyTrip).where(DailyTrip.display_name == display_name)).first()
+    if trip is None and include_archived:
+        archived = archive.find_archived(session, DailyTrip, lambda table: [table.c.display_name == display_name])
+        return archived[-1] if archived else None
+    return trip
 
 
-def get_trip_status(session: Session, display_name: str) -> Optional[str]:
-    trip = get_trip_by_name(session, display_name)
+def get_trip_status(session: Session, display_name: str, include_archived: bool = False) -> Optional[str]:
+    trip = get_trip_by_name(session, display_name, include_archived)
     return trip.live_status if trip else None
 
 
 # Deployments -----------------------------------------------------------------
-def list_deployments(session: Session) -> List[Deployment]:
-    return session.exec(select(Deployment)).all()
+def list_deployments(session: Session, include_archived: bool = False) -> List[Deployment]:
+    deployments = session.exec(select(Deployment)).all()
+    if include_archived:
+        return archive.find_archived(session, Deployment) + list(deployments)
+    return deployments
 
 
 def assign_vehicle_to_trip(session: Session, trip_id: int, vehicle_id: int, driver_id: int) -> Deployment:
     deployment = Deployment(trip_id=trip_id, vehicle_id=vehicle_id, driver_id=driver_id)
     session.add(deployment)
+    generation = dashboard_aggregates.generation()
     session.commit()
     session.refresh(deployment)
+    dashboard_aggregates.deployment_added(deployment.vehicle_id, deployment.driver_id, generation)
     return deployment
 
 
@@ -138,7 +167,10 @@ def remove_vehicle_from_trip(session: Session, trip_id: int) -> bool:
     deployment = session.exec(select(Deployment).where(Deployment.trip_id == trip_id)).first()
     if deployment is None:
         return False
+    vehicle_id, driver_id = deployment.vehicle_id, deployment.driver_id
     session.delete(deployment)
+    generation = dashboard_aggregates.generation()
     session.commit()
+    dashboard_aggregates.deployment_removed(vehicle_id, driver_id, generation)
     return True
 
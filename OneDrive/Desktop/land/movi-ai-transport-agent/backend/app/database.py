@@ -1,26 +1,73 @@
 from __future__ import annotations
 
+import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Iterator
 
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, SQLModel, create_engine
 
+from . import versions  # registers the commit hooks behind table_versions
+
 DB_PATH = Path(__file__).resolve().parents[1] / "db" / "movi.db"
 DB_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(DB_URL, echo=False, connect_args={"check_same_thread": False})
+_engine_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "connect")
+def _configure_sqlite(dbapi_connection: Any, connection_record: Any) -> None:
+    """WAL for every SQLite connection, including swapped-in replica engines.
+
+    Readers then never wait behind the telemetry and materializer bulk writes.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+def get_engine() -> Engine:
+    """The process-wide engine, created on first use.
+
+    ``database.engine`` keeps working (it resolves through the module
+    ``__getattr__`` below), and assigning it swaps the engine, e.g. for a copy of
+    the database in scripts.
+    """
+    engine = globals().get("engine")
+    if engine is None:
+        with _engine_lock:
+            engine = globals().get("engine")
+            if engine is None:
+                engine = create_engine(DB_URL, echo=False, connect_args={"check_same_thread": False})
+                globals()["engine"] = engine
+    return engine
+
+
+def __getattr__(name: str) -> Any:
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def init_db() -> None:
     from . import models  # noqa: F401
+    from .archive import ensure_id_sequences
 
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    engine = get_engine()
     SQLModel.metadata.create_all(engine)
+    versions.ensure_change_table(engine)
+    with engine.begin() as connection:
+        ensure_id_sequences(connection)
 
 
 @contextmanager
 def get_session() -> Iterator[Session]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
 
@@ -1,25 +1,40 @@
 from __future__ import annotations
 
+import os
 import re
-import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, Callable, List, Optional
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, FastAPI, File, HTTPException, Query, Response, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
-from . import crud
+from . import archive, crud, fast_json, traffic
+from .admission import AdmissionRejected, get_admission_controller
+from .aggregates import dashboard_aggregates
+from .change_feed import start_change_feed
 from .database import get_session, init_db
 from .dependencies import session_dependency
+from .models import DailyTrip, Deployment, Driver, Path as PathModel, Route, Stop, TripPosition, Vehicle
+from .network import DEFAULT_TRANSFER_PENALTY_KM, get_network
+from .seed_data import seed
+from .telemetry import get_telemetry_ingestor, read_history
+from .warmup import WarmupStep, readiness
 from .schemas import (
     AgentActionRequest,
     AgentActionResponse,
     AssignVehicleRequest,
     ConsequenceCheckResult,
     DailyTripRead,
+    DashboardSummary,
+    DashboardSummaryCheck,
     DeploymentRead,
     DriverRead,
+    JourneyPlan,
     PathCreate,
     PathRead,
     RouteCreate,
@@ -27,50 +42,107 @@ from .schemas import (
     RouteUpdateStatus,
     StopCreate,
     StopRead,
+    TelemetryAck,
+    TelemetryBatch,
+    TelemetryEvent,
+    TripPositionRead,
     VehicleRead,
 )
 
-# ✅ Ensure Python can find the project root (for langgraph_agent imports)
-ROOT_DIR = Path(__file__).resolve().parents[2]
-if str(ROOT_DIR) not in sys.path:
-    sys.path.append(str(ROOT_DIR))
+router = APIRouter()
 
 
 # -------------------------------------------------------------------
-# ✅ FastAPI application setup
+# ✅ Startup – initialize and seed DB, then warm caches
 # -------------------------------------------------------------------
-app = FastAPI(title="Movi Backend API", version="0.1.0")
+INIT_DB_ENABLED = os.environ.get("MOVI_INIT_DB", "1") != "0"
+MAX_TELEMETRY_LIMIT = 10_000
 
-# Enable CORS so the frontend (React) can access the backend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
+def _initialize_database() -> None:
+    """Create missing tables and seed sample data into an empty database."""
+    init_db()
+    with get_session() as session:
+        seed(session)
 
-# -------------------------------------------------------------------
-# ✅ Startup event – initialize and seed DB
-# -------------------------------------------------------------------
-@app.on_event("startup")
-def on_startup() -> None:
-    """Initialize the database and seed with sample data."""
-    # Database initialization temporarily disabled
-    # init_db()
-    pass
+
+def _with_session(work: Callable[[Session], object]) -> Callable[[], None]:
+    def step() -> None:
+        with get_session() as session:
+            work(session)
+
+    return step
+
+
+def _import_agent() -> None:
+    from langgraph_agent.graph import get_audit_writer
+
+    get_audit_writer().start()
+
+
+def _load_gazetteer(session: Session) -> None:
+    from langgraph_agent.intent_parser import get_intent_parser
+
+    get_intent_parser().gazetteer.refresh(session)
+
+
+def _run_list_endpoints(session: Session) -> None:
+    for endpoint in WARM_ENDPOINTS:
+        endpoint(session=session)
+
+
+def warmup_steps() -> List[WarmupStep]:
+    return [
+        ("agent_import", _import_agent),
+        ("gazetteer", _with_session(_load_gazetteer)),
+        ("stop_network", _with_session(get_network)),
+        ("dashboard_aggregates", _with_session(dashboard_aggregates.rebuild)),
+        ("list_queries", _with_session(_run_list_endpoints)),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if INIT_DB_ENABLED:
+        await run_in_threadpool(_initialize_database)
+    feed = start_change_feed()
+    ingestor = get_telemetry_ingestor()
+    await run_in_threadpool(ingestor.start)  # creates the position table; keep DDL off the event loop
+    readiness.start(warmup_steps())
+    yield
+    await run_in_threadpool(ingestor.close)
+    if feed is not None:
+        feed.close()
+
+
+@router.get("/health", response_model=dict)
+def health() -> dict:
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@router.get("/ready", response_model=dict)
+def ready(response: Response) -> dict:
+    """Readiness: 503 until the startup warm-up has finished, and for good if a step failed."""
+    status = readiness.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
 
 
 # -------------------------------------------------------------------
 # 🚌 Stops Endpoints
 # -------------------------------------------------------------------
-@app.get("/stops", response_model=List[StopRead])
+@router.get("/stops", response_model=List[StopRead])
 def list_stops(session: Session = Depends(session_dependency)) -> List[StopRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/stops", ("stop",), lambda: fast_json.fetch_dicts(session, StopRead, Stop)
+        )
     return crud.list_stops(session)
 
 
-@app.post("/stops", response_model=StopRead)
+@router.post("/stops", response_model=StopRead)
 def create_stop(payload: StopCreate, session: Session = Depends(session_dependency)) -> StopRead:
     return crud.create_stop(session, payload.name, payload.latitude, payload.longitude)
 
@@ -78,8 +150,17 @@ def create_stop(payload: StopCreate, session: Session = Depends(session_dependen
 # -------------------------------------------------------------------
 # 🗺️ Paths Endpoints
 # -------------------------------------------------------------------
-@app.get("/paths", response_model=List[PathRead])
+def _split_stop_ids(row: dict) -> dict:
+    row["ordered_stop_ids"] = [int(pid) for pid in row["ordered_stop_ids"].split(",") if pid]
+    return row
+
+
+@router.get("/paths", response_model=List[PathRead])
 def list_paths(session: Session = Depends(session_dependency)) -> List[PathRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/paths", ("path",), lambda: fast_json.fetch_dicts(session, PathRead, PathModel, convert=_split_stop_ids)
+        )
     paths = crud.list_paths(session)
     result: List[PathRead] = []
     for path in paths:
@@ -88,7 +169,7 @@ def list_paths(session: Session = Depends(session_dependency)) -> List[PathRead]
     return result
 
 
-@app.post("/paths", response_model=PathRead)
+@router.post("/paths", response_model=PathRead)
 def create_path(payload: PathCreate, session: Session = Depends(session_dependency)) -> PathRead:
     path = crud.create_path(session, payload.path_name, payload.ordered_stop_ids)
     return PathRead(path_id=path.path_id, path_name=path.path_name, ordered_stop_ids=payload.ordered_stop_ids)
@@ -97,12 +178,16 @@ def create_path(payload: PathCreate, session: Session = Depends(session_dependen
 # -------------------------------------------------------------------
 # 🚍 Routes Endpoints
 # -------------------------------------------------------------------
-@app.get("/routes", response_model=List[RouteRead])
+@router.get("/routes", response_model=List[RouteRead])
 def list_routes(session: Session = Depends(session_dependency)) -> List[RouteRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/routes", ("route",), lambda: fast_json.fetch_dicts(session, RouteRead, Route)
+        )
     return crud.list_routes(session)
 
 
-@app.post("/routes", response_model=RouteRead)
+@router.post("/routes", response_model=RouteRead)
 def create_route(payload: RouteCreate, session: Session = Depends(session_dependency)) -> RouteRead:
     return crud.create_route(
         session,
@@ -116,7 +201,7 @@ def create_route(payload: RouteCreate, session: Session = Depends(session_depend
     )
 
 
-@app.patch("/routes/{route_id}/status", response_model=RouteRead)
+@router.patch("/routes/{route_id}/status", response_model=RouteRead)
 def update_route_status(route_id: int, payload: RouteUpdateStatus, session: Session = Depends(session_dependency)) -> RouteRead:
     route = crud.update_route_status(session, route_id, payload.status)
     if not route:
@@ -124,43 +209,108 @@ def update_route_status(route_id: int, payload: RouteUpdateStatus, session: Sess
     return route
 
 
+# -------------------------------------------------------------------
+# 🧭 Network queries
+# -------------------------------------------------------------------
+@router.get("/network/shortest-path", response_model=JourneyPlan)
+def shortest_path(
+    from_stop_id: int,
+    to_stop_id: int,
+    transfer_penalty_km: float = DEFAULT_TRANSFER_PENALTY_KM,
+    session: Session = Depends(session_dependency),
+) -> JourneyPlan:
+    plan = get_network(session).shortest_path(from_stop_id, to_stop_id, transfer_penalty_km)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="No connection between those stops")
+    return plan
+
+
+@router.get("/network/routes-serving", response_model=List[RouteRead])
+def routes_serving(
+    stop_a_id: int,
+    stop_b_id: int,
+    ordered: bool = False,
+    session: Session = Depends(session_dependency),
+) -> List[RouteRead]:
+    route_ids = get_network(session).routes_serving(stop_a_id, stop_b_id, ordered)
+    if not route_ids:
+        return []
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.list_response(session, RouteRead, Route, where=[Route.route_id.in_(route_ids)])
+    return crud.list_routes_by_ids(session, route_ids)
+
+
 # -------------------------------------------------------------------
 # 🚐 Vehicles & Drivers
 # -------------------------------------------------------------------
-@app.get("/vehicles", response_model=List[VehicleRead])
+@router.get("/vehicles", response_model=List[VehicleRead])
 def list_vehicles(session: Session = Depends(session_dependency)) -> List[VehicleRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/vehicles", ("vehicle",), lambda: fast_json.fetch_dicts(session, VehicleRead, Vehicle)
+        )
     return crud.list_vehicles(session)
 
 
-@app.get("/vehicles/unassigned", response_model=List[VehicleRead])
+@router.get("/vehicles/unassigned", response_model=List[VehicleRead])
 def list_unassigned_vehicles(session: Session = Depends(session_dependency)) -> List[VehicleRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/vehicles/unassigned",
+            ("vehicle", "deployment"),
+            lambda: fast_json.fetch_dicts(session, VehicleRead, Vehicle, where=[crud.unassigned_vehicles_clause()]),
+        )
     return crud.list_unassigned_vehicles(session)
 
 
-@app.get("/drivers/available", response_model=List[DriverRead])
+@router.get("/drivers/available", response_model=List[DriverRead])
 def list_available_drivers(session: Session = Depends(session_dependency)) -> List[DriverRead]:
+    if fast_json.FAST_JSON_ENABLED:
+        return fast_json.coalesced_response(
+            "/drivers/available",
+            ("driver", "deployment"),
+            lambda: fast_json.fetch_dicts(session, DriverRead, Driver, where=[crud.available_drivers_clause()]),
+        )
     return crud.list_available_drivers(session)
 
 
 # -------------------------------------------------------------------
 # 📅 Trips & Deployments
 # -------------------------------------------------------------------
-@app.get("/trips", response_model=List[DailyTripRead])
-def list_trips(session: Session = Depends(session_dependency)) -> List[DailyTripRead]:
-    return crud.list_daily_trips(session)
+@router.get("/trips", response_model=List[DailyTripRead])
+def list_trips(include_archived: bool = False, session: Session = Depends(session_dependency)) -> List[DailyTripRead]:
+    if fast_json.FAST_JSON_ENABLED:
+
+        def fetch() -> List[dict]:
+            rows = fast_json.fetch_dicts(session, DailyTripRead, DailyTrip)
+            if include_archived:
+                rows = archive.fetch_archived_dicts(session, DailyTripRead, DailyTrip) + rows
+            return rows
+
+        return fast_json.coalesced_response(("/trips", include_archived), ("dailytrip",), fetch)
+    return crud.list_daily_trips(session, include_archived)
+
+
+@router.get("/deployments", response_model=List[DeploymentRead])
+def list_deployments(include_archived: bool = False, session: Session = Depends(session_dependency)) -> List[DeploymentRead]:
+    if fast_json.FAST_JSON_ENABLED:
 
+        def fetch() -> List[dict]:
+            rows = fast_json.fetch_dicts(session, DeploymentRead, Deployment)
+            if include_archived:
+                rows = archive.fetch_archived_dicts(session, DeploymentRead, Deployment) + rows
+            return rows
 
-@app.get("/deployments", response_model=List[DeploymentRead])
-def list_deployments(session: Session = Depends(session_dependency)) -> List[DeploymentRead]:
-    return crud.list_deployments(session)
+        return fast_json.coalesced_response(("/deployments", include_archived), ("deployment",), fetch)
+    return crud.list_deployments(session, include_archived)
 
 
-@app.post("/deployments/assign", response_model=DeploymentRead)
+@router.post("/deployments/assign", response_model=DeploymentRead)
 def assign_vehicle(payload: AssignVehicleRequest, session: Session = Depends(session_dependency)) -> DeploymentRead:
     return crud.assign_vehicle_to_trip(session, payload.trip_id, payload.vehicle_id, payload.driver_id)
 
 
-@app.delete("/deployments/{trip_id}", response_model=dict)
+@router.delete("/deployments/{trip_id}", response_model=dict)
 def remove_vehicle(trip_id: int, session: Session = Depends(session_dependency)) -> dict:
     removed = crud.remove_vehicle_from_trip(session, trip_id)
     if not removed:
@@ -168,13 +318,107 @@ def remove_vehicle(trip_id: int, session: Session = Depends(session_dependency))
     return {"success": True}
 
 
+# -------------------------------------------------------------------
+# 📡 Live telemetry
+# -------------------------------------------------------------------
+@router.post("/telemetry/events", response_model=TelemetryAck, status_code=202)
+def ingest_telemetry(batch: TelemetryBatch) -> TelemetryAck:
+    """Queue status/GPS events for the next bulk flush; events over capacity are dropped."""
+    return get_telemetry_ingestor().submit_events(batch.events)
+
+
+@router.websocket("/telemetry/ws")
+async def telemetry_socket(websocket: WebSocket) -> None:
+    """Each message is a ``TelemetryBatch`` JSON document, answered with a ``TelemetryAck``."""
+    await websocket.accept()
+    ingestor = get_telemetry_ingestor()
+    await run_in_threadpool(ingestor.start)  # no-op once the lifespan has started it
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                batch = TelemetryBatch.model_validate_json(message)
+            except ValidationError as exc:
+                await websocket.send_json({"error": exc.errors(include_url=False, include_context=False)})
+                continue
+            await websocket.send_json(ingestor.submit_events(batch.events))
+    except WebSocketDisconnect:
+        return
+
+
+@router.get("/telemetry/stats", response_model=dict)
+def telemetry_stats() -> dict:
+    return get_telemetry_ingestor().stats()
+
+
+@router.get("/trips/{trip_id}/position", response_model=TripPositionRead)
+def trip_position(trip_id: int, session: Session = Depends(session_dependency)) -> TripPositionRead:
+    position = session.get(TripPosition, trip_id)
+    if not position:
+        raise HTTPException(status_code=404, detail="No position reported for this trip")
+    return position
+
+
+@router.get("/trips/{trip_id}/telemetry", response_model=List[TelemetryEvent])
+def trip_telemetry(
+    trip_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=MAX_TELEMETRY_LIMIT),
+    session: Session = Depends(session_dependency),
+) -> List[TelemetryEvent]:
+    """Raw pings for a trip from the per-day history tables, oldest first."""
+    return read_history(session.connection(), trip_id, since, until, limit)
+
+
+# -------------------------------------------------------------------
+# 📊 Dashboard
+# -------------------------------------------------------------------
+@router.get("/dashboard/summary", response_model=DashboardSummary)
+def dashboard_summary(session: Session = Depends(session_dependency)) -> DashboardSummary:
+    """Trip, vehicle and driver counters maintained incrementally by the crud mutators."""
+    return dashboard_aggregates.summary(session)
+
+
+@router.get("/dashboard/summary/verify", response_model=DashboardSummaryCheck)
+def verify_dashboard_summary(session: Session = Depends(session_dependency)) -> DashboardSummaryCheck:
+    """Rebuild the aggregates from scratch and compare them with the incremental ones."""
+    return dashboard_aggregates.verify(session)
+
+
 # -------------------------------------------------------------------
 # 🧠 Agent Actions
 # -------------------------------------------------------------------
-@app.post("/agent/action", response_model=AgentActionResponse)
-def agent_action(request: AgentActionRequest, session: Session = Depends(session_dependency)) -> AgentActionResponse:
+@router.post("/agent/action", response_model=AgentActionResponse)
+async def agent_action(request: AgentActionRequest, session: Session = Depends(session_dependency)) -> AgentActionResponse:
+    """Run an agent intent once the admission controller grants it a slot (429 when overloaded)."""
+    try:
+        slot = await get_admission_controller().acquire(request.intent)
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+    try:
+        return await run_in_threadpool(_run_agent_action, request, session)
+    finally:
+        slot.release()
+
+
+@router.get("/agent/admission", response_model=dict)
+def agent_admission_stats() -> dict:
+    """Queue depths, active slots and shed counts per intent class."""
+    return get_admission_controller().stats()
+
+
+@router.get("/agent/audit/stats", response_model=dict)
+def agent_audit_stats() -> dict:
+    """Audit writer queue depth and capacity, plus enqueued, dropped and written counts."""
+    from langgraph_agent.output_writer import get_audit_writer
+
+    return get_audit_writer().stats()
+
+
+def _run_agent_action(request: AgentActionRequest, session: Session) -> AgentActionResponse:
     from langgraph_agent.graph import get_agent
-    
+
     agent = get_agent(session)
     result = agent.handle_action(request.intent, request.parameters, request.context)
     consequence = (
@@ -192,7 +436,7 @@ def agent_action(request: AgentActionRequest, session: Session = Depends(session
 # -------------------------------------------------------------------
 # 🖼️ Vision Endpoint (Mock)
 # -------------------------------------------------------------------
-@app.post("/vision/match")
+@router.post("/vision/match")
 async def analyze_image(session: Session = Depends(session_dependency), file: UploadFile = File(...)) -> dict:
     """Mock endpoint that matches image names to trip names."""
     filename = Path(file.filename).stem
@@ -203,3 +447,41 @@ async def analyze_image(session: Session = Depends(session_dependency), file: Up
         if trip_name_norm in normalized or normalized in trip_name_norm:
             return {"match": trip.display_name, "confidence": 0.75}
     return {"match": None, "confidence": 0.0}
+
+
+# -------------------------------------------------------------------
+# ✅ FastAPI application setup
+# -------------------------------------------------------------------
+# Hot read endpoints run once during warm-up (compiled statements, page cache).
+WARM_ENDPOINTS = (
+    list_stops,
+    list_paths,
+    list_routes,
+    list_vehicles,
+    list_unassigned_vehicles,
+    list_available_drivers,
+    list_trips,
+    list_deployments,
+)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Movi Backend API", version="0.1.0", lifespan=lifespan)
+
+    # Enable CORS so the frontend (React) can access the backend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if traffic.CAPTURE_DIR:
+        app.add_middleware(traffic.TrafficCaptureMiddleware, writer=traffic.capture_writer(traffic.CAPTURE_DIR))
+
+    app.include_router(router)
+    return app
+
+
+app = create_app()
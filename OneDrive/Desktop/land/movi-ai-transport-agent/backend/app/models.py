@@ -47,6 +47,9 @@ class Driver(SQLModel, table=True):
 
 
 class DailyTrip(SQLModel, table=True):
+    # Never reuse an id: archived trips keep theirs (see archive.ensure_id_sequences).
+    __table_args__ = {"sqlite_autoincrement": True}
+
     trip_id: Optional[int] = Field(default=None, primary_key=True)
     route_id: int = Field(foreign_key="route.route_id")
     display_name: str
@@ -56,9 +59,21 @@ class DailyTrip(SQLModel, table=True):
 
 
 class Deployment(SQLModel, table=True):
+    __table_args__ = {"sqlite_autoincrement": True}
+
     deployment_id: Optional[int] = Field(default=None, primary_key=True)
     trip_id: int = Field(foreign_key="dailytrip.trip_id")
     vehicle_id: int = Field(foreign_key="vehicle.vehicle_id")
     driver_id: int = Field(foreign_key="driver.driver_id")
     assigned_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+class TripPosition(SQLModel, table=True):
+    """Latest reported position per trip, upserted by the telemetry pipeline."""
+
+    trip_id: int = Field(foreign_key="dailytrip.trip_id", primary_key=True)
+    vehicle_id: Optional[int] = None
+    latitude: float
+    longitude: float
+    speed_kmh: Optional[float] = None
+    recorded_at: datetime
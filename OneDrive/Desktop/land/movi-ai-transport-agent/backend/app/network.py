@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from array import array
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from .models import Path, Route, Stop
+from .versions import table_versions
+
+INACTIVE_ROUTE_STATUSES = {"Inactive"}
+DEFAULT_TRANSFER_PENALTY_KM = 2.0
+EARTH_RADIUS_KM = 6371.0088
+
+_SOURCE_TABLES = (Stop.__tablename__, Path.__tablename__, Route.__tablename__)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _entry_positions(stops: List[int], first: Dict[int, int]) -> Dict[int, int]:
+    """For each stop, the earliest position a rider boarding there can get to.
+
+    States are (stop, path), so a path that revisits a stop lets a rider continue
+    from any of its occurrences; the reachable positions from a stop are therefore
+    everything from the fixpoint of "earliest occurrence of any stop still ahead".
+    """
+    suffix = [0] * len(stops)
+    running = len(stops)
+    for position in range(len(stops) - 1, -1, -1):
+        running = min(running, first[stops[position]])
+        suffix[position] = running
+    entries: Dict[int, int] = {}
+    for stop_id, position in first.items():
+        reach = suffix[position]
+        while suffix[reach] < reach:
+            reach = suffix[reach]
+        entries[stop_id] = reach
+    return entries
+
+
+class StopNetwork:
+    """Directed stop adjacency graph built from path stop sequences.
+
+    Every consecutive pair of stops on a path served by a non-inactive route is an
+    edge weighted by its great-circle length. Adjacency is stored as CSR arrays
+    (``_offsets``/``_targets``/``_weights``/``_edge_paths``/``_edge_entries``)
+    indexed by dense stop index. When a source table's version moves, that table
+    is reloaded in full and diffed against the current network, so edits and
+    deletes reach the graph too. Edge weights are cached per path and only
+    recomputed for paths whose stop sequence or stop coordinates changed; the CSR
+    arrays are re-packed from those per-path edge lists.
+
+    A published network is never modified: ``get_network`` builds the next
+    version as an extended copy and swaps the module reference, so a query
+    running on a threadpool thread always sees one complete, consistent graph.
+    """
+
+    def __init__(self) -> None:
+        self._seen_versions: Optional[Tuple[int, ...]] = None
+        self._stop_index: Dict[int, int] = {}
+        self._stop_ids = array("q")
+        self._lats = array("d")
+        self._lons = array("d")
+        # unit vectors on the sphere; the chord between two of them (times the
+        # earth radius) never exceeds the great-circle distance, so it is a cheap
+        # admissible A* heuristic
+        self._xs = array("d")
+        self._ys = array("d")
+        self._zs = array("d")
+        self._path_stops: Dict[int, List[int]] = {}
+        self._path_names: Dict[int, str] = {}
+        self._first_positions: Dict[int, Dict[int, int]] = {}
+        self._last_positions: Dict[int, Dict[int, int]] = {}
+        self._entry_positions: Dict[int, Dict[int, int]] = {}
+        # path_id -> (from stop_id, to stop_id, km, entry position) per edge; kept
+        # until the path's stop sequence or one of its stops' coordinates changes
+        self._path_edges: Dict[int, List[Tuple[int, int, float, int]]] = {}
+        self._routes_by_path: Dict[int, List[int]] = {}
+        self._paths_by_stop: Dict[int, FrozenSet[int]] = {}
+        self._offsets = array("q", [0])
+        self._targets = array("q")
+        self._weights = array("d")
+        self._edge_paths = array("q")
+        self._edge_entries = array("q")
+
+    # Building -------------------------------------------------------------
+    def extended(self, session: Session, versions: Tuple[int, ...]) -> "StopNetwork":
+        """A new network reloaded from the tables whose versions moved; ``self`` is untouched."""
+        previous = self._seen_versions or (None,) * len(versions)
+        stops_moved, paths_moved, routes_moved = (seen != version for seen, version in zip(previous, versions))
+        network = self._copy()
+        stale: Set[int] = set()
+        if paths_moved:
+            stale |= network._load_paths(session)
+        if stops_moved:
+            stale |= network._load_stops(session)
+        if routes_moved:
+            network._load_routes(session)
+        for path_id in stale:
+            network._path_edges.pop(path_id, None)
+        network._pack()
+        network._seen_versions = versions
+        return network
+
+    def _copy(self) -> "StopNetwork":
+        """Copy the per-path dicts the loaders edit in place.
+
+        Their values, the stop arrays and the lookup maps are never mutated, only
+        replaced, so those are shared with ``self``.
+        """
+        network = StopNetwork()
+        network._stop_index = self._stop_index
+        for name in ("_stop_ids", "_lats", "_lons", "_xs", "_ys", "_zs"):
+            setattr(network, name, getattr(self, name))
+        network._path_stops = dict(self._path_stops)
+        network._path_names = dict(self._path_names)
+        network._first_positions = dict(self._first_positions)
+        network._last_positions = dict(self._last_positions)
+        network._entry_positions = dict(self._entry_positions)
+        network._path_edges = dict(self._path_edges)
+        network._routes_by_path = self._routes_by_path
+        network._paths_by_stop = self._paths_by_stop
+        return network
+
+    def _load_stops(self, session: Session) -> Set[int]:
+        """Reload every stop; returns the paths touching an added, moved or deleted stop."""
+        rows = session.exec(select(Stop.stop_id, Stop.latitude, Stop.longitude).order_by(Stop.stop_id)).all()
+        index, lats, lons = self._stop_index, self._lats, self._lons
+        changed = set(index).difference(stop_id for stop_id, _, _ in rows)
+        for stop_id, latitude, longitude in rows:
+            position = index.get(stop_id)
+            if position is None or lats[position] != latitude or lons[position] != longitude:
+                changed.add(stop_id)
+        if not changed:
+            return set()
+        # Stop indexes are dense, so any change re-lays the arrays; they are
+        # replaced rather than edited because the published network shares them.
+        self._stop_index = {}
+        self._stop_ids = array("q")
+        self._lats, self._lons = array("d"), array("d")
+        self._xs, self._ys, self._zs = array("d"), array("d"), array("d")
+        for stop_id, latitude, longitude in rows:
+            self._stop_index[stop_id] = len(self._stop_ids)
+            self._stop_ids.append(stop_id)
+            self._lats.append(latitude)
+            self._lons.append(longitude)
+            phi, lam = math.radians(latitude), math.radians(longitude)
+            self._xs.append(math.cos(phi) * math.cos(lam))
+            self._ys.append(math.cos(phi) * math.sin(lam))
+            self._zs.append(math.sin(phi))
+        paths_by_stop = self._paths_by_stop
+        return set().union(*(paths_by_stop.get(stop_id, ()) for stop_id in changed))
+
+    def _load_paths(self, session: Session) -> Set[int]:
+        """Reload every path; returns the ids of paths added, re-sequenced or deleted."""
+        rows = session.exec(select(Path.path_id, Path.path_name, Path.ordered_stop_ids)).all()
+        self._path_names = {path_id: path_name for path_id, path_name, _ in rows}
+        changed = set(self._path_stops).difference(self._path_names)
+        for path_id in changed:
+            for per_path in (self._path_stops, self._first_positions, self._last_positions, self._entry_positions):
+                del per_path[path_id]
+        for path_id, _, ordered_stop_ids in rows:
+            stops = [int(pid) for pid in ordered_stop_ids.split(",") if pid]
+            if self._path_stops.get(path_id) == stops:
+                continue
+            changed.add(path_id)
+            self._path_stops[path_id] = stops
+            first: Dict[int, int] = {}
+            last: Dict[int, int] = {}
+            for position, stop_id in enumerate(stops):
+                first.setdefault(stop_id, position)
+                last[stop_id] = position
+            self._first_positions[path_id] = first
+            self._last_positions[path_id] = last
+            self._entry_positions[path_id] = _entry_positions(stops, first)
+        if changed:
+            paths_by_stop: Dict[int, Set[int]] = {}
+            for path_id, first in self._first_positions.items():
+                for stop_id in first:
+                    paths_by_stop.setdefault(stop_id, set()).add(path_id)
+            self._paths_by_stop = {stop_id: frozenset(path_ids) for stop_id, path_ids in paths_by_stop.items()}
+        return changed
+
+    def _load_routes(self, session: Session) -> None:
+        routes_by_path: Dict[int, List[int]] = {}
+        for route_id, path_id in session.exec(
+            select(Route.route_id, Route.path_id).where(Route.status.not_in(INACTIVE_ROUTE_STATUSES))
+        ).all():
+            routes_by_path.setdefault(path_id, []).append(route_id)
+        self._routes_by_path = routes_by_path
+
+    def _edges_of(self, path_id: int) -> List[Tuple[int, int, float, int]]:
+        index, lats, lons = self._stop_index, self._lats, self._lons
+        stops, entries = self._path_stops[path_id], self._entry_positions[path_id]
+        edges: List[Tuple[int, int, float, int]] = []
+        for a, b in zip(stops, stops[1:]):
+            ia, ib = index.get(a), index.get(b)
+            if ia is None or ib is None or ia == ib:
+                continue
+            edges.append((a, b, haversine_km(lats[ia], lons[ia], lats[ib], lons[ib]), entries[b]))
+        return edges
+
+    def _pack(self) -> None:
+        index = self._stop_index
+        path_edges = self._path_edges
+        adjacency: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(len(self._stop_ids))]
+        for path_id in self._path_stops:
+            if path_id not in self._routes_by_path:
+                continue
+            edges = path_edges.get(path_id)
+            if edges is None:
+                edges = path_edges[path_id] = self._edges_of(path_id)
+            for a, b, weight, entry in edges:
+                adjacency[index[a]].append((index[b], weight, path_id, entry))
+        offsets, targets, weights = array("q", [0]), array("q"), array("d")
+        edge_paths, edge_entries = array("q"), array("q")
+        for edges in adjacency:
+            for target, weight, path_id, entry in edges:
+                targets.append(target)
+                weights.append(weight)
+                edge_paths.append(path_id)
+                edge_entries.append(entry)
+            offsets.append(len(targets))
+        self._offsets, self._targets, self._weights = offsets, targets, weights
+        self._edge_paths, self._edge_entries = edge_paths, edge_entries
+
+    # Queries --------------------------------------------------------------
+    def stats(self) -> Dict[str, int]:
+        return {"stops": len(self._stop_ids), "edges": len(self._targets), "paths": len(self._path_stops)}
+
+    def routes_serving(self, stop_a: int, stop_b: int, ordered: bool = False) -> List[int]:
+        """Routes whose path visits both stops (with ``ordered``, ``stop_a`` first)."""
+        shared = self._paths_by_stop.get(stop_a, frozenset()) & self._paths_by_stop.get(stop_b, frozenset())
+        route_ids: List[int] = []
+        for path_id in sorted(shared):
+            if ordered and self._first_positions[path_id][stop_a] > self._last_positions[path_id][stop_b]:
+                continue
+            route_ids.extend(self._routes_by_path.get(path_id, []))
+        return sorted(route_ids)
+
+    def shortest_path(
+        self,
+        from_stop: int,
+        to_stop: int,
+        transfer_penalty_km: float = DEFAULT_TRANSFER_PENALTY_KM,
+    ) -> Optional[Dict[str, Any]]:
+        """A* over (stop, path) states; changing path costs ``transfer_penalty_km``.
+
+        The heuristic is the chord to the target (a lower bound on the great-circle
+        distance every edge is weighted by) plus a lower bound on the transfers still
+        needed: none if the current path reaches the target further down, one if it
+        passes a stop from which some path does, two otherwise.
+        """
+        index = self._stop_index
+        source, target = index.get(from_stop), index.get(to_stop)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return {"stop_ids": [from_stop], "distance_km": 0.0, "transfers": 0, "legs": []}
+
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        edge_paths, edge_entries = self._edge_paths, self._edge_entries
+        xs, ys, zs = self._xs, self._ys, self._zs
+        target_x, target_y, target_z = xs[target], ys[target], zs[target]
+        direct_last, transfer_last = self._transfer_bounds(to_stop)
+        one_transfer, two_transfers = transfer_penalty_km, 2 * transfer_penalty_km
+
+        # States are packed into ints, (path_id + 1) << 32 | stop index, with path -1
+        # meaning "not boarded yet"; this keeps the hot dicts off tuple keys.
+        best: Dict[int, float] = {source: 0.0}
+        # Cheapest cost seen at each stop on any path. A state that is a full transfer
+        # penalty behind it is dominated: switching lines from the cheaper state costs
+        # no more than staying on this one, so it is never pushed.
+        best_at_stop: Dict[int, float] = {source: 0.0}
+        parents: Dict[int, Tuple[int, float]] = {}
+        # Ties on f are broken towards the larger cost so far (deeper states first), which
+        # keeps A* from flooding grids of equal-length alternatives.
+        heap: List[Tuple[float, float, int, int]] = [(0.0, -0.0, source, -1)]
+        push, pop, inf = heapq.heappush, heapq.heappop, math.inf
+        goal: Optional[int] = None
+        while heap:
+            _, neg_cost, node, line = pop(heap)
+            cost = -neg_cost
+            key = (line + 1) << 32 | node
+            if cost > best.get(key, inf):
+                continue
+            if node == target:
+                goal = key
+                break
+            for edge in range(offsets[node], offsets[node + 1]):
+                nxt, edge_line = targets[edge], edge_paths[edge]
+                distance = weights[edge]
+                new_cost = cost + distance
+                if line != edge_line and line != -1:
+                    new_cost += transfer_penalty_km
+                at_stop = best_at_stop.get(nxt, inf)
+                if new_cost >= at_stop + transfer_penalty_km:
+                    continue
+                state = (edge_line + 1) << 32 | nxt
+                if new_cost < best.get(state, inf):
+                    best[state] = new_cost
+                    if new_cost < at_stop:
+                        best_at_stop[nxt] = new_cost
+                    parents[state] = (key, distance)
+                    dx, dy, dz = xs[nxt] - target_x, ys[nxt] - target_y, zs[nxt] - target_z
+                    estimate = EARTH_RADIUS_KM * math.sqrt(dx * dx + dy * dy + dz * dz)
+                    entry = edge_entries[edge]
+                    if entry > direct_last.get(edge_line, -1):
+                        estimate += one_transfer if entry <= transfer_last.get(edge_line, -1) else two_transfers
+                    push(heap, (new_cost + estimate, -new_cost, nxt, edge_line))
+        if goal is None:
+            return None
+        return self._describe(goal, parents)
+
+    def _transfer_bounds(self, to_stop: int) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Per path, the last position of ``to_stop`` itself and the last position of a
+        stop from which some path reaches ``to_stop`` without a further transfer.
+
+        A state on a path can ride to every position from its stop's entry position
+        onward, so comparing entry positions with these bounds tells how many more
+        transfers (zero, one, or at least two) the journey needs.
+        """
+        paths_by_stop, last_positions = self._paths_by_stop, self._last_positions
+        direct_last = {path_id: last_positions[path_id][to_stop] for path_id in paths_by_stop.get(to_stop, ())}
+        transfer_last: Dict[int, int] = {}
+        for path_id, last in direct_last.items():
+            for stop_id, entry in self._entry_positions[path_id].items():
+                if entry > last:
+                    continue
+                for other in paths_by_stop[stop_id]:
+                    position = last_positions[other][stop_id]
+                    if position > transfer_last.get(other, -1):
+                        transfer_last[other] = position
+        return direct_last, transfer_last
+
+    def _describe(self, goal: int, parents: Dict[int, Tuple[int, float]]) -> Dict[str, Any]:
+        hops: List[Tuple[int, int, float]] = []
+        state = goal
+        while state in parents:
+            previous, distance = parents[state]
+            hops.append((state & 0xFFFFFFFF, (state >> 32) - 1, distance))
+            state = previous
+        hops.reverse()
+        stop_ids = self._stop_ids
+        legs: List[Dict[str, Any]] = []
+        path_stops = [stop_ids[state & 0xFFFFFFFF]]
+        total = 0.0
+        for node, line, distance in hops:
+            total += distance
+            if not legs or legs[-1]["path_id"] != line:
+                legs.append(
+                    {
+                        "path_id": line,
+                        "path_name": self._path_names.get(line, ""),
+                        "route_ids": list(self._routes_by_path.get(line, [])),
+                        "stop_ids": [path_stops[-1]],
+                        "distance_km": 0.0,
+                    }
+                )
+            legs[-1]["stop_ids"].append(stop_ids[node])
+            legs[-1]["distance_km"] += distance
+            path_stops.append(stop_ids[node])
+        for leg in legs:
+            leg["distance_km"] = round(leg["distance_km"], 3)
+        return {
+            "stop_ids": path_stops,
+            "distance_km": round(total, 3),
+            "transfers": max(0, len(legs) - 1),
+            "legs": legs,
+        }
+
+
+_network = StopNetwork()
+_network_lock = threading.Lock()
+
+
+def get_network(session: Session) -> StopNetwork:
+    """The current network, extended first if the stop, path or route tables changed.
+
+    Callers keep the returned object for the whole query; a concurrent refresh
+    publishes a new one instead of modifying it.
+    """
+    global _network
+    versions = table_versions.snapshot(_SOURCE_TABLES)
+    network = _network
+    if network._seen_versions == versions:
+        return network
+    with _network_lock:
+        network = _network
+        if network._seen_versions != versions:
+            network = network.extended(session, versions)
+            _network = network
+    return network
@@ -0,0 +1,173 @@
+"""Materialize DailyTrip rows from active Routes for a range of operating days.
+
+Run as a CLI from the repository root::
+
+    python -m backend.app.scheduler --days 90
+    python -m backend.app.scheduler --start 2025-12-01 --end 2025-12-31
+
+or start it on a background thread from the API process with
+``start_materializer_thread``. Each chunk is inserted with one driver-level
+executemany (timestamps are pre-formatted in SQLAlchemy's SQLite storage format,
+skipping per-row bind processing) and committed on its own, so the SQLite write
+lock is only ever held briefly and API requests are never blocked behind a full run.
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from datetime import date, time as dt_time, timedelta
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from .aggregates import dashboard_aggregates
+from .archive import archive_months, archive_table
+from .models import DailyTrip, Route
+from .versions import mark_changed
+
+INACTIVE_ROUTE_STATUSES = {"Inactive"}
+DEFAULT_CHUNK_SIZE = 20_000
+
+
+def _parse_shift_time(shift_time: str) -> Optional[str]:
+    """Return ``shift_time`` as the ``HH:MM:SS.ffffff`` suffix of a stored timestamp."""
+    try:
+        hours, minutes = shift_time.strip().split(":")[:2]
+        return dt_time(int(hours), int(minutes)).strftime("%H:%M:%S.%f")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _days(start: date, end: date) -> Iterator[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def trip_name(route_display_name: str, day: date) -> str:
+    """Display name of the trip a route runs on ``day``; unique per route and day."""
+    return f"{route_display_name} ({day.isoformat()})"
+
+
+def _existing_route_days(session: Session, start: date, end: date) -> Set[Tuple[int, str]]:
+    """(route_id, "YYYY-MM-DD") pairs that already have a trip in the range, archived or not.
+
+    Timestamps are stored as ISO strings, so the day is sliced off in SQL and the
+    rows are read as plain tuples from the DBAPI cursor instead of ORM rows. Only
+    the archive months overlapping the range are consulted.
+    """
+    connection = session.connection()
+    months = range(int(start.strftime("%Y%m")), int(end.strftime("%Y%m")) + 1)
+    tables = [DailyTrip.__table__.name] + [
+        archive_table(DailyTrip, month).name
+        for month in archive_months(connection, DailyTrip)
+        if int(month) in months
+    ]
+    existing: Set[Tuple[int, str]] = set()
+    cursor = connection.connection.cursor()
+    try:
+        for table in tables:
+            cursor.execute(
+                f"SELECT route_id, substr(scheduled_start, 1, 10) FROM {table} "
+                "WHERE scheduled_start >= ? AND scheduled_start < ?",
+                (start.isoformat(), (end + timedelta(days=1)).isoformat()),
+            )
+            existing.update(cursor.fetchall())
+    finally:
+        cursor.close()
+    return existing
+
+
+def materialize_trips(
+    session: Session,
+    start: date,
+    end: date,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Create one trip per active route per day in ``[start, end]``.
+
+    Route/day pairs that already have a trip, live or archived, are skipped, so
+    re-running over the same range is a no-op. Trips are named with
+    :func:`trip_name`. Returns the number of trips inserted.
+    """
+    routes = session.exec(
+        select(Route.route_id, Route.route_display_name, Route.shift_time).where(
+            Route.status.not_in(INACTIVE_ROUTE_STATUSES)
+        )
+    ).all()
+    schedule = [
+        (route_id, display_name, shift)
+        for route_id, display_name, shift_time in routes
+        if (shift := _parse_shift_time(shift_time)) is not None
+    ]
+    if not schedule or end < start:
+        return 0
+
+    existing = _existing_route_days(session, start, end)
+    table = DailyTrip.__table__
+    statement = (
+        f"INSERT INTO {table.name} "
+        "(route_id, display_name, booking_status_percentage, live_status, scheduled_start) "
+        "VALUES (?, ?, 0, 'Scheduled', ?)"
+    )
+    inserted = 0
+    batch: List[Tuple[int, str, str]] = []
+
+    def flush() -> None:
+        nonlocal inserted
+        session.connection().exec_driver_sql(statement, batch)
+        mark_changed(session, table.name)
+        generation = dashboard_aggregates.generation()
+        session.commit()
+        dashboard_aggregates.trips_added(len(batch), generation)
+        inserted += len(batch)
+        batch.clear()
+
+    for day in _days(start, end):
+        day_key = day.isoformat()
+        for route_id, display_name, shift in schedule:
+            if (route_id, day_key) in existing:
+                continue
+            batch.append((route_id, trip_name(display_name, day), f"{day_key} {shift}"))
+            if len(batch) >= chunk_size:
+                flush()
+    if batch:
+        flush()
+    return inserted
+
+
+def start_materializer_thread(start: date, end: date, chunk_size: int = DEFAULT_CHUNK_SIZE) -> threading.Thread:
+    """Run ``materialize_trips`` on a daemon thread with its own session."""
+    from .database import engine
+
+    def run() -> None:
+        with Session(engine) as session:
+            materialize_trips(session, start, end, chunk_size)
+
+    thread = threading.Thread(target=run, name="movi-trip-materializer", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate DailyTrip rows from active routes.")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today(), help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=1, help="number of days when --end is not given")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from .database import engine, init_db
+
+    init_db()
+    end = args.end or args.start + timedelta(days=args.days - 1)
+    started = time.perf_counter()
+    with Session(engine) as session:
+        inserted = materialize_trips(session, args.start, end, args.chunk_size)
+    print(f"Inserted {inserted} trips for {args.start}..{end} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
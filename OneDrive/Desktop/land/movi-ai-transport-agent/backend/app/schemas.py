@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -88,6 +88,79 @@ class DeploymentRead(BaseModel):
     assigned_at: datetime
 
 
+class TelemetryEvent(BaseModel):
+    trip_id: int
+    vehicle_id: Optional[int] = None
+    recorded_at: datetime
+    live_status: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    speed_kmh: Optional[float] = None
+
+
+class TelemetryBatch(BaseModel):
+    events: List[TelemetryEvent]
+
+
+class TelemetryAck(BaseModel):
+    accepted: int
+    dropped: int
+    rejected: int = 0  # recorded_at too far from server time
+    queued: int
+
+
+class TripPositionRead(BaseModel):
+    trip_id: int
+    vehicle_id: Optional[int]
+    latitude: float
+    longitude: float
+    speed_kmh: Optional[float]
+    recorded_at: datetime
+
+
+class JourneyLeg(BaseModel):
+    path_id: int
+    path_name: str
+    route_ids: List[int]
+    stop_ids: List[int]
+    distance_km: float
+
+
+class JourneyPlan(BaseModel):
+    stop_ids: List[int]
+    distance_km: float
+    transfers: int
+    legs: List[JourneyLeg]
+
+
+class VehicleTypeSummary(BaseModel):
+    type: str
+    total: int
+    deployed: int
+    idle: int
+    total_capacity: int
+    deployed_capacity: int
+
+
+class DashboardSummary(BaseModel):
+    total_trips: int
+    trips_by_status: Dict[str, int]
+    total_booking_percentage: int
+    average_booking_percentage: float
+    vehicles_deployed: int
+    vehicles_idle: int
+    vehicles_by_type: List[VehicleTypeSummary]
+    active_vehicles: int
+    deployments: int
+    available_drivers: int
+
+
+class DashboardSummaryCheck(BaseModel):
+    consistent: bool
+    incremental: DashboardSummary
+    rebuilt: DashboardSummary
+
+
 class AssignVehicleRequest(BaseModel):
     trip_id: int
     vehicle_id: int
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from sqlmodel import Session, select
 
 from . import crud
+from .aggregates import dashboard_aggregates
 from .models import DailyTrip, Deployment, Driver, Path, Route, Stop, Vehicle
 
 
@@ -91,4 +92,5 @@ def seed(session: Session) -> None:
     )
     session.add(deployment)
     session.commit()
+    dashboard_aggregates.invalidate()
 
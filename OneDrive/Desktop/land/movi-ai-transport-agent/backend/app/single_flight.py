@@ -0,0 +1,139 @@
+"""Request coalescing for hot reads.
+
+When many clients ask for the same thing at once (every dashboard refreshing at
+shift start), only the first caller runs the query and serialization; the others
+wait for it and get the very same result object, e.g. the encoded JSON bytes.
+Finished results stay shareable for ``MOVI_SINGLE_FLIGHT_WINDOW`` seconds.
+
+Keys include the ``table_versions`` snapshot of the tables a read depends on, so
+a local commit (or a remote one reported by the change feed) makes the shared
+result unreachable at once; the window only bounds how stale a result can get
+through writes nothing in this process hears about. Errors are handed to the
+callers already waiting but never reused.
+
+Followers block a threadpool worker while they wait, so the wait is capped at
+``MOVI_SINGLE_FLIGHT_MAX_WAIT`` seconds: past that a follower stops waiting for a
+stuck leader and computes the result itself.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, TypeVar
+
+from .versions import table_versions
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_ENABLED = os.environ.get("MOVI_SINGLE_FLIGHT", "1") != "0"
+DEFAULT_WINDOW = float(os.environ.get("MOVI_SINGLE_FLIGHT_WINDOW", "0.5"))
+DEFAULT_MAX_WAIT = float(os.environ.get("MOVI_SINGLE_FLIGHT_MAX_WAIT", "2.0"))
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs one computation per key at a time and shares its result with concurrent callers."""
+
+    def __init__(self, window: float = DEFAULT_WINDOW, max_entries: int = 1024, max_wait: float = DEFAULT_MAX_WAIT):
+        self.window = window
+        self.max_entries = max_entries
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        # finished results in completion order: key -> (expires_at, value)
+        self._recent: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.metrics: Dict[str, int] = {"computed": 0, "joined": 0, "reused": 0, "errors": 0, "wait_timeouts": 0}
+
+    def do(self, key: Hashable, compute: Callable[[], T]) -> T:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            recent = self._recent.get(key)
+            if recent is not None:
+                self.metrics["reused"] += 1
+                return recent[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.metrics["joined"] += 1
+        if not leader:
+            if not call.done.wait(self.max_wait):
+                with self._lock:
+                    self.metrics["wait_timeouts"] += 1
+                return compute()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None:
+                    self.metrics["computed"] += 1
+                    if self.window > 0:
+                        self._recent[key] = (time.monotonic() + self.window, call.value)
+                        while len(self._recent) > self.max_entries:
+                            self._recent.popitem(last=False)
+                else:
+                    self.metrics["errors"] += 1
+            call.done.set()
+        return call.value
+
+    def _expire(self, now: float) -> None:
+        recent = self._recent
+        while recent:
+            key, (expires_at, _) = next(iter(recent.items()))
+            if expires_at > now:
+                break
+            del recent[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "inflight": len(self._inflight),
+            "recent": len(self._recent),
+            "window": self.window,
+            "max_wait": self.max_wait,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
+
+
+def coalesced(key: Hashable, tables: Iterable[str], compute: Callable[[], T]) -> T:
+    """``compute()``, shared with concurrent callers of ``key`` while ``tables`` are unchanged."""
+    if not SINGLE_FLIGHT_ENABLED:
+        return compute()
+    tables = tuple(tables)
+    return get_single_flight().do((key, tables, table_versions.snapshot(tables)), compute)
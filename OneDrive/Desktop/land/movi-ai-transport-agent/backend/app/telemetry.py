@@ -0,0 +1,419 @@
+"""Live trip status and vehicle telemetry ingestion.
+
+The HTTP batch endpoint and the WebSocket only convert events to tuples and hand
+them to :class:`TelemetryIngestor`, whose bounded queue never blocks the caller
+(events beyond capacity are dropped and reported back). A single worker thread
+drains the queue every ``flush_interval`` seconds, or sooner once
+``flush_events`` are waiting, and for each slice of at most about
+``flush_events`` events runs one short transaction that:
+
+* appends every raw ping to a per-day history table (``telemetry_YYYYMMDD``),
+* upserts the newest position per trip into ``tripposition``,
+* applies the newest status per trip to ``dailytrip.live_status``.
+
+Status and position are coalesced per trip, last writer (by ``recorded_at``)
+wins, so a burst of pings for a trip costs one row update. All statements are
+driver-level executemany calls, like the trip materializer.
+
+Events whose ``recorded_at`` lies outside a window around server time
+(``MOVI_TELEMETRY_MAX_AGE_HOURS`` back, ``MOVI_TELEMETRY_MAX_SKEW_SECONDS``
+ahead) are rejected, so a client cannot create history partitions for
+arbitrary days.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.engine import Connection
+
+from .aggregates import dashboard_aggregates
+from .models import DailyTrip, TripPosition
+from .versions import record_changes, table_versions
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = timedelta(hours=float(os.environ.get("MOVI_TELEMETRY_MAX_AGE_HOURS", "48")))
+MAX_SKEW = timedelta(seconds=float(os.environ.get("MOVI_TELEMETRY_MAX_SKEW_SECONDS", "300")))
+
+HISTORY_PREFIX = "telemetry_"
+_PARTITION_NAME = re.compile(rf"^{HISTORY_PREFIX}(\d{{8}})$")
+_IN_CHUNK = 900  # stay below SQLite's bound-parameter limit
+
+# (trip_id, vehicle_id, recorded_at, live_status, latitude, longitude, speed_kmh)
+EventRow = Tuple[int, Optional[int], str, Optional[str], Optional[float], Optional[float], Optional[float]]
+_COLUMNS = ("trip_id", "vehicle_id", "recorded_at", "live_status", "latitude", "longitude", "speed_kmh")
+
+
+def format_timestamp(value: datetime) -> str:
+    """``value`` in SQLAlchemy's SQLite storage format, normalized to naive UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def accepted_window(now: Optional[datetime] = None) -> Tuple[str, str]:
+    """Oldest and newest ``recorded_at`` (storage format) the ingestor accepts."""
+    now = now or datetime.utcnow()
+    return format_timestamp(now - MAX_AGE), format_timestamp(now + MAX_SKEW)
+
+
+def to_row(event: Any) -> EventRow:
+    return (
+        event.trip_id,
+        event.vehicle_id,
+        format_timestamp(event.recorded_at),
+        event.live_status,
+        event.latitude,
+        event.longitude,
+        event.speed_kmh,
+    )
+
+
+def partition_name(day: str) -> str:
+    """History table for ``day`` given as ``YYYY-MM-DD``."""
+    return f"{HISTORY_PREFIX}{day.replace('-', '')}"
+
+
+def list_partitions(connection: Connection) -> List[str]:
+    names = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?", (f"{HISTORY_PREFIX}%",)
+    ).scalars()
+    return sorted(name for name in names if _PARTITION_NAME.match(name))
+
+
+def read_history(
+    connection: Connection,
+    trip_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    """Raw pings for ``trip_id`` in ``[since, until]``, oldest first."""
+    low = format_timestamp(since) if since else ""
+    high = format_timestamp(until) if until else "9999"
+    rows: List[Dict[str, Any]] = []
+    for table in list_partitions(connection):
+        day = table[len(HISTORY_PREFIX):]
+        day = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+        if day < low[:10] or day > high[:10]:
+            continue
+        for row in connection.exec_driver_sql(
+            f"SELECT {', '.join(_COLUMNS)} FROM {table} "
+            "WHERE trip_id = ? AND recorded_at >= ? AND recorded_at <= ? ORDER BY recorded_at LIMIT ?",
+            (trip_id, low, high, limit - len(rows)),
+        ):
+            rows.append(dict(zip(_COLUMNS, row)))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def drop_partitions_before(connection: Connection, day: date) -> List[str]:
+    """Drop whole history partitions older than ``day``; returns the dropped tables."""
+    cutoff = partition_name(day.isoformat())
+    dropped = [table for table in list_partitions(connection) if table < cutoff]
+    for table in dropped:
+        connection.exec_driver_sql(f"DROP TABLE {table}")
+    return dropped
+
+
+class TelemetryIngestor:
+    """Bounded queue plus a single flushing worker; see the module docstring."""
+
+    def __init__(self, max_pending: int = 200_000, flush_interval: float = 0.25, flush_events: int = 20_000):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        self._cond = threading.Condition()
+        self._pending: List[Sequence[EventRow]] = []
+        self._pending_events = 0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._partitions: Set[str] = set()
+        # recorded_at of the status last applied per trip, so late pings never roll it back;
+        # entries older than the accepted window are pruned once a day
+        self._status_seen: Dict[int, str] = {}
+        self._status_pruned_day = ""
+        self.metrics: Dict[str, Any] = {
+            "accepted": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "failed": 0,
+            "failed_flushes": 0,
+            "status_updates": 0,
+            "position_updates": 0,
+            "unknown_trips": 0,
+            "max_depth": 0,
+            "last_flush_ms": 0.0,
+            "last_error": None,
+        }
+
+    # Producer side -------------------------------------------------------
+    def submit(self, rows: Sequence[EventRow]) -> Tuple[int, int]:
+        """Queue ``rows``; returns (accepted, dropped). Never blocks on the database."""
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            room = max(0, self.max_pending - self._pending_events)
+            accepted = rows if len(rows) <= room else rows[:room]
+            if accepted:
+                self._pending.append(accepted)
+                self._pending_events += len(accepted)
+                if self._pending_events > self.metrics["max_depth"]:
+                    self.metrics["max_depth"] = self._pending_events
+                if self._pending_events >= self.flush_events:
+                    self._cond.notify()
+            self.metrics["accepted"] += len(accepted)
+            self.metrics["dropped"] += len(rows) - len(accepted)
+        return len(accepted), len(rows) - len(accepted)
+
+    def submit_events(self, events: Iterable[Any]) -> Dict[str, int]:
+        """Queue validated ``TelemetryEvent``s and build the acknowledgement.
+
+        Events recorded outside :func:`accepted_window` are rejected, not queued.
+        """
+        oldest, newest = accepted_window()
+        rows = [to_row(event) for event in events]
+        valid = [row for row in rows if oldest <= row[2] <= newest]
+        rejected = len(rows) - len(valid)
+        if rejected:
+            with self._cond:
+                self.metrics["rejected"] += rejected
+        accepted, dropped = self.submit(valid)
+        return {"accepted": accepted, "dropped": dropped, "rejected": rejected, "queued": self._pending_events}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "depth": self._pending_events,
+            "capacity": self.max_pending,
+            "tracked_statuses": len(self._status_seen),
+        }
+
+    # Lifecycle -----------------------------------------------------------
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            from .database import engine
+
+            TripPosition.__table__.create(engine, checkfirst=True)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="movi-telemetry", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything still queued and stop the worker."""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        self._thread = None
+
+    def flush_now(self) -> None:
+        """Synchronously flush whatever is queued (used by tests and shutdown paths)."""
+        while True:
+            with self._cond:
+                batches = self._take()
+            if not batches:
+                return
+            self._flush(batches)
+
+    # Consumer side -------------------------------------------------------
+    def _take(self) -> List[Sequence[EventRow]]:
+        """Pop queued batches worth about ``flush_events`` events (caller holds ``_cond``).
+
+        Capping each transaction keeps the SQLite write lock short even when a
+        backlog has built up; the rest is flushed on the next loop without waiting.
+        """
+        taken = 0
+        count = 0
+        for batch in self._pending:
+            taken += 1
+            count += len(batch)
+            if count >= self.flush_events:
+                break
+        batches = self._pending[:taken]
+        del self._pending[:taken]
+        self._pending_events -= count
+        return batches
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and self._pending_events < self.flush_events:
+                    self._cond.wait(self.flush_interval)
+                batches = self._take()
+                stopping = self._stopping and not self._pending
+            if batches:
+                try:
+                    self._flush(batches)
+                except Exception as exc:  # keep the worker alive; the batch is lost
+                    lost = sum(len(batch) for batch in batches)
+                    logger.exception("Telemetry flush failed; %d events lost", lost)
+                    self.metrics["failed"] += lost
+                    self.metrics["failed_flushes"] += 1
+                    self.metrics["last_error"] = repr(exc)
+            if stopping:
+                return
+
+    def _flush(self, batches: List[Sequence[EventRow]]) -> None:
+        with self._flush_lock:
+            self._apply(batches)
+
+    def _apply(self, batches: List[Sequence[EventRow]]) -> None:
+        from .database import engine
+
+        started = time.perf_counter()
+        by_day: Dict[str, List[EventRow]] = {}
+        statuses: Dict[int, Tuple[str, str]] = {}
+        positions: Dict[int, EventRow] = {}
+        count = 0
+        for batch in batches:
+            count += len(batch)
+            for row in batch:
+                trip_id, recorded_at = row[0], row[2]
+                day_rows = by_day.get(recorded_at[:10])
+                if day_rows is None:
+                    day_rows = by_day[recorded_at[:10]] = []
+                day_rows.append(row)
+                if row[3] is not None:
+                    current = statuses.get(trip_id)
+                    if current is None or recorded_at >= current[0]:
+                        statuses[trip_id] = (recorded_at, row[3])
+                if row[4] is not None and row[5] is not None:
+                    previous = positions.get(trip_id)
+                    if previous is None or recorded_at >= previous[2]:
+                        positions[trip_id] = row
+        seen = self._status_seen
+        statuses = {trip_id: value for trip_id, value in statuses.items() if value[0] >= seen.get(trip_id, "")}
+
+        changes: List[Tuple[str, str, int]] = []
+        created: List[str] = []
+        generation = dashboard_aggregates.generation()
+        with engine.begin() as connection:
+            for day, rows in by_day.items():
+                table = self._ensure_partition(connection, day, created)
+                connection.exec_driver_sql(
+                    f"INSERT INTO {table} ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            trips = self._current_trips(connection, set(statuses) | set(positions))
+            unknown = len((set(statuses) | set(positions)) - set(trips))
+            if positions:
+                connection.exec_driver_sql(
+                    f"INSERT INTO {TripPosition.__tablename__} "
+                    "(trip_id, vehicle_id, latitude, longitude, speed_kmh, recorded_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(trip_id) DO UPDATE SET vehicle_id = excluded.vehicle_id, "
+                    "latitude = excluded.latitude, longitude = excluded.longitude, "
+                    "speed_kmh = excluded.speed_kmh, recorded_at = excluded.recorded_at "
+                    f"WHERE excluded.recorded_at >= {TripPosition.__tablename__}.recorded_at",
+                    [
+                        (trip_id, row[1], row[4], row[5], row[6], row[2])
+                        for trip_id, row in positions.items()
+                        if trip_id in trips
+                    ],
+                )
+            updates = []
+            for trip_id, (_, status) in statuses.items():
+                current = trips.get(trip_id)
+                if current is not None and current[0] != status:
+                    updates.append((status, trip_id))
+                    changes.append((current[0], status, current[1]))
+            if updates:
+                connection.exec_driver_sql(
+                    f"UPDATE {DailyTrip.__tablename__} SET live_status = ? WHERE trip_id = ?", updates
+                )
+            touched = [TripPosition.__tablename__] if positions else []
+            if changes:
+                touched.append(DailyTrip.__tablename__)
+            seqs = record_changes(connection, touched)
+
+        # Only now is the DDL durable; a rolled-back flush must create the tables again.
+        self._partitions.update(created)
+        for trip_id, (recorded_at, _) in statuses.items():
+            seen[trip_id] = recorded_at
+        self._prune_status_seen()
+        table_versions.committed(touched, seqs)
+        for old_status, new_status, booking in changes:
+            dashboard_aggregates.trip_changed(old_status, new_status, booking, booking, generation)
+
+        metrics = self.metrics
+        metrics["flushed"] += count
+        metrics["flushes"] += 1
+        metrics["status_updates"] += len(changes)
+        metrics["position_updates"] += len(positions)
+        metrics["unknown_trips"] += unknown
+        metrics["last_flush_ms"] = (time.perf_counter() - started) * 1000
+
+    def _prune_status_seen(self, now: Optional[datetime] = None) -> None:
+        """Forget statuses recorded before the accepted window, once per day the window moves.
+
+        Pings that old are rejected on submit, so such an entry can no longer hold
+        a late one back; without pruning the map grows with every trip ever seen.
+        """
+        oldest = accepted_window(now)[0]
+        if oldest[:10] == self._status_pruned_day:
+            return
+        self._status_pruned_day = oldest[:10]
+        self._status_seen = {trip_id: seen for trip_id, seen in self._status_seen.items() if seen >= oldest}
+
+    def _ensure_partition(self, connection: Connection, day: str, created: List[str]) -> str:
+        """Create the history table for ``day`` in this transaction unless it is known to exist.
+
+        New tables are appended to ``created``; the caller records them as known
+        only after the transaction commits.
+        """
+        table = partition_name(day)
+        if table not in self._partitions:
+            if not _PARTITION_NAME.match(table):
+                raise ValueError(f"Bad telemetry partition day: {day!r}")
+            connection.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {table} (trip_id INTEGER NOT NULL, vehicle_id INTEGER, "
+                "recorded_at TEXT NOT NULL, live_status TEXT, latitude REAL, longitude REAL, speed_kmh REAL)"
+            )
+            connection.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_trip ON {table} (trip_id, recorded_at)")
+            created.append(table)
+        return table
+
+    @staticmethod
+    def _current_trips(connection: Connection, trip_ids: Set[int]) -> Dict[int, Tuple[str, int]]:
+        """trip_id -> (live_status, booking_status_percentage) for the trips that exist."""
+        ids = list(trip_ids)
+        found: Dict[int, Tuple[str, int]] = {}
+        for start in range(0, len(ids), _IN_CHUNK):
+            chunk = ids[start : start + _IN_CHUNK]
+            for trip_id, status, booking in connection.exec_driver_sql(
+                f"SELECT trip_id, live_status, booking_status_percentage FROM {DailyTrip.__tablename__} "
+                f"WHERE trip_id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk),
+            ):
+                found[trip_id] = (status, booking)
+        return found
+
+
+_ingestor: Optional[TelemetryIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_telemetry_ingestor() -> TelemetryIngestor:
+    global _ingestor
+    if _ingestor is None:
+        with _ingestor_lock:
+            if _ingestor is None:
+                _ingestor = TelemetryIngestor()
+    return _ingestor
@@ -0,0 +1,153 @@
+"""Optional capture of sanitized request streams for load replay.
+
+With ``MOVI_TRAFFIC_CAPTURE=<directory>`` set, :class:`TrafficCaptureMiddleware`
+records one JSON line per HTTP request: arrival time, method, path, query (as
+ordered ``[key, value]`` pairs, so repeated parameters survive), the sanitized
+JSON body (for ``/agent/action`` also the intent), response status and latency.
+Bodies that are not captured (multipart uploads, other non-JSON payloads, or
+anything over ``MAX_BODY_BYTES``) are marked with ``body_skipped`` and the reason,
+so a replay can leave them out rather than send them without a body. Records
+go through the same batched, size-rotated writer as the agent audit trail, into
+``capture-*.jsonl`` segments, so capturing never blocks a request. Headers are
+never stored, and values under sensitive-looking keys are redacted.
+
+``scripts/replay_traffic.py`` plays the segments back against the app.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+if TYPE_CHECKING:
+    from langgraph_agent.output_writer import AuditWriter
+
+CAPTURE_DIR = os.environ.get("MOVI_TRAFFIC_CAPTURE") or None
+CAPTURE_PREFIX = "capture"
+MAX_BODY_BYTES = 64 * 1024
+MAX_STRING_LENGTH = 256
+
+_SENSITIVE_KEY_RE = re.compile(r"passw|secret|token|authoriz|api[_-]?key|cookie|e-?mail|phone", re.IGNORECASE)
+_SKIPPED_PATHS = ("/docs", "/redoc", "/openapi.json", "/favicon.ico")
+REDACTED = "[redacted]"
+
+
+def sanitize(value: Any) -> Any:
+    """Copy of ``value`` with sensitive keys redacted and long strings truncated."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if _SENSITIVE_KEY_RE.search(str(key)) else sanitize(item) for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    if isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+        return value[:MAX_STRING_LENGTH]
+    return value
+
+
+def sanitize_query(query: str) -> List[List[str]]:
+    """``query`` as ``[key, value]`` pairs in order, sanitized like a body."""
+    return [
+        [key, REDACTED if _SENSITIVE_KEY_RE.search(key) else sanitize(value)]
+        for key, value in parse_qsl(query, keep_blank_values=True)
+    ]
+
+
+def query_pairs(record: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """A captured query as ``(key, value)`` pairs; older captures stored a dict."""
+    query = record.get("query") or []
+    items = query.items() if isinstance(query, dict) else query
+    return [(key, value) for key, value in items]
+
+
+def _parse_body(body: bytes, content_type: str) -> Tuple[Any, Optional[str]]:
+    """The sanitized JSON body, or None and the reason it was not captured."""
+    if not body:
+        return None, None
+    if content_type.startswith("multipart/"):
+        return None, "multipart"
+    if len(body) > MAX_BODY_BYTES:
+        return None, "too_large"
+    if "json" not in content_type:
+        return None, "not_json"
+    try:
+        return sanitize(json.loads(body)), None
+    except ValueError:
+        return None, "not_json"
+
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware that hands one sanitized record per HTTP request to ``writer``."""
+
+    def __init__(self, app, writer: AuditWriter):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(_SKIPPED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        chunks: List[bytes] = []
+        size = 0
+        status = 500
+
+        async def capture_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request" and size <= MAX_BODY_BYTES:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                chunks.append(chunk)
+            return message
+
+        async def capture_send(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            headers = dict(scope.get("headers") or [])
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            query = scope.get("query_string", b"").decode("latin-1")
+            body, skipped = _parse_body(b"".join(chunks), content_type)
+            record: Dict[str, Any] = {
+                "ts": arrived,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": sanitize_query(query),
+                "content_type": content_type.split(";")[0] or None,
+                "body": body,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+            if skipped:
+                record["body_skipped"] = skipped
+            if isinstance(body, dict) and "intent" in body:
+                record["intent"] = body["intent"]
+            self.writer.record(record)
+
+
+# The segment writer lives with the agent's audit log; import it only when
+# capture is actually switched on, so the backend never needs the agent package.
+def capture_writer(directory: str) -> AuditWriter:
+    from langgraph_agent.output_writer import AuditWriter
+
+    return AuditWriter(directory=Path(directory), compress=False, prefix=CAPTURE_PREFIX)
+
+
+def read_capture(directory: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Captured requests from ``directory``, in arrival order."""
+    from langgraph_agent.output_writer import AuditReader
+
+    records = sorted(AuditReader(Path(directory), prefix=CAPTURE_PREFIX).records(), key=lambda record: record["ts"])
+    return iter(records[:limit] if limit is not None else records)
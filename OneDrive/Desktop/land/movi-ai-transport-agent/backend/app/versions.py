@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "movi_dirty_tables"
+_SEQ_KEY = "movi_change_seqs"
+
+# Shared change sequence: one row per table, advanced inside every writing
+# transaction so other processes on the same database can tell which tables
+# moved (see change_feed.py). MOVI_CHANGE_FEED=0 turns it off.
+CHANGE_TABLE = "movi_change_seq"
+CHANGE_FEED_ENABLED = os.environ.get("MOVI_CHANGE_FEED", "1") != "0"
+change_table = Table(
+    CHANGE_TABLE,
+    MetaData(),
+    Column("table_name", Text, primary_key=True),
+    Column("seq", Integer, nullable=False),
+)
+# Engines whose database is known to have a committed change table.
+_ensured_engines: weakref.WeakSet[Engine] = weakref.WeakSet()
+
+
+class TableVersions:
+    """Monotonic per-table version counters, bumped whenever a commit touches a table.
+
+    Caches key their entries on a snapshot of the versions of the tables they read,
+    so a write anywhere makes the stale entries unreachable without explicit purging.
+    """
+
+    def __init__(self) -> None:
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._lock = threading.Lock()
+        # last shared change sequence accounted for per table (ours or observed)
+        self._known_seqs: Dict[str, int] = {}
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        versions = self._versions
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables: str) -> None:
+        if not tables:
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            listeners = list(self._listeners)
+        changed = set(tables)
+        for listener in listeners:
+            listener(changed)
+
+    def subscribe(self, listener: Callable[[Set[str]], None]) -> None:
+        """Call ``listener`` with the set of bumped tables after every bump."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def committed(self, tables: Iterable[str], seqs: Dict[str, int]) -> None:
+        """Bump ``tables`` after a local commit that advanced their shared sequences to ``seqs``.
+
+        A sequence is only marked as known when it directly follows the last known
+        one; otherwise another process wrote in between and the change feed still
+        has to report that write.
+        """
+        with self._lock:
+            known = self._known_seqs
+            for table, seq in seqs.items():
+                if seq == known.get(table, 0) + 1:
+                    known[table] = seq
+        self.bump(*tables)
+
+    def observe(self, seqs: Dict[str, int]) -> Set[str]:
+        """Record shared sequences read from the change table; returns the tables that moved."""
+        changed: Set[str] = set()
+        with self._lock:
+            known = self._known_seqs
+            for table, seq in seqs.items():
+                if seq > known.get(table, 0):
+                    known[table] = seq
+                    changed.add(table)
+        return changed
+
+
+table_versions = TableVersions()
+
+
+# Shared change sequence --------------------------------------------------------
+def ensure_change_table(engine: Engine) -> None:
+    """Create the change table in its own transaction (``init_db`` calls this)."""
+    change_table.create(engine, checkfirst=True)
+    _ensured_engines.add(engine)
+
+
+def _ensure_change_table(connection: Connection) -> None:
+    """Fallback for databases ``init_db`` never ran on.
+
+    The DDL shares the caller's transaction and may still roll back, so it is
+    repeated on every write until ``ensure_change_table`` has run for the engine.
+    """
+    if connection.engine in _ensured_engines:
+        return
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (table_name TEXT PRIMARY KEY, seq INTEGER NOT NULL)"
+    )
+
+
+def record_changes(connection: Connection, tables: Iterable[str]) -> Dict[str, int]:
+    """Advance the shared sequence of ``tables`` inside ``connection``'s open transaction."""
+    if not CHANGE_FEED_ENABLED:
+        return {}
+    _ensure_change_table(connection)
+    return {
+        table: connection.exec_driver_sql(
+            f"INSERT INTO {CHANGE_TABLE} (table_name, seq) VALUES (?, 1) "
+            "ON CONFLICT(table_name) DO UPDATE SET seq = seq + 1 RETURNING seq",
+            (table,),
+        ).scalar_one()
+        for table in sorted(tables)
+    }
+
+
+# Session hooks ----------------------------------------------------------------
+def _record(session: Session, tables: Iterable[str]) -> None:
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    new = set(tables) - pending
+    if not new:
+        return
+    pending.update(new)
+    if CHANGE_FEED_ENABLED:
+        session.info.setdefault(_SEQ_KEY, {}).update(record_changes(session.connection(), new))
+
+
+def mark_changed(session: Session, *tables: str) -> None:
+    """Note that Core statements run on ``session`` changed ``tables``.
+
+    Call it before ``session.commit()``; the commit hook then bumps the tables
+    exactly like it does for ORM flushes.
+    """
+    _record(session, tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context) -> None:
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    _record(session, tables)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _collect_bulk_tables(update_context) -> None:
+    table = getattr(update_context.mapper, "local_table", None)
+    if table is not None:
+        _record(update_context.session, [table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session: Session) -> None:
+    tables = session.info.pop(_PENDING_KEY, None)
+    seqs = session.info.pop(_SEQ_KEY, {})
+    if tables:
+        table_versions.committed(tables, seqs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_SEQ_KEY, None)
@@ -0,0 +1,74 @@
+"""Startup warm-up behind the readiness probe.
+
+The lifespan hook hands :data:`readiness` a list of named steps (import the agent,
+load the gazetteer, stop network and dashboard aggregates, run each hot list
+query once). They run on a background thread so the worker accepts connections
+immediately; ``GET /ready`` answers 503 until every step has finished, so a load
+balancer only routes traffic to a worker whose first request costs what its
+thousandth does. Step timings are reported by the probe.
+
+A step that fails leaves the worker "degraded": it keeps serving, but the probe
+stays at 503 and lists the errors, so a worker that could not load its caches
+(or its database) is never reported healthy.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WarmupStep = Tuple[str, Callable[[], Any]]
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self._finished = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.total_ms: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._finished.is_set() and not self.errors
+
+    @property
+    def state(self) -> str:
+        if not self._finished.is_set():
+            return "warming"
+        return "degraded" if self.errors else "ready"
+
+    def start(self, steps: List[WarmupStep]) -> None:
+        if self._thread is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(steps,), name="movi-warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished (successfully or not); False on timeout."""
+        return self._finished.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "warmup_ms": self.total_ms,
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+        }
+
+    def _run(self, steps: List[WarmupStep]) -> None:
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:  # keep warming the rest; the probe reports "degraded"
+                self.errors[name] = repr(exc)
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 2)
+        self.total_ms = round((time.perf_counter() - self.started_at) * 1000, 2)
+        self._finished.set()
+
+
+readiness = Readiness()
@@ -0,0 +1,46 @@
+"""Shared fixtures: every test gets its own copy of the bundled database."""
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.app import database  # noqa: E402
+from backend.app.versions import table_versions  # noqa: E402
+from langgraph_agent import output_writer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def audit_writer(tmp_path, monkeypatch):
+    """Agent runs audit into the test's tmp dir, never into the repo's outputs/."""
+    writer = output_writer.AuditWriter(directory=tmp_path / "audit", compress=False)
+    monkeypatch.setattr(output_writer, "_audit_writer", writer)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    replica = tmp_path / "movi.db"
+    shutil.copyfile(database.DB_PATH, replica)
+    test_engine = create_engine(f"sqlite:///{replica}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "engine", test_engine, raising=False)
+    database.init_db()
+    # Process-wide caches are keyed on table versions; moving every version makes
+    # them reload from this test's database instead of the previous one.
+    table_versions.bump(*SQLModel.metadata.tables)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as db_session:
+        yield db_session
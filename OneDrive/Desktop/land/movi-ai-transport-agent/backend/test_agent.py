@@ -0,0 +1,348 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend.app.admission import AdmissionController
+from backend.app.models import DailyTrip
+from backend.app.schemas import StopRead
+from langgraph_agent import graph
+from langgraph_agent.context_resolver import ContextResolver
+from langgraph_agent.graph import MoviAgent
+from langgraph_agent.intent_parser import EntityGazetteer, IntentParser
+from langgraph_agent.output_writer import AuditReader, AuditWriter
+from langgraph_agent.result_cache import IntentResultCache
+
+
+# Intent parser ---------------------------------------------------------------
+def _add_trip(session, name):
+    trip = DailyTrip(
+        route_id=1,
+        display_name=name,
+        booking_status_percentage=0,
+        live_status="Scheduled",
+        scheduled_start=datetime(2026, 1, 1, 9, 0),
+    )
+    session.add(trip)
+    session.commit()
+    session.refresh(trip)
+    return trip
+
+
+def test_refresh_picks_up_renames_and_deletes(session):
+    gazetteer = EntityGazetteer()
+    gazetteer.refresh(session)
+    trip = _add_trip(session, "Harbour Loop")
+    assert gazetteer.refresh(session) == 1
+    assert gazetteer.lookup("trip", "harbour loop") == (trip.trip_id, "Harbour Loop")
+
+    trip.display_name = "Airport Loop"
+    session.add(trip)
+    session.commit()
+    assert gazetteer.refresh(session) == 1
+    assert gazetteer.lookup("trip", "Harbour Loop") is None
+    assert gazetteer.lookup("trip", "Airport Loop") == (trip.trip_id, "Airport Loop")
+
+    session.delete(trip)
+    session.commit()
+    assert gazetteer.refresh(session) == 0
+    assert gazetteer.lookup("trip", "Airport Loop") is None
+
+
+def test_refresh_without_changes_does_not_count_rows(session):
+    gazetteer = EntityGazetteer()
+    assert gazetteer.refresh(session) > 0
+    assert gazetteer.refresh(session) == 0
+    assert gazetteer.refresh(session, force=True) == 0
+
+
+def test_duplicate_names_are_ambiguous(session):
+    first = _add_trip(session, "Night Shuttle")
+    _add_trip(session, "night  shuttle")
+    parser = IntentParser(gazetteer=EntityGazetteer())
+    parser.gazetteer.refresh(session)
+
+    assert parser.gazetteer.lookup("trip", "Night Shuttle") is None
+    result = parser.match("what is the status of night shuttle")
+    assert result.intent == "get_trip_status"
+    assert result.confidence < parser.threshold
+    assert "trip_name" not in result.parameters
+
+    session.delete(first)
+    session.commit()
+    parser.gazetteer.refresh(session)
+    assert parser.match("what is the status of night shuttle").parameters == {"trip_name": "night  shuttle"}
+
+
+PARSE_CASES = [
+    (
+        "Assign vehicle KA01AB1234 and driver Sanjay Kumar to Bulk - 00:01",
+        "assign_vehicle_to_trip",
+        {"trip_id": 1, "vehicle_id": 1, "driver_id": 1},
+    ),
+    (
+        "assign driver Priya Singh and bus KA01AB5678 to Bulk - 08:30",
+        "assign_vehicle_to_trip",
+        {"trip_id": 2, "vehicle_id": 2, "driver_id": 2},
+    ),
+    ("remove the vehicle from Bulk - 08:30", "remove_vehicle_from_trip", {"trip_id": 2, "trip_name": "Bulk - 08:30"}),
+    ("What is the status of Bulk - 08:30?", "get_trip_status", {"trip_name": "Bulk - 08:30"}),
+    ("list today's trips", "list_daily_trips", {}),
+    ("show unassigned vehicles", "list_unassigned_vehicles", {}),
+    ("are there any buses not assigned", "list_unassigned_vehicles", {}),
+    ("which drivers are available", "list_available_drivers", {}),
+    ("show all deployments", "list_deployments", {}),
+    (
+        "create a stop called Lake View at 12.95, 77.61",
+        "create_stop",
+        {"name": "Lake View", "latitude": 12.95, "longitude": 77.61},
+    ),
+    (
+        "create a path called Airport Run through Campus Gate, Tech Park and Metro Station",
+        "create_path",
+        {"name": "Airport Run", "stop_ids": [1, 2, 3]},
+    ),
+    ("how do I get from Campus Gate to City Center", "find_journey", {"from_stop_id": 1, "to_stop_id": 4}),
+    ("which routes serve Tech Park and Metro Station", "list_routes_serving_stops", {"stop_a_id": 2, "stop_b_id": 3}),
+    ("deactivate route Bulk - 00:01", "update_route_status", {"route_id": 1, "status": "Inactive"}),
+    ("which stops are on North Loop", "list_stops_for_path", {"path_name": "North Loop"}),
+    ("what routes use South Loop", "list_routes_using_path", {"path_name": "South Loop"}),
+]
+
+
+@pytest.fixture
+def parser(session):
+    parser = IntentParser(gazetteer=EntityGazetteer())
+    parser.gazetteer.refresh(session)
+    return parser
+
+
+@pytest.mark.parametrize("text, intent, parameters", PARSE_CASES)
+def test_utterance_becomes_intent_and_parameters(parser, text, intent, parameters):
+    result = parser.match(text)
+    assert (result.intent, result.parameters) == (intent, parameters)
+    assert result.confidence == 1.0
+
+
+def test_missing_entities_fall_below_the_threshold(parser):
+    incomplete = parser.match("assign a vehicle to Bulk - 00:01")
+    assert incomplete.intent == "assign_vehicle_to_trip"
+    assert incomplete.parameters == {} and incomplete.confidence < parser.threshold
+    assert parser.match("tell me a joke").intent is None
+
+
+# Result cache ----------------------------------------------------------------
+def test_reads_return_independent_copies():
+    cache = IntentResultCache()
+    key = cache.make_key("list_daily_trips", {}, (1,))
+    cache.put(key, {"trips": [{"trip_id": 1}]}, "Found 1 trips.", ("dailytrip",))
+
+    first, _ = cache.get(key)
+    first["trips"][0]["trip_id"] = 99
+    first["trips"].append({"trip_id": 2})
+
+    second, message = cache.get(key)
+    assert second == {"trips": [{"trip_id": 1}]}
+    assert message == "Found 1 trips."
+
+
+def test_agent_responses_do_not_share_cached_data(session):
+    agent = MoviAgent(session)
+    first = agent.handle_action("list_unassigned_vehicles", {}, {})
+    expected = [dict(vehicle) for vehicle in first["data"]["vehicles"]]
+    first["data"]["vehicles"].clear()
+
+    second = agent.handle_action("list_unassigned_vehicles", {}, {})
+    assert second["data"]["vehicles"] == expected
+
+
+# Agent handlers --------------------------------------------------------------
+def test_resolver_errors_become_error_responses(session, monkeypatch):
+    agent = MoviAgent(session)
+
+    def broken(intent, params):
+        raise RuntimeError("lookup failed")
+
+    monkeypatch.setattr(agent.resolver, "resolve", broken)
+    result = agent.handle_action("remove_vehicle_from_trip", {"trip_id": 1}, {})
+    assert result["data"] is None
+    assert result["message"] == "Error executing action: lookup failed"
+
+
+def test_assign_vehicle_by_trip_name(session):
+    agent = MoviAgent(session)
+    result = agent.handle_action(
+        "assign_vehicle_to_trip", {"trip_name": "Bulk - 00:01", "vehicle_id": 1, "driver_id": 1}, {}
+    )
+    assert result["message"] == "Vehicle assigned successfully."
+    assert result["data"]["trip_id"] == 1
+
+    missing = agent.handle_action("assign_vehicle_to_trip", {"trip_name": "Nowhere", "vehicle_id": 1, "driver_id": 1}, {})
+    assert missing["message"] == "Trip Nowhere not found."
+
+
+def test_trip_status_by_id_uses_the_trip_name(session):
+    agent = MoviAgent(session)
+    result = agent.handle_action("get_trip_status", {"trip_id": 2}, {})
+    assert result["message"] == "Bulk - 08:30 is currently " + result["data"]["status"] + "."
+
+
+def test_stops_for_path_keep_the_path_order(session):
+    agent = MoviAgent(session)
+    stops = agent.tools.list_stops_for_path("South Loop")
+    assert [(stop["stop_id"], stop["name"]) for stop in stops] == [
+        (3, "Metro Station"),
+        (4, "City Center"),
+        (5, "Warehouse Hub"),
+    ]
+    assert list(stops[0]) == list(StopRead.model_fields)
+    assert agent.tools.list_stops_for_path("Nowhere") == []
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed on ``engine`` while the test runs."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_point_lookups_resolve_in_one_round_trip(session, statements):
+    resolved = ContextResolver(session).resolve(
+        "assign_vehicle_to_trip", {"trip_id": 1, "vehicle_id": 3, "driver_id": 99}
+    )
+    assert len(statements) == 1
+    assert resolved["trip"].display_name == "Bulk - 00:01"
+    assert resolved["vehicle"].license_plate == "KA01AB9012"
+    assert resolved["driver"] is None
+
+
+def test_name_lookup_adds_a_single_fetch(session, statements):
+    resolved = ContextResolver(session).resolve(
+        "assign_vehicle_to_trip", {"trip_name": "Bulk - 08:30", "vehicle_id": 1, "driver_id": 1}
+    )
+    assert len(statements) == 2
+    assert (resolved["trip"].trip_id, resolved["vehicle"].vehicle_id, resolved["driver"].name) == (2, 1, "Sanjay Kumar")
+
+
+# Audit writer ----------------------------------------------------------------
+def test_counters_add_up_across_threads(tmp_path):
+    writer = AuditWriter(directory=tmp_path, max_queue=1_000, compress=False)
+    threads = [
+        threading.Thread(target=lambda: [writer.record({"n": i}) for i in range(500)]) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    stats = writer.stats()
+    assert stats["enqueued"] + stats["dropped"] == 4_000
+    assert stats["written"] == stats["enqueued"]
+    assert len(list(AuditReader(tmp_path).records())) == stats["written"]
+
+
+def test_failed_runs_are_audited(session, audit_writer, monkeypatch):
+    agent = graph.MoviAgent(session)
+
+    def explode(state):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(agent, "_check_consequences", explode)
+    with pytest.raises(RuntimeError):
+        agent.handle_action("remove_vehicle_from_trip", {"trip_id": 1}, {})
+    audit_writer.close()
+
+    (record,) = AuditReader(audit_writer.directory).records()
+    assert record["outcome"] == "exception"
+    assert record["intent"] == "remove_vehicle_from_trip"
+    assert "boom" in record["error"]
+
+
+def test_writer_survives_a_failed_batch(tmp_path, monkeypatch):
+    writer = AuditWriter(directory=tmp_path, compress=False, flush_interval=0.01)
+    open_segment = AuditWriter._open_segment
+
+    def fail_once(self):
+        monkeypatch.setattr(AuditWriter, "_open_segment", open_segment)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(AuditWriter, "_open_segment", fail_once)
+    writer.record({"n": 1})
+    while writer.stats()["failed_batches"] == 0:
+        time.sleep(0.005)
+    writer.record({"n": 2})
+    writer.close()
+
+    stats = writer.stats()
+    assert (stats["failed"], stats["written"]) == (1, 1)
+    assert "disk full" in stats["last_error"]
+    assert [record["n"] for record in AuditReader(tmp_path).records()] == [2]
+
+
+def test_close_does_not_hang_on_a_full_queue(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(AuditWriter, "_write_batch", lambda self, batch: release.wait(5))
+    writer = AuditWriter(directory=tmp_path, max_queue=2, batch_size=1, compress=False)
+    for n in range(4):
+        writer.record({"n": n})
+    started = time.perf_counter()
+    writer.close(timeout=0.1)
+    assert time.perf_counter() - started < 1.0
+    release.set()
+    writer.close()
+
+
+def test_audit_stats_endpoint_reports_the_writer(session):
+    from backend.app.main import app
+
+    client = TestClient(app)
+    client.post("/agent/action", json={"intent": "list_deployments", "parameters": {}, "context": {}})
+    client.post("/agent/action", json={"intent": "list_available_drivers", "parameters": {}, "context": {}})
+    stats = client.get("/agent/audit/stats").json()
+    assert stats["enqueued"] == 2 and stats["dropped"] == 0 and stats["failed"] == 0
+
+
+# Admission -------------------------------------------------------------------
+@pytest.mark.parametrize(
+    "intent, expected",
+    [
+        ("assign_vehicle_to_trip", "write"),
+        ("list_daily_trips", "bulk"),
+        ("get_trip_status", "interactive"),
+    ],
+)
+def test_class_comes_from_the_intent_name(intent, expected):
+    assert AdmissionController.classify(intent) == expected
+
+
+def test_writes_overtake_queued_reads():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1)
+        holder = await controller.acquire("list_daily_trips")
+        order = []
+
+        async def run(intent):
+            slot = await controller.acquire(intent)
+            order.append(intent)
+            slot.release()
+
+        bulk = asyncio.create_task(run("list_deployments"))
+        interactive = asyncio.create_task(run("get_trip_status"))
+        write = asyncio.create_task(run("remove_vehicle_from_trip"))
+        await asyncio.sleep(0)
+        holder.release()
+        await asyncio.gather(bulk, interactive, write)
+        return order
+
+    assert asyncio.run(scenario()) == ["remove_vehicle_from_trip", "get_trip_status", "list_deployments"]
@@ -0,0 +1,293 @@
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from backend.app import archive, crud, database, telemetry
+from backend.app.aggregates import DashboardAggregates, dashboard_aggregates
+from backend.app.archive import archive_completed, ensure_id_sequences
+from backend.app.main import MAX_TELEMETRY_LIMIT, app
+from backend.app.models import DailyTrip, Deployment, Vehicle
+from backend.app.scheduler import materialize_trips
+from backend.app.schemas import TelemetryEvent
+from backend.app.telemetry import TelemetryIngestor, list_partitions, partition_name, read_history
+
+
+# Schedule materializer -------------------------------------------------------
+def test_generated_trips_are_named_per_day(session):
+    assert materialize_trips(session, date(2025, 1, 1), date(2025, 1, 3)) == 6
+    names = session.exec(
+        select(DailyTrip.display_name).where(DailyTrip.scheduled_start < datetime(2025, 2, 1))
+    ).all()
+    assert len(set(names)) == 6
+    assert "Bulk - 08:30 (2025-01-02)" in names
+
+
+def test_archived_days_are_not_generated_again(session):
+    materialize_trips(session, date(2025, 1, 1), date(2025, 1, 3))
+    session.connection().exec_driver_sql(
+        "UPDATE dailytrip SET live_status = 'Completed' WHERE scheduled_start < '2025-02-01'"
+    )
+    session.commit()
+    report = archive_completed(session, horizon_days=30, now=datetime(2025, 6, 1))
+    assert report["trips"] > 0
+
+    assert materialize_trips(session, date(2025, 1, 1), date(2025, 1, 3)) == 0
+    assert materialize_trips(session, date(2025, 1, 1), date(2025, 1, 4)) == 2
+
+
+# Archive ---------------------------------------------------------------------
+def _deploy_until(session, last_id):
+    """Add one trip plus deployment per id until deployments 1..``last_id`` are live."""
+    while session.exec(select(Deployment.deployment_id).order_by(Deployment.deployment_id.desc())).first() < last_id:
+        trip = DailyTrip(
+            route_id=1,
+            display_name="Bulk - 00:01",
+            booking_status_percentage=10,
+            live_status="Scheduled",
+            scheduled_start=datetime(2025, 5, 30, 8, 0),
+        )
+        session.add(trip)
+        session.flush()
+        session.add(Deployment(trip_id=trip.trip_id, vehicle_id=1, driver_id=1))
+        session.commit()
+
+
+def test_archived_and_deleted_ids_are_not_reused(session):
+    _deploy_until(session, 10)
+    ninth, tenth = session.get(Deployment, 9), session.get(Deployment, 10)
+    archived_trip = session.get(DailyTrip, ninth.trip_id)
+    archived_trip.live_status = "Completed"
+    archived_trip.scheduled_start = datetime(2025, 1, 15, 8, 0)
+    session.commit()
+
+    report = archive_completed(session, horizon_days=30, now=datetime(2025, 6, 1))
+    assert report["deployments"] == 1 and session.get(Deployment, 9) is None
+    assert crud.remove_vehicle_from_trip(session, tenth.trip_id)
+
+    trip_id = session.exec(select(DailyTrip.trip_id).order_by(DailyTrip.trip_id.desc())).first()
+    deployment = crud.assign_vehicle_to_trip(session, trip_id, vehicle_id=2, driver_id=2)
+    assert deployment.deployment_id == 11
+    ids = [row.deployment_id for row in crud.list_deployments(session, include_archived=True)]
+    assert 9 in ids and len(ids) == len(set(ids))
+
+
+def test_sequences_start_above_archived_ids(session):
+    session.connection().exec_driver_sql(
+        "UPDATE dailytrip SET live_status = 'Completed', scheduled_start = '2025-01-02 00:01:00'"
+    )
+    session.commit()
+    archive_completed(session, horizon_days=30, now=datetime(2025, 6, 1))
+    assert session.exec(select(DailyTrip)).all() == []
+
+    # A database that lost its sequence rows (or predates AUTOINCREMENT) is reseeded from the archive.
+    connection = session.connection()
+    connection.exec_driver_sql("DELETE FROM sqlite_sequence")
+    assert ensure_id_sequences(connection) == {"dailytrip": 2, "deployment": 1}
+    session.commit()
+
+    trip = DailyTrip(
+        route_id=1,
+        display_name="Fresh",
+        booking_status_percentage=0,
+        live_status="Scheduled",
+        scheduled_start=datetime(2025, 6, 2),
+    )
+    session.add(trip)
+    session.commit()
+    assert trip.trip_id == 3
+
+
+def test_second_init_db_keeps_the_rebuilt_tables(session, monkeypatch):
+    crud.assign_vehicle_to_trip(session, trip_id=1, vehicle_id=1, driver_id=1)
+    connection = session.connection()
+    schema = connection.exec_driver_sql("SELECT name, sql FROM sqlite_master ORDER BY name").all()
+    rows = {name: connection.exec_driver_sql(f"SELECT * FROM {name}").all() for name in ("dailytrip", "deployment")}
+    session.commit()
+
+    def rebuild(connection, model):
+        raise AssertionError(f"{model.__tablename__} rebuilt again")
+
+    monkeypatch.setattr(archive, "_rebuild_with_autoincrement", rebuild)
+    database.init_db()
+    connection = session.connection()
+    assert connection.exec_driver_sql("SELECT name, sql FROM sqlite_master ORDER BY name").all() == schema
+    assert {name: connection.exec_driver_sql(f"SELECT * FROM {name}").all() for name in rows} == rows
+
+
+def test_archiver_thread_survives_a_failed_pass(engine, monkeypatch):
+    passes = []
+    done = threading.Event()
+
+    def archive_pass(session, horizon_days, chunk_size):
+        passes.append(horizon_days)
+        if len(passes) == 1:
+            raise RuntimeError("database is locked")
+        done.set()
+
+    monkeypatch.setattr(archive, "archive_completed", archive_pass)
+    stop = threading.Event()
+    thread = archive.start_archiver_thread(horizon_days=7, interval_seconds=0.01, stop=stop)
+    assert done.wait(5)
+    stop.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert passes[:2] == [7, 7]
+
+
+# Telemetry -------------------------------------------------------------------
+def _events(*moments, trip_id=2):
+    return [
+        TelemetryEvent(trip_id=trip_id, vehicle_id=2, recorded_at=moment, latitude=12.9, longitude=77.6, speed_kmh=30.0)
+        for moment in moments
+    ]
+
+
+@pytest.fixture
+def ingestor(engine):
+    ingestor = TelemetryIngestor(flush_interval=0.01)
+    yield ingestor
+    ingestor.close()
+
+
+def test_events_land_in_per_day_partitions(engine, ingestor):
+    now = datetime.utcnow().replace(microsecond=0)
+    yesterday = now - timedelta(days=1)
+    ack = ingestor.submit_events(_events(yesterday, now, now))
+    ingestor.close()
+
+    assert ack["accepted"] == 3 and ack["rejected"] == 0
+    with engine.connect() as connection:
+        tables = list_partitions(connection)
+        assert partition_name(yesterday.date().isoformat()) in tables
+        assert partition_name(now.date().isoformat()) in tables
+        assert len(read_history(connection, 2)) == 3
+        assert len(read_history(connection, 2, limit=2)) == 2
+
+
+def test_statuses_older_than_the_window_are_forgotten(engine, ingestor):
+    now = datetime.utcnow().replace(microsecond=0)
+    ingestor.submit_events(
+        [
+            TelemetryEvent(trip_id=1, recorded_at=now - timedelta(days=1), live_status="Live"),
+            TelemetryEvent(trip_id=2, recorded_at=now, live_status="Live"),
+        ]
+    )
+    ingestor.close()
+    assert ingestor.stats()["tracked_statuses"] == 2
+
+    ingestor._prune_status_seen(now + telemetry.MAX_AGE)
+    assert ingestor.stats()["tracked_statuses"] == 1
+    # Trip 2 still holds back a late ping; trip 1's entry could not, its pings are rejected.
+    ack = ingestor.submit_events([TelemetryEvent(trip_id=2, recorded_at=now - timedelta(minutes=1), live_status="Completed")])
+    ingestor.close()
+    assert ack["accepted"] == 1
+    assert ingestor.stats()["status_updates"] == 1
+
+
+def test_events_outside_the_window_are_rejected(engine, ingestor):
+    now = datetime.utcnow()
+    ack = ingestor.submit_events(_events(now - telemetry.MAX_AGE - timedelta(hours=1), now + timedelta(days=400), now))
+    ingestor.close()
+
+    assert ack["accepted"] == 1 and ack["rejected"] == 2
+    assert ingestor.stats()["rejected"] == 2
+    with engine.connect() as connection:
+        assert list_partitions(connection) == [partition_name(now.date().isoformat())]
+
+
+def test_partition_created_by_a_failed_flush_is_created_again(engine, ingestor, monkeypatch):
+    now = datetime.utcnow().replace(microsecond=0)
+    yesterday = now - timedelta(days=1)
+    current_trips = TelemetryIngestor.__dict__["_current_trips"]
+
+    def fail_once(connection, trip_ids):
+        monkeypatch.setattr(TelemetryIngestor, "_current_trips", current_trips)
+        raise RuntimeError("simulated flush failure")
+
+    monkeypatch.setattr(TelemetryIngestor, "_current_trips", staticmethod(fail_once))
+    ingestor.submit_events(_events(yesterday, now))
+    ingestor.close()
+    stats = ingestor.stats()
+    assert stats["failed"] == 2 and stats["failed_flushes"] == 1
+
+    ingestor.submit_events(_events(yesterday, now))
+    ingestor.close()
+    assert ingestor.stats()["failed_flushes"] == 1
+    with engine.connect() as connection:
+        assert len(read_history(connection, 2)) == 2
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_TELEMETRY_LIMIT + 1])
+def test_history_limit_is_bounded(engine, limit):
+    response = TestClient(app).get(f"/trips/2/telemetry?limit={limit}")
+    assert response.status_code == 422
+
+
+# Dashboard aggregates --------------------------------------------------------
+def _summary_from_tables(session):
+    """The dashboard counters recomputed from the rows the endpoints list."""
+    trips = session.exec(select(DailyTrip)).all()
+    vehicles = session.exec(select(Vehicle)).all()
+    deployments = crud.list_deployments(session)
+    return {
+        "total_trips": len(trips),
+        "trips_by_status": dict(Counter(trip.live_status for trip in trips)),
+        "deployments": len(deployments),
+        "vehicles_deployed": len({deployment.vehicle_id for deployment in deployments}),
+        "vehicles_idle": len(crud.list_unassigned_vehicles(session)),
+        "active_vehicles": sum(vehicle.is_active for vehicle in vehicles),
+        "available_drivers": len(crud.list_available_drivers(session)),
+    }
+
+
+def test_summary_matches_the_tables(session):
+    summary = DashboardAggregates().summary(session)
+    expected = _summary_from_tables(session)
+    assert {key: summary[key] for key in expected} == expected
+    # Vehicle 2 is deployed and vehicle 3 is inactive, so only vehicle 1 is idle.
+    assert (summary["deployments"], summary["active_vehicles"], summary["vehicles_idle"]) == (1, 2, 1)
+    mini_bus = next(row for row in summary["vehicles_by_type"] if row["type"] == "Mini Bus")
+    assert (mini_bus["total"], mini_bus["deployed"], mini_bus["idle"]) == (2, 0, 1)
+
+
+def test_unassigned_endpoint_uses_the_dashboard_idle_definition(engine):
+    dashboard_aggregates.invalidate()
+    client = TestClient(app)
+    idle = client.get("/vehicles/unassigned").json()
+    summary = client.get("/dashboard/summary").json()
+    assert [vehicle["license_plate"] for vehicle in idle] == ["KA01AB1234"]
+    assert summary["vehicles_idle"] == len(idle)
+
+
+def test_deltas_keep_the_counters_exact(session):
+    dashboard_aggregates.rebuild(session)
+    crud.assign_vehicle_to_trip(session, trip_id=1, vehicle_id=1, driver_id=1)
+    summary = dashboard_aggregates.summary(session)
+    expected = _summary_from_tables(session)
+    assert {key: summary[key] for key in expected} == expected
+    assert (summary["deployments"], summary["vehicles_idle"]) == (2, 0)
+    crud.remove_vehicle_from_trip(session, trip_id=1)
+    assert dashboard_aggregates.summary(session)["deployments"] == 1
+    assert dashboard_aggregates.verify(session)["consistent"]
+
+
+def test_rebuild_between_commit_and_delta_does_not_double_count(session):
+    aggregates = DashboardAggregates()
+    aggregates.rebuild(session)
+
+    generation = aggregates.generation()
+    session.add(Deployment(trip_id=1, vehicle_id=1, driver_id=1))
+    session.commit()
+    aggregates.rebuild(session)  # already sees the new deployment
+    aggregates.deployment_added(1, 1, generation)
+
+    summary = aggregates.summary(session)
+    assert summary["vehicles_deployed"] == 2
+    assert summary["available_drivers"] == 1
+    fresh = DashboardAggregates()
+    fresh.rebuild(session)
+    assert summary == fresh.summary()
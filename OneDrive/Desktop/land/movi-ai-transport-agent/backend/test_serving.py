@@ -0,0 +1,410 @@
+import heapq
+import json
+import math
+import random
+import shutil
+import threading
+from datetime import date, datetime
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlmodel import Session, create_engine, select
+
+from backend.app import database, fast_json, main, network as network_module, traffic
+from backend.app.archive import archive_completed
+from backend.app.main import app
+from backend.app.models import DailyTrip, Path, Route, Stop
+from backend.app.network import INACTIVE_ROUTE_STATUSES, get_network, haversine_km
+from backend.app.scheduler import materialize_trips
+from backend.app.single_flight import SingleFlight
+from backend.app.versions import CHANGE_TABLE, table_versions
+from backend.app.warmup import Readiness
+
+
+# Fast JSON -------------------------------------------------------------------
+ENDPOINTS = [
+    "/stops",
+    "/paths",
+    "/routes",
+    "/network/routes-serving?stop_a_id=1&stop_b_id=3",
+    "/network/routes-serving?stop_a_id=2&stop_b_id=3&ordered=true",
+    "/vehicles",
+    "/vehicles/unassigned",
+    "/drivers/available",
+    "/trips",
+    "/trips?include_archived=true",
+    "/deployments",
+    "/deployments?include_archived=true",
+]
+
+
+@pytest.fixture
+def client(session):
+    materialize_trips(session, date(2025, 1, 1), date(2025, 1, 5))
+    session.connection().exec_driver_sql(
+        "UPDATE dailytrip SET live_status = 'Completed' WHERE scheduled_start < '2025-01-04'"
+    )
+    session.commit()
+    archive_completed(session, horizon_days=30, now=datetime(2025, 6, 1))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_fast_path_matches_response_model(client, monkeypatch, path):
+    monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", True)
+    fast = client.get(path)
+    monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", False)
+    slow = client.get(path)
+
+    assert fast.status_code == slow.status_code == 200
+    assert fast.headers["content-type"] == slow.headers["content-type"]
+    assert fast.content == slow.content
+
+
+# Stop network ----------------------------------------------------------------
+PENALTY = 0.5
+
+
+def _dijkstra(session, source, target, penalty):
+    """Reference search over (stop, path) states, straight from the tables."""
+    coords = {stop_id: (lat, lon) for stop_id, lat, lon in session.exec(select(Stop.stop_id, Stop.latitude, Stop.longitude))}
+    served = set(session.exec(select(Route.path_id).where(Route.status.not_in(INACTIVE_ROUTE_STATUSES))))
+    edges = {}
+    for path_id, ordered in session.exec(select(Path.path_id, Path.ordered_stop_ids)):
+        if path_id not in served:
+            continue
+        stops = [int(stop_id) for stop_id in ordered.split(",") if stop_id]
+        for a, b in zip(stops, stops[1:]):
+            if a != b:
+                edges.setdefault(a, []).append((b, haversine_km(*coords[a], *coords[b]), path_id))
+    best = {(source, -1): 0.0}
+    heap = [(0.0, source, -1)]
+    while heap:
+        cost, stop, line = heapq.heappop(heap)
+        if cost > best[(stop, line)]:
+            continue
+        if stop == target:
+            return cost
+        for nxt, distance, path_id in edges.get(stop, ()):
+            new_cost = cost + distance + (penalty if line not in (-1, path_id) else 0.0)
+            if new_cost < best.get((nxt, path_id), math.inf):
+                best[(nxt, path_id)] = new_cost
+                heapq.heappush(heap, (new_cost, nxt, path_id))
+    return None
+
+
+@pytest.fixture
+def random_network(session):
+    rng = random.Random(33)
+    first_stop = session.exec(select(Stop.stop_id).order_by(Stop.stop_id.desc())).first() + 1
+    stop_ids = list(range(first_stop, first_stop + 120))
+    session.execute(
+        insert(Stop.__table__),
+        [
+            {"stop_id": stop_id, "name": f"Grid {stop_id}", "latitude": 12.9 + rng.random() / 20, "longitude": 77.5 + rng.random() / 20}
+            for stop_id in stop_ids
+        ],
+    )
+    for index in range(40):
+        stops = rng.sample(stop_ids, rng.randint(3, 12))
+        if rng.random() < 0.2:
+            stops.append(stops[0])  # loop back to the start
+        path = Path(path_name=f"Random {index}", ordered_stop_ids=",".join(map(str, stops)))
+        session.add(path)
+        session.flush()
+        session.add(
+            Route(
+                path_id=path.path_id,
+                route_display_name=f"Random {index}",
+                shift_time="08:00",
+                direction="Outbound",
+                start_point="",
+                end_point="",
+                status="Inactive" if index % 9 == 0 else "Active",
+            )
+        )
+    session.commit()
+    return stop_ids
+
+
+def test_a_star_matches_dijkstra(session, random_network):
+    rng = random.Random(7)
+    network = get_network(session)
+    found = 0
+    for _ in range(150):
+        source, target = rng.sample(random_network, 2)
+        expected = _dijkstra(session, source, target, PENALTY)
+        plan = network.shortest_path(source, target, transfer_penalty_km=PENALTY)
+        if expected is None:
+            assert plan is None
+            continue
+        found += 1
+        assert plan["stop_ids"][0] == source and plan["stop_ids"][-1] == target
+        assert plan["distance_km"] + plan["transfers"] * PENALTY == pytest.approx(expected, abs=2e-3)
+    assert found > 50
+
+
+def _route_stops(network, source, target):
+    plan = network.shortest_path(source, target)
+    return plan and plan["stop_ids"]
+
+
+def test_edits_and_deletes_reach_the_network(session):
+    before = get_network(session)
+    assert _route_stops(before, 1, 3) == [1, 2, 3]
+    distance = before.shortest_path(1, 2)["distance_km"]
+
+    # Re-sequence North Loop to skip Tech Park.
+    north_loop = session.get(Path, 1)
+    north_loop.ordered_stop_ids = "1,3"
+    session.add(north_loop)
+    session.commit()
+    network = get_network(session)
+    assert _route_stops(network, 1, 3) == [1, 3]
+    assert _route_stops(network, 1, 2) is None
+    assert _route_stops(before, 1, 3) == [1, 2, 3]  # the published network is untouched
+
+    # Move Tech Park and put it back on the path: the edge is re-weighted.
+    north_loop.ordered_stop_ids = "1,2,3"
+    tech_park = session.get(Stop, 2)
+    tech_park.latitude += 0.1
+    session.add_all([north_loop, tech_park])
+    session.commit()
+    campus_gate = session.get(Stop, 1)
+    moved = get_network(session).shortest_path(1, 2)["distance_km"]
+    assert moved != distance
+    assert moved == pytest.approx(
+        haversine_km(campus_gate.latitude, campus_gate.longitude, tech_park.latitude, tech_park.longitude), abs=1e-3
+    )
+
+    # Deleting the stop drops its edges; deleting the path drops the rest.
+    session.delete(tech_park)
+    session.commit()
+    assert _route_stops(get_network(session), 1, 3) is None
+    session.delete(north_loop)
+    session.commit()
+    network = get_network(session)
+    assert network.stats()["paths"] == 1
+    assert network.routes_serving(1, 3) == []
+
+
+def test_only_changed_paths_are_reweighted(session, random_network, monkeypatch):
+    get_network(session)
+    calls = []
+    monkeypatch.setattr(network_module, "haversine_km", lambda *args: calls.append(args) or haversine_km(*args))
+    path = Path(path_name="Late addition", ordered_stop_ids=",".join(map(str, random_network[:5])))
+    session.add(path)
+    session.flush()
+    session.add(
+        Route(
+            path_id=path.path_id,
+            route_display_name="Late addition",
+            shift_time="08:00",
+            direction="Outbound",
+            start_point="",
+            end_point="",
+            status="Active",
+        )
+    )
+    session.commit()
+    plan = get_network(session).shortest_path(random_network[0], random_network[4], transfer_penalty_km=PENALTY)
+    assert len(calls) == 4
+    assert plan["distance_km"] + plan["transfers"] * PENALTY == pytest.approx(
+        _dijkstra(session, random_network[0], random_network[4], PENALTY), abs=2e-3
+    )
+
+
+# Single flight ---------------------------------------------------------------
+def _leader_blocked_until(flight, release):
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "leader"
+
+    thread = threading.Thread(target=flight.do, args=("key", slow))
+    thread.start()
+    started.wait(5)
+    return thread
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight(window=0, max_wait=5)
+    release = threading.Event()
+    leader = _leader_blocked_until(flight, release)
+    results = []
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", lambda: "follower")))
+    follower.start()
+    while flight.stats()["joined"] == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ["leader"]
+    assert flight.stats()["computed"] == 1
+
+
+def test_follower_stops_waiting_for_a_stuck_leader():
+    flight = SingleFlight(window=0, max_wait=0.05)
+    release = threading.Event()
+    leader = _leader_blocked_until(flight, release)
+    try:
+        assert flight.do("key", lambda: "follower") == "follower"
+        assert flight.stats()["wait_timeouts"] == 1
+    finally:
+        release.set()
+        leader.join()
+
+
+# Table versions --------------------------------------------------------------
+def _trip(name):
+    return DailyTrip(
+        route_id=1,
+        display_name=name,
+        booking_status_percentage=0,
+        live_status="Scheduled",
+        scheduled_start=datetime(2025, 6, 2, 8, 0),
+    )
+
+
+@pytest.fixture
+def uninitialized_engine(tmp_path):
+    """A copy of the bundled database that ``init_db`` never ran on (no change table yet)."""
+    replica = tmp_path / "fresh.db"
+    shutil.copyfile(database.DB_PATH, replica)
+    engine = create_engine(f"sqlite:///{replica}")
+    yield engine
+    engine.dispose()
+
+
+def test_rolled_back_write_bumps_nothing(session):
+    before = table_versions.get("dailytrip")
+    session.add(_trip("Rolled back"))
+    session.flush()
+    session.rollback()
+    assert table_versions.get("dailytrip") == before
+
+    session.add(_trip("Committed"))
+    session.commit()
+    assert table_versions.get("dailytrip") == before + 1
+    assert session.exec(select(DailyTrip.display_name).where(DailyTrip.display_name == "Rolled back")).all() == []
+
+
+def test_change_table_created_in_a_rolled_back_transaction_is_created_again(uninitialized_engine):
+    with Session(uninitialized_engine) as session:
+        session.add(_trip("Rolled back"))
+        session.flush()  # the change table is created inside this transaction
+        session.rollback()
+
+        session.add(_trip("Committed"))
+        session.commit()
+
+        seqs = dict(session.connection().exec_driver_sql(f"SELECT table_name, seq FROM {CHANGE_TABLE}").all())
+    assert seqs == {"dailytrip": 1}
+
+
+# Readiness -------------------------------------------------------------------
+def _boom():
+    raise RuntimeError("cache load failed")
+
+
+def _warmed(*steps):
+    readiness = Readiness()
+    readiness.start(list(steps))
+    assert readiness.wait(5)
+    return readiness
+
+
+def test_successful_warmup_is_ready():
+    status = _warmed(("noop", lambda: None)).status()
+    assert status["ready"] and status["state"] == "ready"
+
+
+def test_failed_step_leaves_the_worker_degraded(monkeypatch):
+    readiness = _warmed(("noop", lambda: None), ("gazetteer", _boom))
+    monkeypatch.setattr(main, "readiness", readiness)
+
+    response = TestClient(main.app).get("/ready")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["state"] == "degraded" and not body["ready"]
+    assert "cache load failed" in body["errors"]["gazetteer"]
+    assert set(body["steps_ms"]) == {"noop", "gazetteer"}
+
+
+# Traffic capture -------------------------------------------------------------
+def test_sanitize_redacts_credentials_and_contact_details():
+    payload = {
+        "intent": "create_stop",
+        "password": "hunter2",
+        "Authorization": "Bearer abc",
+        "api_key": "k-123",
+        "context": {"session_token": "t", "email": "a@b.c", "phone_number": "+91-9800000000"},
+        "parameters": [{"Cookie": "sid=1", "name": "Lake View"}],
+        "note": "x" * 1000,
+    }
+    clean = traffic.sanitize(payload)
+    assert clean == {
+        "intent": "create_stop",
+        "password": traffic.REDACTED,
+        "Authorization": traffic.REDACTED,
+        "api_key": traffic.REDACTED,
+        "context": {"session_token": traffic.REDACTED, "email": traffic.REDACTED, "phone_number": traffic.REDACTED},
+        "parameters": [{"Cookie": traffic.REDACTED, "name": "Lake View"}],
+        "note": "x" * traffic.MAX_STRING_LENGTH,
+    }
+    assert payload["password"] == "hunter2"  # the request's own data is untouched
+
+
+class _Recorder:
+    def __init__(self):
+        self.records = []
+
+    def record(self, event):
+        self.records.append(event)
+        return True
+
+
+@pytest.fixture
+def captured():
+    echo = FastAPI()
+
+    @echo.post("/echo")
+    async def echo_body(request: Request):
+        return Response(await request.body(), media_type=request.headers.get("content-type"))
+
+    recorder = _Recorder()
+    echo.add_middleware(traffic.TrafficCaptureMiddleware, writer=recorder)
+    return TestClient(echo), recorder.records
+
+
+def test_capture_records_the_request_and_passes_the_body_through(captured):
+    client, records = captured
+    payload = {"intent": "get_trip_status", "parameters": {"trip_id": 2}, "token": "secret"}
+    response = client.post(
+        "/echo?stop=1&stop=2&api_key=k", json=payload, headers={"Authorization": "Bearer abc", "Cookie": "sid=1"}
+    )
+    assert response.json() == payload
+
+    (record,) = records
+    assert record["method"] == "POST" and record["path"] == "/echo" and record["status"] == 200
+    assert record["query"] == [["stop", "1"], ["stop", "2"], ["api_key", traffic.REDACTED]]
+    assert record["body"] == {"intent": "get_trip_status", "parameters": {"trip_id": 2}, "token": traffic.REDACTED}
+    assert record["intent"] == "get_trip_status"
+    assert "body_skipped" not in record
+    assert "Bearer abc" not in json.dumps(record) and "sid=1" not in json.dumps(record)
+    assert traffic.query_pairs(record) == [("stop", "1"), ("stop", "2"), ("api_key", traffic.REDACTED)]
+
+
+def test_multipart_uploads_are_marked_as_skipped(captured):
+    client, records = captured
+    image = bytes(range(256)) * 4
+    response = client.post("/echo", files={"file": ("route.png", image, "image/png")})
+    assert image in response.content
+
+    (record,) = records
+    assert record["content_type"] == "multipart/form-data"
+    assert record["body"] is None and record["body_skipped"] == "multipart"
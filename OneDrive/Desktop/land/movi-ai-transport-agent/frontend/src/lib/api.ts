@@ -28,6 +28,22 @@ const MOCK_VEHICLES = [
   { vehicle_id: 4, license_plate: "MV-004", capacity: 35, type: "Van", is_active: false },
 ];
 
+const MOCK_SUMMARY = {
+  total_trips: 4,
+  trips_by_status: { Live: 2, Scheduled: 2 },
+  total_booking_percentage: 250,
+  average_booking_percentage: 62.5,
+  vehicles_deployed: 3,
+  vehicles_idle: 0,
+  vehicles_by_type: [
+    { type: "Coach", total: 2, deployed: 2, idle: 0, total_capacity: 100, deployed_capacity: 100 },
+    { type: "Van", total: 2, deployed: 1, idle: 0, total_capacity: 70, deployed_capacity: 35 },
+  ],
+  active_vehicles: 3,
+  deployments: 3,
+  available_drivers: 2,
+};
+
 const MOCK_STOPS = [
   { stop_id: "S-001", name: "Campus Gate", location: "North Campus" },
   { stop_id: "S-002", name: "Library", location: "Central Campus" },
@@ -92,6 +108,9 @@ export const api = {
   async getVehicles() {
     return tryApi(() => client.get("/vehicles"), MOCK_VEHICLES);
   },
+  async getDashboardSummary() {
+    return tryApi(() => client.get("/dashboard/summary"), MOCK_SUMMARY);
+  },
   async getDrivers() {
     return tryApi(() => client.get("/drivers/available"), MOCK_DRIVERS);
   },
@@ -26,7 +26,19 @@ type Vehicle = {
   is_active: boolean;
 };
 
+type DashboardSummary = {
+  total_trips: number;
+  trips_by_status: Record<string, number>;
+  vehicles_deployed: number;
+  vehicles_idle: number;
+  vehicles_by_type: { type: string; total: number }[];
+  active_vehicles: number;
+  deployments: number;
+  available_drivers: number;
+};
+
 export const BusDashboard = () => {
+  const [summary, setSummary] = useState<DashboardSummary | null>(null);
   const [trips, setTrips] = useState<Trip[]>([]);
   const [deployments, setDeployments] = useState<Deployment[]>([]);
   const [vehicles, setVehicles] = useState<Vehicle[]>([]);
@@ -35,11 +47,13 @@ export const BusDashboard = () => {
   const fetchData = async () => {
     setLoading(true);
     try {
-      const [tripsRes, deploymentsRes, vehiclesRes] = await Promise.all([
+      const [summaryRes, tripsRes, deploymentsRes, vehiclesRes] = await Promise.all([
+        api.getDashboardSummary(),
         api.getTrips(),
         api.getDeployments(),
         api.getVehicles()
       ]);
+      setSummary(summaryRes.data);
       setTrips(tripsRes.data);
       setDeployments(deploymentsRes.data);
       setVehicles(vehiclesRes.data);
@@ -52,6 +66,8 @@ export const BusDashboard = () => {
     fetchData();
   }, []);
 
+  const totalVehicles = summary?.vehicles_by_type.reduce((sum, row) => sum + row.total, 0) ?? 0;
+
   return (
     <div className="space-y-4">
       <section className="rounded-2xl bg-white p-6 shadow-card">
@@ -74,19 +90,19 @@ export const BusDashboard = () => {
           <MetricCard
             icon={<Activity className="h-5 w-5 text-brand-500" />}
             label="Live Trips"
-            value={trips.filter((trip) => trip.live_status === "Live").length}
-            helper="Out of total scheduled today"
+            value={summary?.trips_by_status.Live ?? 0}
+            helper={`Out of ${summary?.total_trips ?? 0} scheduled`}
           />
           <MetricCard
             icon={<BusFront className="h-5 w-5 text-brand-500" />}
             label="Vehicles Assigned"
-            value={deployments.length}
-            helper="Includes shared deployments"
+            value={summary?.deployments ?? 0}
+            helper={`${summary?.vehicles_idle ?? 0} active vehicles idle`}
           />
           <MetricCard
             icon={<MapPinHouse className="h-5 w-5 text-brand-500" />}
             label="Fleet Utilization"
-            value={`${vehicles.filter((v) => v.is_active).length}/${vehicles.length}`}
+            value={`${summary?.active_vehicles ?? 0}/${totalVehicles}`}
             helper="Active vs total vehicles"
           />
         </div>
@@ -0,0 +1,87 @@
+"""
+Context resolution stage for the MoviAgent pipeline.
+
+Works out which entities an intent needs from its parameters and fetches them
+on the request's session: every primary-key lookup (trip, vehicle, driver,
+route) goes out together in one outer-joined SELECT, so an intent costs one
+round trip however many entities it names. The resolved entities are handed to
+both the consequence checks and the handlers, so nothing is loaded twice.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Tuple
+
+from sqlmodel import Session
+
+from .tools import MoviTools
+
+Fetcher = Callable[[MoviTools], Any]
+Lookup = Tuple[str, Any]  # (model name, primary key)
+
+
+def plan_lookups(intent: str, params: Dict[str, Any]) -> Dict[str, Lookup]:
+    """The primary-key lookups an intent depends on, batched by ``MoviTools.get_by_ids``."""
+    lookups: Dict[str, Lookup] = {}
+    if intent in ("get_trip_status", "remove_vehicle_from_trip", "assign_vehicle_to_trip"):
+        if params.get("trip_id") is not None:
+            lookups["trip"] = ("DailyTrip", params["trip_id"])
+    if intent == "assign_vehicle_to_trip":
+        if params.get("vehicle_id") is not None:
+            lookups["vehicle"] = ("Vehicle", params["vehicle_id"])
+        if params.get("driver_id") is not None:
+            lookups["driver"] = ("Driver", params["driver_id"])
+    elif intent == "update_route_status" and params.get("route_id") is not None:
+        lookups["route"] = ("Route", params["route_id"])
+    return lookups
+
+
+def plan_fetches(intent: str, params: Dict[str, Any]) -> Dict[str, Fetcher]:
+    """Map an intent and its parameters to the fetches that are not primary-key lookups."""
+    fetches: Dict[str, Fetcher] = {}
+    include_archived = bool(params.get("include_archived"))
+
+    if intent in ("get_trip_status", "remove_vehicle_from_trip", "assign_vehicle_to_trip"):
+        if params.get("trip_id") is None and params.get("trip_name"):
+            trip_name = params["trip_name"]
+            if intent == "get_trip_status":
+                fetches["trip"] = lambda tools: tools.get_trip(trip_name, include_archived)
+            else:
+                fetches["trip"] = lambda tools: tools.get_trip(trip_name)
+
+    if intent == "list_stops_for_path" and params.get("path_name"):
+        path_name = params["path_name"]
+        fetches["stops"] = lambda tools: tools.list_stops_for_path(path_name)
+    elif intent == "list_routes_using_path" and params.get("path_name"):
+        path_name = params["path_name"]
+        fetches["routes"] = lambda tools: tools.list_routes_using_path(path_name)
+    elif intent == "list_daily_trips":
+        fetches["trips"] = lambda tools: tools.list_daily_trips(include_archived)
+    elif intent == "list_deployments":
+        fetches["deployments"] = lambda tools: tools.list_deployments(include_archived)
+    elif intent == "list_unassigned_vehicles":
+        fetches["vehicles"] = lambda tools: tools.list_unassigned_vehicles()
+    elif intent == "list_available_drivers":
+        fetches["drivers"] = lambda tools: tools.list_available_drivers()
+
+    return fetches
+
+
+class ContextResolver:
+    """Resolves an intent's entities on the request's session.
+
+    All primary-key lookups go out as one batched statement; at most one name or
+    list fetch follows it.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def resolve(self, intent: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        lookups = plan_lookups(intent, params)
+        fetches = plan_fetches(intent, params)
+        if not lookups and not fetches:
+            return {}
+        tools = MoviTools(self.session)
+        resolved = tools.get_by_ids(lookups)
+        resolved.update((key, fetch(tools)) for key, fetch in fetches.items())
+        return resolved
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import time
+import uuid
 from typing import Any, Dict, Optional
 
 from sqlmodel import Session
 
+from .context_resolver import ContextResolver
+from .intent_parser import FREE_TEXT_INTENT, get_intent_parser
+from .output_writer import get_audit_writer
+from .result_cache import get_result_cache
 from .tools import MoviTools
 
 
@@ -13,6 +19,8 @@ class MoviAgent:
     def __init__(self, session: Session):
         self.session = session
         self.tools = MoviTools(session)
+        self.cache = get_result_cache()
+        self.resolver = ContextResolver(session)
 
     # ------------------------------------------------------------------
     # Main entry point: handle_action orchestrates the state machine
@@ -22,29 +30,36 @@ class MoviAgent:
         Main state machine: parse → check_context → check_consequences → execute → respond.
         Returns a dict with message, data, and optional consequence.
         """
+        started = time.perf_counter()
         state = {
             "intent": intent,
             "parameters": parameters,
             "context": context,
+            "resolved": {},
             "consequence": None,
             "data": None,
             "message": "",
         }
 
-        # 1. Parse intent (already parsed from frontend; this is a no-op for now)
-        state = self._parse_intent(state)
+        try:
+            # 1. Parse intent (free text / voice goes through the rule-based parser)
+            state = self._parse_intent(state)
 
-        # 2. Check context (validate page context, etc.)
-        state = self._check_context(state)
+            # 2. Check context (validate page context, etc.)
+            state = self._check_context(state)
 
-        # 3. Check consequences (warn about risky operations)
-        state = self._check_consequences(state)
+            # 3. Check consequences (warn about risky operations)
+            state = self._check_consequences(state)
 
-        # 4. Execute action (only if no consequence or if force=True)
-        state = self._execute_action(state)
+            # 4. Execute action (only if no consequence or if force=True)
+            state = self._execute_action(state)
 
-        # 5. Respond (format the response)
-        state = self._respond(state)
+            # 5. Respond (format the response)
+            state = self._respond(state)
+        except Exception as exc:
+            # Runs that blow up are the ones the audit trail is most needed for.
+            self._audit(intent, parameters, state, started, failure=exc)
+            raise
 
         # Return the response object as expected by the endpoint
         response = {
@@ -54,19 +69,104 @@ class MoviAgent:
         if state.get("consequence"):
             response["consequence"] = state["consequence"]
 
+        self._audit(intent, parameters, state, started)
         return response
 
+    def _audit(
+        self,
+        request_intent: str,
+        parameters: Dict[str, Any],
+        state: Dict,
+        started: float,
+        failure: Optional[Exception] = None,
+    ) -> None:
+        """Queue the run record; serialization and file I/O happen on the writer thread."""
+        if failure is not None:
+            outcome = "exception"
+        elif state.get("unparsed"):
+            outcome = "unparsed"
+        elif state.get("error"):
+            outcome = "error"
+        elif state.get("consequence") and not state.get("parameters", {}).get("confirmed"):
+            outcome = "confirmation_required"
+        elif state.get("cached") is not None:
+            outcome = "cached"
+        else:
+            outcome = "executed"
+        record = {
+            "run_id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "request_intent": request_intent,
+            "intent": state["intent"],
+            "parameters": dict(parameters),
+            "context": state.get("context"),
+            "parsed": state.get("parsed"),
+            "consequence": state.get("consequence"),
+            "outcome": outcome,
+            "message": state.get("message"),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        if failure is not None:
+            record["error"] = repr(failure)
+        get_audit_writer().record(record)
+
     # ------------------------------------------------------------------
     # Pipeline stages
     # ------------------------------------------------------------------
     def _parse_intent(self, state: Dict) -> Dict:
-        """Parse the intent (already done on frontend; this is a placeholder)."""
+        """Resolve free-text utterances into a structured intent.
+
+        Structured intents from the frontend pass through untouched. Anything sent as
+        ``free_text`` (or with an empty intent) is run through the deterministic parser;
+        the LLM fallback is only consulted for low-confidence utterances.
+        """
+        params = state.get("parameters") or {}
+        if state["intent"] not in ("", FREE_TEXT_INTENT) or not params.get("text"):
+            return state
+
+        parser = get_intent_parser()
+        parsed = parser.parse(params["text"], self.session, state.get("context"))
+        state["parsed"] = {"intent": parsed.intent, "confidence": parsed.confidence, "source": parsed.source}
+        if parsed.intent is None or parsed.confidence < parser.threshold:
+            state["message"] = f"Sorry, I couldn't map '{params['text']}' to an action."
+            state["unparsed"] = True
+            return state
+
+        merged = dict(parsed.parameters)
+        if params.get("confirmed"):
+            merged["confirmed"] = True
+        state["intent"] = parsed.intent
+        state["parameters"] = merged
         return state
 
     def _check_context(self, state: Dict) -> Dict:
-        """Validate the context (page, user, etc.) and enrich state if needed."""
+        """Validate the context and resolve the entities the intent needs.
+
+        Cached read-only results short-circuit resolution entirely, and on a miss
+        resolution is deferred to ``_run_handler`` so concurrent identical reads
+        share it. Other intents have their entities fetched here and stored under
+        ``state["resolved"]`` for the consequence checks and handlers; a failed
+        fetch ends the run with an error response like a failed handler does.
+        """
         context = state.get("context", {})
         state["context"] = context
+        if state.get("unparsed"):
+            return state
+
+        intent = state["intent"]
+        params = state.get("parameters", {})
+        tables = self.cache.tables_for(intent)
+        if tables is not None:
+            from backend.app.versions import table_versions
+
+            state["cache_key"] = self.cache.make_key(intent, params, table_versions.snapshot(tables))
+            state["cached"] = self.cache.get(state["cache_key"])
+            return state
+
+        try:
+            state["resolved"] = self.resolver.resolve(intent, params)
+        except Exception as e:
+            self._fail(state, e)
         return state
 
     def _check_consequences(self, state: Dict) -> Dict:
@@ -75,15 +175,15 @@ class MoviAgent:
         params = state.get("parameters", {})
         consequence = None
 
+        resolved = state.get("resolved", {})
+
         if intent == "remove_vehicle_from_trip":
-            trip_name = params.get("trip_name")
-            if trip_name:
-                trip = self.tools.get_trip(trip_name)
-                if trip and trip.booking_status_percentage > 0:
-                    consequence = {
-                        "requires_confirmation": True,
-                        "reason": f"{trip.booking_status_percentage}% of seats already booked for {trip.display_name}.",
-                    }
+            trip = resolved.get("trip")
+            if trip and trip.booking_status_percentage > 0:
+                consequence = {
+                    "requires_confirmation": True,
+                    "reason": f"{trip.booking_status_percentage}% of seats already booked for {trip.display_name}.",
+                }
         elif intent == "update_route_status" and params.get("status") == "Inactive":
             consequence = {
                 "requires_confirmation": True,
@@ -102,6 +202,9 @@ class MoviAgent:
         consequence = state.get("consequence")
         force = params.get("confirmed", False)
 
+        if state.get("unparsed") or state.get("error"):
+            return state
+
         # If there is a consequence and the user hasn't confirmed, ask for confirmation
         if consequence and not force:
             state["message"] = "Confirmation required before executing action."
@@ -114,81 +217,160 @@ class MoviAgent:
             return state
 
         try:
-            data, message = handler(params)
+            data, message = self._run_handler(state, handler)
             state["data"] = data
             state["message"] = message
         except Exception as e:
-            state["message"] = f"Error executing action: {str(e)}"
-            state["data"] = None
+            self._fail(state, e)
 
         return state
 
+    @staticmethod
+    def _fail(state: Dict, error: Exception) -> None:
+        state["message"] = f"Error executing action: {str(error)}"
+        state["data"] = None
+        state["error"] = True
+
+    def _run_handler(self, state: Dict, handler):
+        """Call ``handler``, serving read-only intents from the result cache when possible.
+
+        A read-only miss resolves its entities and runs the handler through the
+        single-flight layer, so identical concurrent requests do the work once;
+        every caller unpickles its own copy of the shared result.
+        """
+        if state.get("cached") is not None:
+            return state["cached"]
+        params = state.get("parameters", {})
+        if state.get("cache_key") is None:
+            return handler(params, state.get("resolved", {}))
+
+        from backend.app.single_flight import coalesced
+
+        intent = state["intent"]
+        tables = self.cache.tables_for(intent)
+
+        def compute():
+            data, message = handler(params, self.resolver.resolve(intent, params))
+            return self.cache.put(state["cache_key"], data, message, tables)
+
+        return self.cache.load(coalesced(("agent", state["cache_key"]), (), compute))
+
     def _respond(self, state: Dict) -> Dict:
         """Format and return the final response."""
         return state
 
     # --- Intent Handlers ----------------------------------------------------
-    def _handle_list_unassigned_vehicles(self, params: Dict[str, Any]):
-        vehicles = self.tools.list_unassigned_vehicles()
+    # Each handler receives the intent parameters and the entities resolved by
+    # ``_check_context``; it falls back to the tools for anything not resolved.
+    def _handle_list_unassigned_vehicles(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        vehicles = resolved.get("vehicles")
+        if vehicles is None:
+            vehicles = self.tools.list_unassigned_vehicles()
         message = f"Found {len(vehicles)} unassigned vehicles."
         return {"vehicles": vehicles}, message
 
-    def _handle_get_trip_status(self, params: Dict[str, Any]):
+    def _handle_get_trip_status(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         trip_name = params.get("trip_name")
-        status = self.tools.get_trip_status(trip_name)
+        if "trip" in resolved:
+            trip = resolved["trip"]
+            status = trip.live_status if trip else None
+            if trip and not trip_name:
+                trip_name = trip.display_name
+        else:
+            status = self.tools.get_trip_status(trip_name, bool(params.get("include_archived")))
         if status is None:
-            return None, f"Trip '{trip_name}' not found."
+            return None, f"Trip '{trip_name or params.get('trip_id')}' not found."
         return {"status": status}, f"{trip_name} is currently {status}."
 
-    def _handle_list_stops_for_path(self, params: Dict[str, Any]):
+    def _handle_list_stops_for_path(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         path_name = params.get("path_name")
-        stops = self.tools.list_stops_for_path(path_name)
+        stops = resolved.get("stops")
+        if stops is None:
+            stops = self.tools.list_stops_for_path(path_name)
         return {"stops": stops}, f"Path {path_name} covers {len(stops)} stops."
 
-    def _handle_list_routes_using_path(self, params: Dict[str, Any]):
+    def _handle_list_routes_using_path(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         path_name = params.get("path_name")
-        routes = self.tools.list_routes_using_path(path_name)
+        routes = resolved.get("routes")
+        if routes is None:
+            routes = self.tools.list_routes_using_path(path_name)
         return {"routes": routes}, f"Found {len(routes)} routes using {path_name}."
 
-    def _handle_assign_vehicle_to_trip(self, params: Dict[str, Any]):
-        payload = self.tools.assign_vehicle_to_trip(params["trip_id"], params["vehicle_id"], params["driver_id"])
+    def _handle_assign_vehicle_to_trip(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        for key, label in (("trip", "Trip"), ("vehicle", "Vehicle"), ("driver", "Driver")):
+            if key in resolved and resolved[key] is None:
+                return None, f"{label} {params.get(f'{key}_id', params.get(f'{key}_name'))} not found."
+        trip_id = params.get("trip_id")
+        if trip_id is None and resolved.get("trip"):
+            trip_id = resolved["trip"].trip_id
+        if trip_id is None:
+            return None, "Which trip should the vehicle be assigned to?"
+        payload = self.tools.assign_vehicle_to_trip(trip_id, params["vehicle_id"], params["driver_id"])
         return payload, "Vehicle assigned successfully."
 
-    def _handle_remove_vehicle_from_trip(self, params: Dict[str, Any]):
+    def _handle_remove_vehicle_from_trip(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         trip_id = params.get("trip_id")
+        if trip_id is None and resolved.get("trip"):
+            trip_id = resolved["trip"].trip_id
         removed = self.tools.remove_vehicle_from_trip(trip_id)
         if removed:
             return {"removed": True}, "Vehicle removed from trip."
         return {"removed": False}, "No vehicle assignment found for that trip."
 
-    def _handle_create_stop(self, params: Dict[str, Any]):
+    def _handle_create_stop(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         stop = self.tools.create_stop(params["name"], params["latitude"], params["longitude"])
         return stop, f"Created stop {stop['name']}."
 
-    def _handle_create_path(self, params: Dict[str, Any]):
+    def _handle_create_path(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         path = self.tools.create_path(params["name"], params["stop_ids"])
         return path, f"Created path {path['path_name']}."
 
-    def _handle_create_route(self, params: Dict[str, Any]):
+    def _handle_create_route(self, params: Dict[str, Any], resolved: Dict[str, Any]):
         route = self.tools.create_route(**params)
         return route, f"Route {route['route_display_name']} created."
 
-    def _handle_update_route_status(self, params: Dict[str, Any]):
+    def _handle_update_route_status(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        if "route" in resolved and resolved["route"] is None:
+            return None, "Route not found."
         route = self.tools.update_route_status(params["route_id"], params["status"])
         if route:
             return route, f"Route status updated to {params['status']}."
         return None, "Route not found."
 
-    def _handle_list_daily_trips(self, params: Dict[str, Any]):
-        trips = self.tools.list_daily_trips()
+    def _handle_find_journey(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        from_stop = self.tools.get_stop_id(params.get("from_stop_id", params.get("from_stop")))
+        to_stop = self.tools.get_stop_id(params.get("to_stop_id", params.get("to_stop")))
+        if from_stop is None or to_stop is None:
+            return None, "Both a start and a destination stop are needed."
+        plan = self.tools.plan_journey(from_stop, to_stop, params.get("transfer_penalty_km"))
+        if plan is None:
+            return None, "No connection found between those stops."
+        return plan, f"Found a {plan['distance_km']} km journey with {plan['transfers']} transfers."
+
+    def _handle_list_routes_serving_stops(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        stop_a = self.tools.get_stop_id(params.get("stop_a_id", params.get("stop_a")))
+        stop_b = self.tools.get_stop_id(params.get("stop_b_id", params.get("stop_b")))
+        if stop_a is None or stop_b is None:
+            return None, "Two stops are needed."
+        routes = self.tools.list_routes_serving_stops(stop_a, stop_b)
+        return {"routes": routes}, f"Found {len(routes)} routes serving both stops."
+
+    def _handle_list_daily_trips(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        trips = resolved.get("trips")
+        if trips is None:
+            trips = self.tools.list_daily_trips(bool(params.get("include_archived")))
         return {"trips": trips}, f"Found {len(trips)} daily trips."
 
-    def _handle_list_deployments(self, params: Dict[str, Any]):
-        deployments = self.tools.list_deployments()
+    def _handle_list_deployments(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        deployments = resolved.get("deployments")
+        if deployments is None:
+            deployments = self.tools.list_deployments(bool(params.get("include_archived")))
         return {"deployments": deployments}, f"Found {len(deployments)} deployments."
 
-    def _handle_list_available_drivers(self, params: Dict[str, Any]):
-        drivers = self.tools.list_available_drivers()
+    def _handle_list_available_drivers(self, params: Dict[str, Any], resolved: Dict[str, Any]):
+        drivers = resolved.get("drivers")
+        if drivers is None:
+            drivers = self.tools.list_available_drivers()
         return {"drivers": drivers}, f"Found {len(drivers)} available drivers."
 
 
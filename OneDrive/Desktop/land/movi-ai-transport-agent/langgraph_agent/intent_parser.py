@@ -0,0 +1,438 @@
+"""
+Deterministic fast-path intent parser for free-text and voice commands.
+
+Utterances are matched against precompiled patterns and an entity gazetteer
+(trip, route, path and stop names, licence plates and driver names) loaded
+from the DB. Only utterances that stay below the confidence threshold are
+handed to the optional LLM fallback.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+from sqlmodel import Session, select
+
+FREE_TEXT_INTENT = "free_text"
+DEFAULT_CONFIDENCE_THRESHOLD = 0.75
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9.]+")
+_STRIP_DOTS_RE = re.compile(r"(?<![0-9])\.|\.(?![0-9])")
+_COORDS_RE = re.compile(r"(-?\d{1,3}\.\d+)\s*(?:,|\s)\s*(-?\d{1,3}\.\d+)")
+_NAME_RE = re.compile(
+    r"\b(?:called|named)\s+[\"']?(?P<name>[^\"',]+?)[\"']?(?=\s+(?:at|with|through|via|using)\b|,|$)",
+    re.IGNORECASE,
+)
+
+STATUS_WORDS = {
+    "active": "Active",
+    "inactive": "Inactive",
+    "scheduled": "Scheduled",
+    "live": "Live",
+}
+
+
+def normalize(text: str) -> str:
+    """Lower-case ``text`` and collapse everything but letters, digits and decimals to spaces."""
+    lowered = _NORMALIZE_RE.sub(" ", text.lower())
+    return " ".join(_STRIP_DOTS_RE.sub(" ", lowered).split())
+
+
+@dataclass
+class EntityMatch:
+    kind: str
+    entity_id: int
+    name: str
+    position: int
+    ambiguous: bool = False  # another entity of the same kind has the same name
+
+
+@dataclass
+class ParsedIntent:
+    intent: Optional[str]
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    confidence: float = 0.0
+    source: str = "rules"
+
+
+# ----------------------------------------------------------------------
+# Entity gazetteer
+# ----------------------------------------------------------------------
+class EntityGazetteer:
+    """In-memory name -> id lookup for every entity kind the agent talks about.
+
+    A kind is reloaded in full only once its source table's version moves, so
+    steady-state parses never touch the DB while renames, deletions and archived
+    rows are still picked up. Names that normalize to the same key are ambiguous
+    and never resolve to an id on their own.
+    """
+
+    # kind -> (model name, primary key column, name column, compact keys)
+    SOURCES: Dict[str, Tuple[str, str, str, bool]] = {
+        "trip": ("DailyTrip", "trip_id", "display_name", False),
+        "route": ("Route", "route_id", "route_display_name", False),
+        "path": ("Path", "path_id", "path_name", False),
+        "stop": ("Stop", "stop_id", "name", False),
+        "vehicle": ("Vehicle", "vehicle_id", "license_plate", True),
+        "driver": ("Driver", "driver_id", "name", False),
+    }
+    # Plates are spoken in chunks ("KA 01 AB 1234"), so compact keys may span several tokens.
+    COMPACT_SPAN_TOKENS = 6
+
+    def __init__(self) -> None:
+        # kind -> {id: name}, as last loaded
+        self._rows: Dict[str, Dict[int, str]] = {kind: {} for kind in self.SOURCES}
+        # kind -> key -> [(id, name)]; more than one candidate means the name is ambiguous
+        self._entries: Dict[str, Dict[str, List[Tuple[int, str]]]] = {kind: {} for kind in self.SOURCES}
+        # span key -> [(kind, id, name)], split by how the span is joined during scans
+        self._spaced: Dict[str, List[Tuple[str, int, str]]] = {}
+        self._compact: Dict[str, List[Tuple[str, int, str]]] = {}
+        self._max_tokens = 1
+        self._seen_versions: Dict[str, Optional[int]] = {kind: None for kind in self.SOURCES}
+        self._lock = threading.Lock()
+
+    def _get_models(self):
+        from backend.app import models
+
+        return models
+
+    def _table_versions(self) -> Dict[str, int]:
+        from backend.app.versions import table_versions
+
+        models = self._get_models()
+        return {
+            kind: table_versions.get(getattr(models, source[0]).__tablename__)
+            for kind, source in self.SOURCES.items()
+        }
+
+    def reload(self, session: Session) -> None:
+        """Drop everything and load all entities from scratch."""
+        self.refresh(session, force=True)
+
+    def refresh(self, session: Session, force: bool = False) -> int:
+        """Reload every kind whose table changed. Returns the number of new or renamed entities."""
+        versions = self._table_versions()
+        stale = [kind for kind in self.SOURCES if force or versions[kind] != self._seen_versions[kind]]
+        if not stale:
+            return 0
+        models = self._get_models()
+        changed = 0
+        with self._lock:
+            rows = dict(self._rows)
+            for kind in stale:
+                model_name, pk_name, name_attr, _ = self.SOURCES[kind]
+                model = getattr(models, model_name)
+                loaded = dict(session.exec(select(getattr(model, pk_name), getattr(model, name_attr))).all())
+                previous = rows[kind]
+                changed += sum(1 for entity_id, name in loaded.items() if previous.get(entity_id) != name)
+                rows[kind] = loaded
+            self._index(rows)
+            for kind in stale:
+                self._seen_versions[kind] = versions[kind]
+        return changed
+
+    def _index(self, rows: Dict[str, Dict[int, str]]) -> None:
+        """Rebuild the lookup tables from ``rows`` and swap them in; caller holds the lock."""
+        entries: Dict[str, Dict[str, List[Tuple[int, str]]]] = {kind: {} for kind in self.SOURCES}
+        spaced: Dict[str, List[Tuple[str, int, str]]] = {}
+        compact_index: Dict[str, List[Tuple[str, int, str]]] = {}
+        max_tokens = 1
+        for kind, (_, _, _, compact) in self.SOURCES.items():
+            index = compact_index if compact else spaced
+            for entity_id, name in sorted(rows[kind].items()):
+                tokens = normalize(name or "").split()
+                key = ("" if compact else " ").join(tokens)
+                if not key:
+                    continue
+                entries[kind].setdefault(key, []).append((entity_id, name))
+                index.setdefault(key, []).append((kind, entity_id, name))
+                max_tokens = max(max_tokens, len(tokens))
+        # Readers grab these without the lock, so replace rather than mutate.
+        self._rows, self._entries = rows, entries
+        self._spaced, self._compact, self._max_tokens = spaced, compact_index, max_tokens
+
+    def lookup(self, kind: str, name: str) -> Optional[Tuple[int, str]]:
+        """The entity called ``name``, or None when no entity or more than one has that name."""
+        key = normalize(name)
+        if self.SOURCES[kind][3]:
+            key = key.replace(" ", "")
+        candidates = self._entries[kind].get(key)
+        return candidates[0] if candidates and len(candidates) == 1 else None
+
+    def scan(self, tokens: List[str]) -> Dict[str, List[EntityMatch]]:
+        """Find every known entity in ``tokens`` using longest-span n-gram lookups."""
+        found: Dict[str, List[EntityMatch]] = {}
+        spaced, compact = self._spaced, self._compact
+        max_tokens = max(self._max_tokens, self.COMPACT_SPAN_TOKENS if compact else 1)
+        count = len(tokens)
+        for start in range(count):
+            for end in range(min(count, start + max_tokens), start, -1):
+                span = tokens[start:end]
+                hits = spaced.get(" ".join(span), ())
+                if compact:
+                    hits = [*hits, *compact.get("".join(span), ())]
+                if not hits:
+                    continue
+                per_kind: Dict[str, int] = {}
+                for kind, _, _ in hits:
+                    per_kind[kind] = per_kind.get(kind, 0) + 1
+                for kind, entity_id, name in hits:
+                    matches = found.setdefault(kind, [])
+                    if not any(match.entity_id == entity_id for match in matches):
+                        matches.append(EntityMatch(kind, entity_id, name, start, ambiguous=per_kind[kind] > 1))
+        return found
+
+
+# ----------------------------------------------------------------------
+# Intent rules
+# ----------------------------------------------------------------------
+@dataclass
+class IntentRule:
+    intent: str
+    pattern: Pattern[str]
+    requires: Tuple[str, ...] = ()
+    build: Optional[Callable[[str, Dict[str, List[EntityMatch]]], Optional[Dict[str, Any]]]] = None
+
+
+def _first(entities: Dict[str, List[EntityMatch]], kind: str) -> Optional[EntityMatch]:
+    matches = entities.get(kind)
+    return matches[0] if matches and not matches[0].ambiguous else None
+
+
+def _in_order(entities: Dict[str, List[EntityMatch]], kind: str) -> List[EntityMatch]:
+    """Matches of ``kind`` by position; empty if any of them is ambiguous."""
+    matches = sorted(entities.get(kind, []), key=lambda match: match.position)
+    return [] if any(match.ambiguous for match in matches) else matches
+
+
+def _build_trip_status(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    trip = _first(entities, "trip")
+    return {"trip_name": trip.name} if trip else None
+
+
+def _build_path_name(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    path = _first(entities, "path")
+    return {"path_name": path.name} if path else None
+
+
+def _build_assign(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    trip, vehicle, driver = _first(entities, "trip"), _first(entities, "vehicle"), _first(entities, "driver")
+    if not (trip and vehicle and driver):
+        return None
+    return {"trip_id": trip.entity_id, "vehicle_id": vehicle.entity_id, "driver_id": driver.entity_id}
+
+
+def _build_remove(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    trip = _first(entities, "trip")
+    return {"trip_id": trip.entity_id, "trip_name": trip.name} if trip else None
+
+
+def _build_create_stop(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    name, coords = _NAME_RE.search(text), _COORDS_RE.search(text)
+    if not (name and coords):
+        return None
+    return {
+        "name": name.group("name").strip(),
+        "latitude": float(coords.group(1)),
+        "longitude": float(coords.group(2)),
+    }
+
+
+def _build_create_path(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    name = _NAME_RE.search(text)
+    stops = _in_order(entities, "stop")
+    if not name or len(stops) < 2:
+        return None
+    return {"name": name.group("name").strip(), "stop_ids": [stop.entity_id for stop in stops]}
+
+
+def _build_route_status(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+    route = _first(entities, "route")
+    if not route:
+        return None
+    words = normalize(text).split()
+    status = None
+    if "deactivate" in words or "disable" in words:
+        status = "Inactive"
+    elif "activate" in words or "enable" in words:
+        status = "Active"
+    else:
+        for word in reversed(words):
+            if word in STATUS_WORDS:
+                status = STATUS_WORDS[word]
+                break
+    if status is None:
+        return None
+    return {"route_id": route.entity_id, "status": status}
+
+
+def _build_stop_pair(first: str, second: str) -> Callable[[str, Dict[str, List[EntityMatch]]], Optional[Dict[str, Any]]]:
+    def build(text: str, entities: Dict[str, List[EntityMatch]]) -> Optional[Dict[str, Any]]:
+        stops = _in_order(entities, "stop")
+        if len(stops) < 2:
+            return None
+        return {first: stops[0].entity_id, second: stops[1].entity_id}
+
+    return build
+
+
+def _compile(pattern: str) -> Pattern[str]:
+    return re.compile(pattern)
+
+
+# Rules run against the normalized utterance; earlier rules win ties.
+DEFAULT_RULES: List[IntentRule] = [
+    IntentRule(
+        "remove_vehicle_from_trip",
+        _compile(r"\b(remove|unassign|detach|take off|pull)\b.*\b(vehicle|bus|cab|van)\b"),
+        ("trip",),
+        _build_remove,
+    ),
+    IntentRule(
+        "assign_vehicle_to_trip",
+        _compile(r"\b(assign|deploy|allocate|put)\b"),
+        ("trip", "vehicle", "driver"),
+        _build_assign,
+    ),
+    IntentRule(
+        "update_route_status",
+        _compile(r"\b(activate|deactivate|enable|disable|set|mark|make)\b.*\b(active|inactive|scheduled|live)\b|\b(de)?activate\b"),
+        ("route",),
+        _build_route_status,
+    ),
+    IntentRule(
+        "create_stop",
+        _compile(r"\b(create|add|new)\b.*\bstop\b"),
+        (),
+        _build_create_stop,
+    ),
+    IntentRule(
+        "create_path",
+        _compile(r"\b(create|add|new)\b.*\bpath\b"),
+        ("stop",),
+        _build_create_path,
+    ),
+    IntentRule(
+        "list_routes_serving_stops",
+        _compile(r"\b(routes?|buses|shuttles?)\b.*\b(serve|serves|serving|stop at|stops at|cover|covers|go through|between)\b"),
+        ("stop",),
+        _build_stop_pair("stop_a_id", "stop_b_id"),
+    ),
+    IntentRule(
+        "find_journey",
+        _compile(r"\b(get|go|travel|reach|route|way|journey|trip|path)\b.*\bfrom\b.*\bto\b"),
+        ("stop",),
+        _build_stop_pair("from_stop_id", "to_stop_id"),
+    ),
+    IntentRule(
+        "get_trip_status",
+        _compile(r"\b(status|where is|running|late|on time)\b"),
+        ("trip",),
+        _build_trip_status,
+    ),
+    IntentRule(
+        "list_routes_using_path",
+        _compile(r"\broutes?\b.*\b(use|uses|using|on|for|via)\b"),
+        ("path",),
+        _build_path_name,
+    ),
+    IntentRule(
+        "list_stops_for_path",
+        _compile(r"\bstops?\b"),
+        ("path",),
+        _build_path_name,
+    ),
+    IntentRule(
+        "list_unassigned_vehicles",
+        _compile(
+            r"\b(unassigned|free|idle|available|spare)\b.*\b(vehicles?|buses|cabs|vans)\b"
+            r"|\b(vehicles?|buses|cabs|vans)\b.*\b(not assigned|unassigned|free|idle|available|spare)\b"
+        ),
+    ),
+    IntentRule(
+        "list_available_drivers",
+        _compile(r"\b(available|free|idle|unassigned|spare)\b.*\bdrivers?\b|\bdrivers?\b.*\b(available|free|idle|spare)\b"),
+    ),
+    IntentRule(
+        "list_deployments",
+        _compile(r"\bdeployments?\b|\bwhich (vehicles?|buses) are (deployed|assigned)\b"),
+    ),
+    IntentRule(
+        "list_daily_trips",
+        _compile(r"\b(list|show|what|which|all|today s)\b.*\btrips?\b|^trips?$"),
+    ),
+]
+
+
+# ----------------------------------------------------------------------
+# Parser
+# ----------------------------------------------------------------------
+LLMFallback = Callable[[str, Dict[str, Any]], Optional[ParsedIntent]]
+
+
+class IntentParser:
+    """Rule-based parser that maps utterances to the agent's ``_handle_*`` intents."""
+
+    def __init__(
+        self,
+        gazetteer: Optional[EntityGazetteer] = None,
+        rules: Optional[List[IntentRule]] = None,
+        llm_fallback: Optional[LLMFallback] = None,
+        threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    ):
+        self.gazetteer = gazetteer or EntityGazetteer()
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.llm_fallback = llm_fallback
+        self.threshold = threshold
+
+    def parse(self, text: str, session: Optional[Session] = None, context: Optional[Dict[str, Any]] = None) -> ParsedIntent:
+        if session is not None:
+            self.gazetteer.refresh(session)
+        result = self.match(text)
+        if result.confidence < self.threshold and self.llm_fallback is not None:
+            fallback = self.llm_fallback(text, context or {})
+            if fallback is not None and fallback.confidence >= result.confidence:
+                fallback.source = "llm"
+                return fallback
+        return result
+
+    def match(self, text: str) -> ParsedIntent:
+        """Run the rules only; never calls the fallback."""
+        normalized = normalize(text)
+        entities = self.gazetteer.scan(normalized.split())
+        best = ParsedIntent(intent=None)
+        for rule in self.rules:
+            if not rule.pattern.search(normalized):
+                continue
+            if not all(entities.get(kind) for kind in rule.requires):
+                confidence = 0.4
+                params: Optional[Dict[str, Any]] = {}
+            else:
+                params = rule.build(text, entities) if rule.build else {}
+                confidence = 1.0 if params is not None else 0.5
+            if confidence > best.confidence:
+                best = ParsedIntent(intent=rule.intent, parameters=params or {}, confidence=confidence)
+                if confidence == 1.0:
+                    break
+        return best
+
+
+_default_parser: Optional[IntentParser] = None
+_default_lock = threading.Lock()
+
+
+def get_intent_parser() -> IntentParser:
+    """Process-wide parser so the gazetteer is loaded once and refreshed only when its tables change."""
+    global _default_parser
+    if _default_parser is None:
+        with _default_lock:
+            if _default_parser is None:
+                _default_parser = IntentParser()
+    return _default_parser
+
+
+def set_llm_fallback(fallback: Optional[LLMFallback]) -> None:
+    """Plug an LLM-based parser in for utterances the rules cannot resolve."""
+    get_intent_parser().llm_fallback = fallback
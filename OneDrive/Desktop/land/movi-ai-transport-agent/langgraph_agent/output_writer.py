@@ -0,0 +1,268 @@
+"""
+Asynchronous audit trail for agent runs.
+
+``MoviAgent.handle_action`` hands each run record to :class:`AuditWriter`, which
+only appends it to a bounded in-memory queue. A background thread drains the
+queue in batches into JSONL segments under ``outputs/audit/``; segments are
+rotated by size and gzip-compressed once closed. A batch that fails to write is
+logged and counted, and the writer carries on with a fresh segment.
+:class:`AuditReader` queries and replays the persisted records.
+"""
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIR = Path(__file__).resolve().parents[1] / "outputs" / "audit"
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Batched, size-rotated JSONL writer fed from a bounded queue.
+
+    ``record`` never blocks: when the queue is full the record is dropped and
+    counted, so auditing cannot stall the request thread under load. ``stats``
+    reports the counters together with the current queue depth.
+    """
+
+    def __init__(
+        self,
+        directory: Path = OUTPUT_DIR,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        segment_bytes: int = 8 * 1024 * 1024,
+        compress: bool = True,
+        prefix: str = "audit",
+    ):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._segment = None
+        self._segment_path: Optional[Path] = None
+        self._segment_size = 0
+        self._segment_seq = 0
+        # Updated from every request thread and the writer thread.
+        self._metrics_lock = threading.Lock()
+        self.metrics: Dict[str, Any] = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "failed": 0,
+            "failed_batches": 0,
+            "batches": 0,
+            "segments": 0,
+            "max_depth": 0,
+            "last_batch_ms": 0.0,
+            "last_error": None,
+        }
+
+    # Producer side -------------------------------------------------------
+    def record(self, event: Dict[str, Any]) -> bool:
+        """Queue ``event`` for writing. Returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._metrics_lock:
+                self.metrics["dropped"] += 1
+            return False
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self.metrics["enqueued"] += 1
+            if depth > self.metrics["max_depth"]:
+                self.metrics["max_depth"] = depth
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        return {**metrics, "depth": self._queue.qsize(), "capacity": self._queue.maxsize}
+
+    # Lifecycle -----------------------------------------------------------
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name=f"movi-{self.prefix}-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        started = time.monotonic()
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("%s writer did not drain within %.1fs; queued records not flushed", self.prefix, timeout)
+            return
+        thread.join(max(0.0, timeout - (time.monotonic() - started)))
+        self._thread = None
+
+    # Consumer side -------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch: List[Dict[str, Any]] = []
+            stop = first is _STOP
+            if not stop:
+                batch.append(first)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as exc:  # keep the writer alive; the batch is lost
+                    logger.exception("%s writer failed; %d records lost", self.prefix, len(batch))
+                    with self._metrics_lock:
+                        self.metrics["failed"] += len(batch)
+                        self.metrics["failed_batches"] += 1
+                        self.metrics["last_error"] = repr(exc)
+                    self._abandon_segment()
+            if stop:
+                try:
+                    self._close_segment()
+                except Exception:
+                    logger.exception("%s writer failed to close %s", self.prefix, self._segment_path)
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        payload = "".join(json.dumps(event, default=str, separators=(",", ":")) + "\n" for event in batch)
+        data = payload.encode("utf-8")
+        if self._segment is None:
+            self._open_segment()
+        self._segment.write(data)
+        self._segment.flush()
+        self._segment_size += len(data)
+        with self._metrics_lock:
+            self.metrics["written"] += len(batch)
+            self.metrics["batches"] += 1
+            self.metrics["last_batch_ms"] = (time.perf_counter() - started) * 1000
+        if self._segment_size >= self.segment_bytes:
+            self._close_segment()
+
+    def _open_segment(self) -> None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self._segment_seq += 1
+        self._segment_path = self.directory / f"{self.prefix}-{stamp}-{os.getpid()}-{self._segment_seq:04d}.jsonl"
+        self._segment = open(self._segment_path, "ab")
+        self._segment_size = 0
+        with self._metrics_lock:
+            self.metrics["segments"] += 1
+
+    def _abandon_segment(self) -> None:
+        """Drop a segment whose write failed; the next batch opens a new one."""
+        segment, self._segment, self._segment_path = self._segment, None, None
+        if segment is not None:
+            try:
+                segment.close()
+            except OSError:
+                pass
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        self._segment.close()
+        path = self._segment_path
+        self._segment = None
+        self._segment_path = None
+        if self.compress and path is not None:
+            with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            path.unlink()
+
+
+class AuditReader:
+    """Query and replay run records from the audit segments, oldest first."""
+
+    def __init__(self, directory: Path = OUTPUT_DIR, prefix: str = "audit"):
+        self.directory = Path(directory)
+        self.prefix = prefix
+
+    def segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        paths = [*self.directory.glob(f"{self.prefix}-*.jsonl"), *self.directory.glob(f"{self.prefix}-*.jsonl.gz")]
+        return sorted(paths, key=lambda path: path.name.split(".")[0])
+
+    def records(
+        self,
+        intent: Optional[str] = None,
+        run_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        outcome: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        for path in self.segments():
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if intent is not None and record.get("intent") != intent:
+                        continue
+                    if run_id is not None and record.get("run_id") != run_id:
+                        continue
+                    if since is not None and record.get("ts", 0) < since:
+                        continue
+                    if until is not None and record.get("ts", 0) > until:
+                        continue
+                    if outcome is not None and record.get("outcome") != outcome:
+                        continue
+                    yield record
+
+    def replay(self, run: Callable[[str, Dict[str, Any], Dict[str, Any]], Any], **filters: Any) -> List[Any]:
+        """Re-issue matching records through ``run(intent, parameters, context)``."""
+        return [
+            run(record.get("request_intent", record["intent"]), record.get("parameters") or {}, record.get("context") or {})
+            for record in self.records(**filters)
+        ]
+
+
+_audit_writer: Optional[AuditWriter] = None
+_audit_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter()
+    return _audit_writer
@@ -0,0 +1,135 @@
+"""
+Memoized results for the agent's read-only intents.
+
+Entries are keyed on (intent, normalized parameters, versions of the tables the
+intent reads). A commit that touches any of those tables bumps its version, which
+both makes the old key unreachable and purges the entry eagerly.
+
+Results are stored pickled and unpickled on every read, so each caller gets its
+own copy and nothing a caller does to a result can leak into later responses.
+"""
+from __future__ import annotations
+
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+# intent -> tables its handler reads
+READ_INTENT_TABLES: Dict[str, Tuple[str, ...]] = {
+    "list_daily_trips": ("dailytrip",),
+    "list_deployments": ("deployment",),
+    "list_unassigned_vehicles": ("vehicle", "deployment"),
+    "list_available_drivers": ("driver", "deployment"),
+    "get_trip_status": ("dailytrip",),
+    "list_stops_for_path": ("path", "stop"),
+    "list_routes_using_path": ("path", "route"),
+    "find_journey": ("stop", "path", "route"),
+    "list_routes_serving_stops": ("stop", "path", "route"),
+}
+
+# Parameters that steer the pipeline but never change a read's result.
+_IGNORED_PARAMS = {"confirmed"}
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    relevant = {key: value for key, value in params.items() if key not in _IGNORED_PARAMS}
+    return json.dumps(relevant, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def _weight(data: Any) -> int:
+    """Rough size of a result: the number of rows it carries (at least 1)."""
+    if isinstance(data, dict):
+        return max(1, sum(len(value) for value in data.values() if isinstance(value, list)))
+    return 1
+
+
+class IntentResultCache:
+    """Thread-safe LRU bounded by entry count and by total cached rows."""
+
+    def __init__(self, max_entries: int = 512, max_rows: int = 200_000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        # key -> (pickled (data, message), tables read, weight)
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Tuple[str, ...], int]]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def tables_for(intent: str) -> Optional[Tuple[str, ...]]:
+        return READ_INTENT_TABLES.get(intent)
+
+    def make_key(self, intent: str, params: Dict[str, Any], versions: Tuple[int, ...]) -> Hashable:
+        return (intent, normalize_params(params), versions)
+
+    @staticmethod
+    def dump(data: Any, message: str) -> bytes:
+        return pickle.dumps((data, message), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(payload: bytes) -> Tuple[Any, str]:
+        """A fresh copy of a result produced by :meth:`dump` or :meth:`put`."""
+        return pickle.loads(payload)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self.load(entry[0])
+
+    def put(self, key: Hashable, data: Any, message: str, tables: Iterable[str]) -> bytes:
+        """Cache a result; returns its pickled form for callers that share it further."""
+        payload = self.dump(data, message)
+        weight = _weight(data)
+        if weight > self.max_rows:
+            return payload
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= previous[2]
+            self._entries[key] = (payload, tuple(tables), weight)
+            self._rows += weight
+            while self._entries and (len(self._entries) > self.max_entries or self._rows > self.max_rows):
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= evicted[2]
+        return payload
+
+    def invalidate(self, tables: Set[str]) -> None:
+        """Drop every entry that read one of ``tables``."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if tables.intersection(entry[1])]
+            for key in stale:
+                self._rows -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "rows": self._rows, "hits": self.hits, "misses": self.misses}
+
+
+_result_cache: Optional[IntentResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> IntentResultCache:
+    """Process-wide cache shared by every per-request ``MoviAgent``."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                from backend.app.versions import table_versions
+
+                cache = IntentResultCache()
+                table_versions.subscribe(cache.invalidate)
+                _result_cache = cache
+    return _result_cache
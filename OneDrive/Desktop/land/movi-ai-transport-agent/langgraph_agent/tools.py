@@ -4,7 +4,7 @@ Imports are deferred inside methods to avoid circular import issues.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlmodel import Session
 
@@ -22,13 +22,24 @@ class MoviTools:
 
     # Helper to get models
     def _get_models(self):
-        from backend.app.models import DailyTrip, Deployment, Route, Stop, Vehicle
-        return {"DailyTrip": DailyTrip, "Deployment": Deployment, "Route": Route, "Stop": Stop, "Vehicle": Vehicle}
+        from backend.app.models import DailyTrip, Deployment, Driver, Route, Stop, Vehicle
+        return {
+            "DailyTrip": DailyTrip,
+            "Deployment": Deployment,
+            "Driver": Driver,
+            "Route": Route,
+            "Stop": Stop,
+            "Vehicle": Vehicle,
+        }
+
+    # Rows as plain dicts straight from the column tuples (no ORM objects / model_dump)
+    def _fetch(self, schema_name: str, model_name: str, where: Any = ()) -> List[Dict]:
+        from backend.app import fast_json, schemas
+        return fast_json.fetch_dicts(self.session, getattr(schemas, schema_name), self._get_models()[model_name], where)
 
     # --- Static data --------------------------------------------------------
     def list_stops(self) -> List[Dict]:
-        crud = self._get_crud()
-        return [stop.model_dump() for stop in crud.list_stops(self.session)]
+        return self._fetch("StopRead", "Stop")
 
     def create_stop(self, name: str, latitude: float, longitude: float) -> Dict:
         crud = self._get_crud()
@@ -48,32 +59,27 @@ class MoviTools:
         ]
 
     def list_routes(self) -> List[Dict]:
-        crud = self._get_crud()
-        routes = crud.list_routes(self.session)
-        return [route.model_dump() for route in routes]
+        return self._fetch("RouteRead", "Route")
 
     def list_routes_using_path(self, path_name: str) -> List[Dict]:
         crud = self._get_crud()
         path = crud.get_path_by_name(self.session, path_name)
         if not path:
             return []
-        routes = crud.list_routes_using_path(self.session, path.path_id)
-        return [route.model_dump() for route in routes]
+        Route = self._get_models()["Route"]
+        return self._fetch("RouteRead", "Route", [Route.path_id == path.path_id])
 
     def list_stops_for_path(self, path_name: str) -> List[Dict]:
         crud = self._get_crud()
-        models = self._get_models()
-        Stop = models["Stop"]
         path = crud.get_path_by_name(self.session, path_name)
         if not path:
             return []
         stop_ids = [int(pid) for pid in path.ordered_stop_ids.split(",") if pid]
-        stops = []
-        for stop_id in stop_ids:
-            stop = self.session.get(Stop, stop_id)
-            if stop:
-                stops.append(stop.model_dump())
-        return stops
+        if not stop_ids:
+            return []
+        Stop = self._get_models()["Stop"]
+        by_id = {stop["stop_id"]: stop for stop in self._fetch("StopRead", "Stop", [Stop.stop_id.in_(stop_ids)])}
+        return [by_id[stop_id] for stop_id in stop_ids if stop_id in by_id]
 
     def create_path(self, name: str, stop_ids: List[int]) -> Dict:
         crud = self._get_crud()
@@ -94,22 +100,82 @@ class MoviTools:
         route = crud.update_route_status(self.session, route_id, status)
         return route.model_dump() if route else None
 
-    # --- Dynamic data -------------------------------------------------------
-    def list_daily_trips(self) -> List[Dict]:
-        crud = self._get_crud()
-        return [trip.model_dump() for trip in crud.list_daily_trips(self.session)]
+    def get_by_ids(self, lookups: Dict[str, Tuple[str, Any]]) -> Dict[str, Optional[Any]]:
+        """Load ``{key: (model name, primary key)}`` in one round trip.
 
-    def get_trip(self, trip_name: str) -> Optional[Any]:
+        Every lookup is outer-joined onto a one-row anchor, so a missing row comes
+        back as None instead of emptying the whole result.
+        """
+        from sqlalchemy import literal, select
+        from sqlalchemy.orm import aliased
+
+        models = self._get_models()
+        entities = []
+        for name, key in lookups.values():
+            model = aliased(models[name])
+            primary_key = getattr(model, models[name].__table__.primary_key.columns.values()[0].name)
+            entities.append((model, primary_key == key))
+        if not entities:
+            return {}
+        statement = select(*(model for model, _ in entities)).select_from(select(literal(1)).subquery())
+        for model, condition in entities:
+            statement = statement.outerjoin(model, condition)
+        row = self.session.execute(statement).one()
+        return dict(zip(lookups, row))
+
+    def get_route(self, route_id: int) -> Optional[Any]:
+        models = self._get_models()
+        return self.session.get(models["Route"], route_id)
+
+    def get_stop_id(self, stop: Any) -> Optional[int]:
+        """Accept a stop id or a stop name."""
+        if isinstance(stop, int) or (isinstance(stop, str) and stop.isdigit()):
+            return int(stop)
         crud = self._get_crud()
-        return crud.get_trip_by_name(self.session, trip_name)
+        found = crud.get_stop_by_name(self.session, stop) if stop else None
+        return found.stop_id if found else None
+
+    def plan_journey(self, from_stop_id: int, to_stop_id: int, transfer_penalty_km: Optional[float] = None) -> Optional[Dict]:
+        from backend.app.network import DEFAULT_TRANSFER_PENALTY_KM, get_network
+        penalty = DEFAULT_TRANSFER_PENALTY_KM if transfer_penalty_km is None else transfer_penalty_km
+        return get_network(self.session).shortest_path(from_stop_id, to_stop_id, penalty)
 
-    def get_trip_status(self, trip_name: str) -> Optional[str]:
+    def list_routes_serving_stops(self, stop_a_id: int, stop_b_id: int) -> List[Dict]:
+        from backend.app.network import get_network
+        route_ids = get_network(self.session).routes_serving(stop_a_id, stop_b_id)
+        if not route_ids:
+            return []
+        Route = self._get_models()["Route"]
+        return self._fetch("RouteRead", "Route", [Route.route_id.in_(route_ids)])
+
+    # --- Dynamic data -------------------------------------------------------
+    def _fetch_archived(self, schema_name: str, model_name: str) -> List[Dict]:
+        from backend.app import archive, schemas
+        return archive.fetch_archived_dicts(self.session, getattr(schemas, schema_name), self._get_models()[model_name])
+
+    def list_daily_trips(self, include_archived: bool = False) -> List[Dict]:
+        trips = self._fetch("DailyTripRead", "DailyTrip")
+        if include_archived:
+            return self._fetch_archived("DailyTripRead", "DailyTrip") + trips
+        return trips
+
+    def get_trip(self, trip_name: str, include_archived: bool = False) -> Optional[Any]:
         crud = self._get_crud()
-        return crud.get_trip_status(self.session, trip_name)
+        return crud.get_trip_by_name(self.session, trip_name, include_archived)
+
+    def get_trip_by_id(self, trip_id: int) -> Optional[Any]:
+        models = self._get_models()
+        return self.session.get(models["DailyTrip"], trip_id)
 
-    def list_deployments(self) -> List[Dict]:
+    def get_trip_status(self, trip_name: str, include_archived: bool = False) -> Optional[str]:
         crud = self._get_crud()
-        return [deployment.model_dump() for deployment in crud.list_deployments(self.session)]
+        return crud.get_trip_status(self.session, trip_name, include_archived)
+
+    def list_deployments(self, include_archived: bool = False) -> List[Dict]:
+        deployments = self._fetch("DeploymentRead", "Deployment")
+        if include_archived:
+            return self._fetch_archived("DeploymentRead", "Deployment") + deployments
+        return deployments
 
     def assign_vehicle_to_trip(self, trip_id: int, vehicle_id: int, driver_id: int) -> Dict:
         crud = self._get_crud()
@@ -121,14 +187,21 @@ class MoviTools:
         return crud.remove_vehicle_from_trip(self.session, trip_id)
 
     def list_vehicles(self) -> List[Dict]:
-        crud = self._get_crud()
-        return [vehicle.model_dump() for vehicle in crud.list_vehicles(self.session)]
+        return self._fetch("VehicleRead", "Vehicle")
+
+    def get_vehicle(self, vehicle_id: int) -> Optional[Any]:
+        models = self._get_models()
+        return self.session.get(models["Vehicle"], vehicle_id)
+
+    def get_driver(self, driver_id: int) -> Optional[Any]:
+        models = self._get_models()
+        return self.session.get(models["Driver"], driver_id)
 
     def list_unassigned_vehicles(self) -> List[Dict]:
         crud = self._get_crud()
-        return [vehicle.model_dump() for vehicle in crud.list_unassigned_vehicles(self.session)]
+        return self._fetch("VehicleRead", "Vehicle", [crud.unassigned_vehicles_clause()])
 
     def list_available_drivers(self) -> List[Dict]:
         crud = self._get_crud()
-        return [driver.model_dump() for driver in crud.list_available_drivers(self.session)]
+        return self._fetch("DriverRead", "Driver", [crud.available_drivers_clause()])
 
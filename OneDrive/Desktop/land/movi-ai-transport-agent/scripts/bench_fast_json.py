@@ -0,0 +1,166 @@
+"""
+Parity check and benchmark for the fast JSON list endpoints.
+
+Builds a throwaway SQLite database with a large dataset, then calls every list
+endpoint twice through the real FastAPI app: once via the fast path
+(backend/app/fast_json.py) and once via the response_model path. The script
+fails if any response body differs byte-for-byte, then prints the timings.
+Single-flight coalescing (backend/app/single_flight.py) is switched off, since
+otherwise repeats inside its window would reuse the first response and time
+nothing.
+
+Usage (from the repository root):
+    python scripts/bench_fast_json.py --rows 50000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+# Read when backend.app.single_flight is imported, so it has to be set first.
+os.environ["MOVI_SINGLE_FLIGHT"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+
+from backend.app import database, fast_json  # noqa: E402
+from backend.app.main import app  # noqa: E402
+from backend.app.models import DailyTrip, Deployment, Driver, Path as PathModel, Route, Stop, Vehicle  # noqa: E402
+
+ENDPOINTS = [
+    "/stops",
+    "/paths",
+    "/routes",
+    "/vehicles",
+    "/vehicles/unassigned",
+    "/drivers/available",
+    "/trips",
+    "/deployments",
+]
+
+
+def populate(engine, rows: int) -> None:
+    rng = random.Random(7)
+    now = datetime(2025, 11, 14, 8, 0, 0)
+    small = max(rows // 10, 10)
+    with Session(engine) as session:
+        session.execute(
+            insert(Stop.__table__),
+            [
+                {
+                    "name": f"Stop {i}",
+                    "latitude": round(12.9 + rng.random() / 10, 6),
+                    "longitude": 77.5 + rng.random() / 10,
+                    "created_at": now - timedelta(seconds=i, microseconds=rng.randrange(0, 1_000_000, 10)),
+                }
+                for i in range(small)
+            ],
+        )
+        session.execute(
+            insert(PathModel.__table__),
+            [{"path_name": f"Path {i}", "ordered_stop_ids": f"{i + 1},{i + 2},{i + 3}"} for i in range(small)],
+        )
+        session.execute(
+            insert(Route.__table__),
+            [
+                {
+                    "path_id": i % small + 1,
+                    "route_display_name": f"Route {i} – Ünïcode",
+                    "shift_time": f"{i % 24:02d}:{i % 60:02d}",
+                    "direction": "Outbound" if i % 2 else "Inbound",
+                    "start_point": "Campus Gate",
+                    "end_point": "Tech Park",
+                    "status": "Scheduled",
+                }
+                for i in range(small)
+            ],
+        )
+        session.execute(
+            insert(Vehicle.__table__),
+            [
+                {"license_plate": f"KA01AB{i:04d}", "type": "Coach" if i % 3 else "Mini Bus", "capacity": 20 + i % 30, "is_active": bool(i % 5)}
+                for i in range(small)
+            ],
+        )
+        session.execute(
+            insert(Driver.__table__),
+            [{"name": f"Driver {i}", "phone_number": f"+91-98{i:08d}", "is_available": bool(i % 4)} for i in range(small)],
+        )
+        session.execute(
+            insert(DailyTrip.__table__),
+            [
+                {
+                    "route_id": i % small + 1,
+                    "display_name": f"Trip {i}",
+                    "booking_status_percentage": rng.randint(0, 100),
+                    "live_status": rng.choice(["Scheduled", "Live", "Completed"]),
+                    "scheduled_start": now + timedelta(minutes=i, microseconds=rng.randrange(0, 1_000_000, 10) * (i % 2)),
+                }
+                for i in range(rows)
+            ],
+        )
+        session.execute(
+            insert(Deployment.__table__),
+            [
+                {"trip_id": i + 1, "vehicle_id": i % small + 1, "driver_id": i % small + 1, "assigned_at": now}
+                for i in range(0, rows, 2)
+            ],
+        )
+        session.commit()
+
+
+def timed_get(client: TestClient, path: str, fast: bool, repeat: int):
+    fast_json.FAST_JSON_ENABLED = fast
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+        body = response.content
+    return body, statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="number of trips (other tables get rows/10)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        populate(engine, args.rows)
+        database.engine = engine
+        client = TestClient(app)
+
+        failures = 0
+        print(f"{'endpoint':<22}{'rows':>8}{'schema ms':>12}{'fast ms':>10}{'speedup':>9}  parity")
+        for path in ENDPOINTS:
+            slow_body, slow = timed_get(client, path, False, args.repeat)
+            fast_body, fast = timed_get(client, path, True, args.repeat)
+            same = slow_body == fast_body
+            failures += not same
+            count = fast_body.count(b"},{") + 1 if fast_body != b"[]" else 0
+            print(f"{path:<22}{count:>8}{slow * 1000:>12.1f}{fast * 1000:>10.1f}{slow / fast:>8.1f}x  {'ok' if same else 'MISMATCH'}")
+        engine.dispose()
+
+    if failures:
+        print(f"{failures} endpoint(s) differ from the response_model output", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
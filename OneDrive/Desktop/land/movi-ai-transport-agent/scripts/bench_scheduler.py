@@ -0,0 +1,114 @@
+"""
+Benchmark the schedule materializer at production scale.
+
+Builds a throwaway SQLite database with ``--routes`` active routes (10k by
+default) and times three runs of backend/app/scheduler.py ``materialize_trips``:
+
+* cold: ``--days`` days (90 by default) into an empty trip table, which
+  exercises the chunked ``executemany`` inserts;
+* repeat: the same range again, which must insert nothing; this exercises
+  the skip-set of existing route/day pairs;
+* extend: the day after the range, the incremental daily run.
+
+The script fails when a run inserts the wrong number of trips or the cold
+run takes longer than ``--budget`` seconds.
+
+Usage (from the repository root):
+    python scripts/bench_scheduler.py --routes 10000 --days 90 --budget 20
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import func, insert  # noqa: E402
+from sqlmodel import Session, create_engine, select  # noqa: E402
+
+from backend.app import database  # noqa: E402
+from backend.app.models import DailyTrip, Path as PathModel, Route  # noqa: E402
+from backend.app.scheduler import DEFAULT_CHUNK_SIZE, materialize_trips  # noqa: E402
+
+START = date(2026, 1, 1)
+
+
+def populate(engine, routes: int) -> None:
+    with Session(engine) as session:
+        session.execute(insert(PathModel.__table__), [{"path_name": "Bench", "ordered_stop_ids": "1,2,3"}])
+        session.execute(
+            insert(Route.__table__),
+            [
+                {
+                    "path_id": 1,
+                    "route_display_name": f"Route {i}",
+                    "shift_time": f"{i % 24:02d}:{i % 60:02d}",
+                    "direction": "Outbound" if i % 2 else "Inbound",
+                    "start_point": "Campus Gate",
+                    "end_point": "Tech Park",
+                    "status": "Active",
+                }
+                for i in range(routes)
+            ],
+        )
+        session.commit()
+
+
+def timed(engine, start: date, end: date, chunk_size: int):
+    with Session(engine) as session:
+        started = time.perf_counter()
+        inserted = materialize_trips(session, start, end, chunk_size)
+        return inserted, time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--budget", type=float, default=20.0, help="seconds allowed for the cold run")
+    args = parser.parse_args()
+
+    end = START + timedelta(days=args.days - 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        database.engine = engine
+        database.init_db()
+        populate(engine, args.routes)
+
+        runs = [
+            ("cold", START, end, args.routes * args.days),
+            ("repeat", START, end, 0),
+            ("extend", end + timedelta(days=1), end + timedelta(days=1), args.routes),
+        ]
+        failures = 0
+        cold_seconds = 0.0
+        print(f"{'run':<8}{'days':>6}{'inserted':>11}{'expected':>11}{'seconds':>9}{'trips/s':>11}")
+        for name, first, last, expected in runs:
+            inserted, seconds = timed(engine, first, last, args.chunk_size)
+            cold_seconds = cold_seconds or seconds
+            failures += inserted != expected
+            rate = inserted / seconds if seconds else 0.0
+            days = (last - first).days + 1
+            print(f"{name:<8}{days:>6}{inserted:>11}{expected:>11}{seconds:>9.2f}{rate:>11.0f}")
+        with Session(engine) as session:
+            total = session.exec(select(func.count()).select_from(DailyTrip)).one()
+        engine.dispose()
+
+    print(f"{total} trips in the table")
+    if failures:
+        print(f"{failures} run(s) inserted an unexpected number of trips", file=sys.stderr)
+        return 1
+    if cold_seconds > args.budget:
+        print(f"cold run took {cold_seconds:.2f}s, over the {args.budget:.0f}s budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
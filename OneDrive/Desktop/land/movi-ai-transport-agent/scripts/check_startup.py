@@ -0,0 +1,149 @@
+"""
+Cold-start budgets for the backend.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+* import: wall time of ``import backend.app.main`` (median of ``--runs``), plus
+  the slowest project modules from ``python -X importtime``;
+* ready: time from entering the app lifespan until ``GET /ready`` passes,
+  against a throwaway copy of the database;
+* first request: latency of the first call to each hot endpoint after ready,
+  next to the median of later calls.
+
+The script exits non-zero when a measurement is over its budget.
+
+Usage (from the repository root):
+    python scripts/check_startup.py --import-budget-ms 1500 --ready-budget-ms 1000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import backend.app.main
+print((time.perf_counter() - started) * 1000)
+"""
+
+READY_PROBE = """
+import json, shutil, statistics, sys, tempfile, time
+from pathlib import Path
+from sqlmodel import create_engine
+from backend.app import database
+
+replica = Path(tempfile.mkdtemp(prefix="movi-startup-")) / "movi.db"
+shutil.copyfile(sys.argv[1], replica)
+database.engine = create_engine(f"sqlite:///{replica}", connect_args={"check_same_thread": False})
+
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.warmup import readiness
+
+REQUESTS = [
+    ("GET", "/trips", None),
+    ("GET", "/vehicles/unassigned", None),
+    ("GET", "/dashboard/summary", None),
+    ("POST", "/agent/action", {"intent": "list_unassigned_vehicles", "parameters": {}, "context": {}}),
+    ("POST", "/agent/action", {"intent": "free_text", "parameters": {"text": "list available drivers"}, "context": {}}),
+]
+
+def call(client, method, path, body):
+    started = time.perf_counter()
+    response = client.request(method, path, json=body)
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+with TestClient(app) as client:
+    readiness.wait(60)
+    ready_ms = (time.perf_counter() - started) * 1000
+    first = [call(client, *request) for request in REQUESTS]
+    later = [[call(client, *request) for request in REQUESTS] for _ in range(20)]
+shutil.rmtree(replica.parent, ignore_errors=True)
+print(json.dumps({
+    "ready_ms": ready_ms,
+    "warmup": readiness.status(),
+    "requests": [
+        {"endpoint": f"{method} {path}" + (f" [{body['intent']}]" if body else ""),
+         "first_ms": first[i], "warm_ms": statistics.median(run[i] for run in later)}
+        for i, (method, path, body) in enumerate(REQUESTS)
+    ],
+}))
+"""
+
+
+def run_probe(code: str, *args: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def slowest_project_imports(limit: int = 8) -> List[Tuple[str, float]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.app.main"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if name.startswith(("backend.", "langgraph_agent")):
+            timings[name] = int(cumulative) / 1000
+    return sorted(timings.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start times against budgets.")
+    parser.add_argument("--database", default=str(ROOT_DIR / "backend" / "db" / "movi.db"))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=2000.0)
+    parser.add_argument("--ready-budget-ms", type=float, default=2000.0)
+    parser.add_argument("--first-request-budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    failures: List[str] = []
+
+    import_ms = statistics.median(float(run_probe(IMPORT_PROBE)) for _ in range(args.runs))
+    print(f"import backend.app.main: {import_ms:.0f}ms (budget {args.import_budget_ms:.0f}ms)")
+    for name, cumulative in slowest_project_imports():
+        print(f"  {name:<40} {cumulative:8.1f}ms")
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.0f}ms")
+
+    report = json.loads(run_probe(READY_PROBE, args.database))
+    print(f"lifespan -> ready: {report['ready_ms']:.0f}ms (budget {args.ready_budget_ms:.0f}ms)")
+    for step, elapsed in report["warmup"]["steps_ms"].items():
+        print(f"  {step:<40} {elapsed:8.1f}ms")
+    for step, error in report["warmup"]["errors"].items():
+        failures.append(f"warm-up step {step} failed: {error}")
+    if report["ready_ms"] > args.ready_budget_ms:
+        failures.append(f"ready took {report['ready_ms']:.0f}ms")
+
+    print(f"first request after ready (budget {args.first_request_budget_ms:.0f}ms):")
+    for request in report["requests"]:
+        print(f"  {request['endpoint']:<58} first {request['first_ms']:7.1f}ms  warm {request['warm_ms']:6.1f}ms")
+        if request["first_ms"] > args.first_request_budget_ms:
+            failures.append(f"first {request['endpoint']} took {request['first_ms']:.0f}ms")
+
+    if failures:
+        print("\nOver budget:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Replay captured traffic against the backend and report latency and error rates.
+
+Reads the ``capture-*.jsonl`` segments written with ``MOVI_TRAFFIC_CAPTURE`` (see
+backend/app/traffic.py) and re-issues every request with its original
+inter-arrival timing, divided by ``--speed`` (``--speed 0`` sends as fast as the
+concurrency limit allows). Without ``--base-url`` the requests go in-process
+to the FastAPI app, against a throwaway copy of ``--database`` so the replayed
+writes never touch the real file; the app's lifespan runs first and the replay
+starts once warm-up has finished, as it would behind the readiness probe. With
+``--base-url`` they go over HTTP to a running instance.
+
+Requests whose body was not captured (``body_skipped``: multipart uploads,
+non-JSON or oversized payloads) are not replayed, since sending them without a
+body would only measure validation errors; the report lists them per endpoint
+and reason.
+
+Usage (from the repository root):
+    python scripts/replay_traffic.py captures/ --speed 4 --concurrency 32
+    python scripts/replay_traffic.py captures/ --base-url http://localhost:8000 --json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from backend.app.traffic import query_pairs, read_capture  # noqa: E402
+
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_of(record: Dict[str, Any]) -> str:
+    """Grouping label: ``METHOD /path/{id}``, plus the intent for agent actions."""
+    label = f"{record['method']} {_ID_SEGMENT_RE.sub('/{id}', record['path'])}"
+    if record.get("intent"):
+        label += f" [{record['intent']}]"
+    return label
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def split_skipped(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, int]]]:
+    """Replayable records, and the skipped ones counted per endpoint and reason."""
+    replayable: List[Dict[str, Any]] = []
+    skipped: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        if record.get("body_skipped"):
+            skipped[endpoint_of(record)][record["body_skipped"]] += 1
+        else:
+            replayable.append(record)
+    return replayable, {endpoint: dict(reasons) for endpoint, reasons in sorted(skipped.items())}
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for result in results:
+        groups["ALL"].append(result)
+        groups[result["endpoint"]].append(result)
+
+    def stats(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latencies = [item["latency_ms"] for item in items]
+        errors = sum(1 for item in items if item["status"] is None or item["status"] >= 500)
+        return {
+            "count": len(items),
+            "error_rate": round(errors / len(items), 4),
+            "client_errors": sum(1 for item in items if item["status"] is not None and 400 <= item["status"] < 500),
+            "shed_429": sum(1 for item in items if item["status"] == 429),
+            "status_changed": sum(1 for item in items if item["status"] != item["captured_status"]),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p90_ms": round(percentile(latencies, 0.90), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(max(latencies), 2),
+            "max_lag_ms": round(max(item["lag_ms"] for item in items), 2),
+        }
+
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "endpoints": {name: stats(items) for name, items in sorted(groups.items())},
+    }
+
+
+async def replay(
+    records: List[Dict[str, Any]],
+    client: httpx.AsyncClient,
+    speed: float,
+    concurrency: int,
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+    first_ts = records[0]["ts"] if records else 0.0
+    started = time.perf_counter()
+
+    async def send(record: Dict[str, Any]) -> None:
+        due = (record["ts"] - first_ts) / speed if speed > 0 else 0.0
+        delay = due - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await client.request(
+                    record["method"],
+                    record["path"],
+                    params=query_pairs(record) or None,
+                    json=record.get("body"),
+                )
+                status: Optional[int] = response.status_code
+            except httpx.HTTPError:
+                status = None
+            results.append(
+                {
+                    "endpoint": endpoint_of(record),
+                    "status": status,
+                    "captured_status": record.get("status"),
+                    "latency_ms": (time.perf_counter() - sent) * 1000,
+                    "lag_ms": max(0.0, (sent - started - due) * 1000),
+                }
+            )
+
+    await asyncio.gather(*(send(record) for record in records))
+    return summarize(results, time.perf_counter() - started)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} requests in {report['elapsed_s']}s "
+        f"({report['throughput_rps']} req/s)"
+    )
+    skipped = report.get("skipped") or {}
+    if skipped:
+        total = sum(sum(reasons.values()) for reasons in skipped.values())
+        print(f"{total} requests not replayed (body not captured):")
+        for name, reasons in skipped.items():
+            print(f"  {name}: " + ", ".join(f"{count} {reason}" for reason, count in sorted(reasons.items())))
+    header = f"{'endpoint':<58} {'n':>6} {'err%':>6} {'429':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'lag':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in report["endpoints"].items():
+        print(
+            f"{name[:58]:<58} {stats['count']:>6} {stats['error_rate'] * 100:>6.2f} {stats['shed_429']:>5} "
+            f"{stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} "
+            f"{stats['max_lag_ms']:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay captured backend traffic and report latencies.")
+    parser.add_argument("capture_dir", help="directory holding capture-*.jsonl segments")
+    parser.add_argument("--base-url", help="replay over HTTP against a running instance instead of in-process")
+    parser.add_argument("--database", default=str(ROOT_DIR / "backend" / "db" / "movi.db"),
+                        help="in-process only: database to copy and replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor; 0 = no pacing")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    records, skipped = split_skipped(list(read_capture(args.capture_dir, args.limit)))
+    if not records and not skipped:
+        sys.exit(f"No captured requests under {args.capture_dir}")
+
+    app = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60.0)
+    else:
+        from sqlmodel import create_engine
+
+        from backend.app import database
+        from backend.app.main import app
+
+        workdir = Path(tempfile.mkdtemp(prefix="movi-replay-"))
+        replica = workdir / "movi.db"
+        shutil.copyfile(args.database, replica)
+        database.engine = create_engine(f"sqlite:///{replica}", connect_args={"check_same_thread": False})
+        database.init_db()
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=60.0)
+
+    async def run() -> Dict[str, Any]:
+        async with client:
+            if app is None:
+                return await replay(records, client, args.speed, args.concurrency)
+            from backend.app.warmup import readiness
+
+            # ASGITransport does not send lifespan events; run startup/shutdown around the replay.
+            async with app.router.lifespan_context(app):
+                await asyncio.to_thread(readiness.wait, 120.0)
+                return await replay(records, client, args.speed, args.concurrency)
+
+    report = asyncio.run(run())
+    report["skipped"] = skipped
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if not args.base_url:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()